@@ -0,0 +1,408 @@
+# coding: utf-8
+import sys, os, io, argparse, contextlib, tempfile, timeit, queue, threading, time
+#
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+#
+import config
+from lib            import util
+from lib            import scheduler
+from lib            import queries as query
+from lib            import queries_export_apex as query_apex
+from export_db      import Export_DB
+from export_apex    import Export_APEX
+from patch          import Patch
+from benchmarks     import fake_oracle
+from benchmarks     import synthetic_repo
+
+#
+#                                                      (R)
+#                      ---                  ---
+#                    #@@@@@@              &@@@@@@
+#                    @@@@@@@@     .@      @@@@@@@@
+#          -----      @@@@@@    @@@@@@,   @@@@@@@      -----
+#       &@@@@@@@@@@@    @@@   &@@@@@@@@@.  @@@@   .@@@@@@@@@@@#
+#           @@@@@@@@@@@   @  @@@@@@@@@@@@@  @   @@@@@@@@@@@
+#             \@@@@@@@@@@   @@@@@@@@@@@@@@@   @@@@@@@@@@
+#               @@@@@@@@@   @@@@@@@@@@@@@@@  &@@@@@@@@
+#                 @@@@@@@(  @@@@@@@@@@@@@@@  @@@@@@@@
+#                  @@@@@@(  @@@@@@@@@@@@@@,  @@@@@@@
+#                  .@@@@@,   @@@@@@@@@@@@@   @@@@@@
+#                   @@@@@@  *@@@@@@@@@@@@@   @@@@@@
+#                   @@@@@@@@@@@@@@@@@@@@@@@@@@@@@@.
+#                    @@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+#                    @@@@@@@@@@@@@@@@@@@@@@@@@@@@
+#                     .@@@@@@@@@@@@@@@@@@@@@@@@@
+#                       .@@@@@@@@@@@@@@@@@@@@@
+#                            jankvetina.cz
+#                               -------
+#
+# Copyright (c) Jan Kvetina, 2024
+# https://github.com/jkvetina/ADT
+#
+
+
+# route all database connections to the fake database,
+# keep the real class for SQLcl requests which run against the fake SQLcl
+real_oracle             = config.wrapper.Oracle
+config.wrapper.Oracle   = fake_oracle.Oracle
+
+
+
+class Benchmark:
+
+    scales      = [100, 1000, 10000]
+    benchmarks  = ['patch', 'export', 'cleanup', 'apex', 'sqlcl', 'deploy']
+    schemas     = ['CORE', 'APP', 'API']
+
+    def define_parser(self):
+        parser = argparse.ArgumentParser(add_help = False)
+
+        # actions and flags
+        group = parser.add_argument_group('MAIN ACTIONS')
+        group.add_argument('-scale',        help = 'Number of objects, one run for each value', type = int,             nargs = '*')
+        group.add_argument('-only',         help = 'Run just some of: ' + ', '.join(self.benchmarks),                  nargs = '*')
+        #
+        group = parser.add_argument_group('ADJUST SYNTHETIC DATA')
+        group.add_argument('-latency',      help = 'Database round trip in milliseconds',       type = float,           nargs = '?', default = 1)
+        group.add_argument('-workers',      help = 'Number of parallel workers',                type = int,             nargs = '?', default = 1)
+        group.add_argument('-commits',      help = 'Number of commits for the patch',           type = int,             nargs = '?', default = 10)
+        group.add_argument('-startup',      help = 'SQLcl startup in milliseconds',             type = float,           nargs = '?', default = 500)
+        group.add_argument('-scripts',      help = 'Number of scripts deployed through SQLcl',  type = int,             nargs = '?', default = 12)
+        group.add_argument('-script',       help = 'Time spent in each script in milliseconds', type = float,           nargs = '?', default = 1000)
+        group.add_argument('-apps',         help = 'Number of exported APEX apps',              type = int,             nargs = '?', default = 4)
+        group.add_argument('-call',         help = 'Time spent in each APEX export call in ms', type = float,           nargs = '?', default = 1000)
+        group.add_argument('-root',         help = 'Folder for generated repos (to keep them)',                         nargs = '?')
+        #
+        return parser
+
+
+
+    def __init__(self, args = None):
+        self.args       = util.Attributed(vars(self.define_parser().parse_args(args = args)))
+        self.root       = util.fix_path(self.args.root or tempfile.mkdtemp(prefix = 'adt_benchmark_'))
+        self.results    = []
+        #
+        fake_oracle.Oracle.latency = self.args.latency / 1000
+        util.beep_success = lambda: None    # keep it quiet
+        #
+        try:
+            for scale in (self.args.scale or self.scales):
+                self.run_scale(scale)
+        finally:
+            if not self.args.root:
+                util.delete_folder(self.root)
+        #
+        util.print_header('RESULTS:')
+        util.print_table(self.results, right_align = ['objects', 'seconds', 'round_trips'])
+        print()
+
+
+
+    def run_scale(self, scale):
+        util.print_header('GENERATING REPO:', '{} OBJECTS'.format(scale))
+        print()
+        #
+        repo_root       = '{}{}/'.format(self.root, scale)
+        self.objects    = synthetic_repo.create_repo(repo_root, scale, commits = self.args.commits)
+        self.set_results()
+
+        # programs expect to run from the repo root
+        cwd = os.getcwd()
+        os.chdir(repo_root)
+        try:
+            for name in self.benchmarks:
+                if not self.args.only or name in self.args.only:
+                    getattr(self, 'bench_' + name)(scale)
+        finally:
+            os.chdir(cwd)
+
+
+
+    def set_results(self):
+        fake_oracle.Oracle.reset()
+        #
+        objects, comments = [], []
+        for object_type, object_name in self.objects:
+            objects.append({
+                'object_type'       : object_type,
+                'object_name'       : object_name,
+                'tablespace_name'   : 'USERS' if object_type == 'TABLE' else None,
+                'partitioned'       : 'NO'    if object_type == 'TABLE' else None,
+                'global_stats'      : 'NO'    if object_type == 'TABLE' else None,
+                'last_ddl_time'     : '2024-01-01 00:00:00',
+            })
+            #
+            if object_type == 'TABLE':
+                for column_name in [None, 'ID', 'CREATED_AT']:
+                    comments.append({
+                        'object_type'   : object_type,
+                        'table_name'    : object_name,
+                        'column_name'   : column_name,
+                        'column_full'   : '{}.{}'.format(object_name, column_name).lower() if column_name else None,
+                        'comments'      : 'Comment on {}'.format(column_name or object_name),
+                        'column_id'     : 1 if column_name else None,
+                    })
+        #
+        fake_oracle.Oracle.register(query.matching_objects,   objects)
+        fake_oracle.Oracle.register(query.pull_comments,      comments)
+        fake_oracle.Oracle.register(query.describe_object,    lambda object_type, object_name:
+            [(synthetic_repo.get_ddl(object_type, object_name),)])
+        fake_oracle.Oracle.register(query.describe_objects,   lambda object_type, object_names:
+            [(name, synthetic_repo.get_ddl(object_type, name)) for name in object_names.split(',')])
+
+
+
+    def measure(self, name, scale, function, *args, **kwargs):
+        round_trips = fake_oracle.Oracle.round_trips
+        start       = timeit.default_timer()
+        #
+        self.quiet(function, *args, **kwargs)
+        #
+        self.results.append({
+            'benchmark'     : name,
+            'objects'       : scale,
+            'seconds'       : '{:.3f}'.format(timeit.default_timer() - start),
+            'round_trips'   : fake_oracle.Oracle.round_trips - round_trips,
+        })
+        print('  {:<32} {:>8}s'.format(name, self.results[-1]['seconds']))
+
+
+
+    def quiet(self, function, *args, **kwargs):
+        # hide program output, show it only on errors
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                return function(*args, **kwargs)
+        except BaseException:
+            print(buffer.getvalue())
+            raise
+
+
+
+    def get_program(self, program, args, init = True):
+        # programs show help when started without arguments
+        argv, sys.argv = sys.argv, sys.argv[0:1] + args
+        try:
+            if init:
+                return self.quiet(program, args = args)
+            #
+            obj = program.__new__(program)
+            self.quiet(config.Config.__init__, obj, args = args)
+            return obj
+        finally:
+            sys.argv = argv
+
+
+
+    def get_exporter(self):
+        # setup just the export part of the Export_DB.process_schema
+        exp = self.get_program(Export_DB, ['-workers', str(self.args.workers)], init = False)
+        exp.args.verbose    = False
+        exp.conn            = exp.db_connect(ping_sqlcl = False, silent = True)
+        exp.remove_schema   = exp.conn.tns.schema
+        exp.objects_prefix  = ''
+        exp.objects_ignore  = ''
+        exp.objects         = {}
+        exp.objects_total   = 0
+        exp.overview        = {}
+        exp.comments        = {}
+        exp.comments_col    = {}
+        exp.comments_type   = {}
+        exp.objects_skip    = set()
+        exp.objects_files   = {}
+        exp.manifest        = {}
+        exp.target_root     = exp.repo_root + exp.get_path(exp.config.path_objects)
+        #
+        self.quiet(exp.show_overview)
+        self.quiet(exp.get_comments)
+        return exp
+
+
+
+    def bench_patch(self, scale):
+        args = ['-patch', synthetic_repo.patch_code]
+
+        # whole program run, the commits file is created from scratch
+        def rebuild():
+            try:
+                Patch(args = args + ['-rebuild', '-workers', str(self.args.workers)])
+            except SystemExit:
+                pass    # rebuild quits on purpose
+        #
+        argv, sys.argv = sys.argv, sys.argv[0:1] + args
+        try:
+            self.measure('patch -rebuild', scale, rebuild)
+        finally:
+            sys.argv = argv
+
+        # read commits from the commits file
+        patch = self.get_program(Patch, args)
+        def get_all_commits():
+            patch.all_files         = {}
+            patch.filtered_commits  = []
+            patch.get_all_commits()
+        #
+        self.measure('Patch.get_all_commits', scale, get_all_commits)
+        self.quiet(patch.get_matching_commits)
+        self.measure('Patch.create_patch_files', scale, patch.create_patch_files)
+        self.measure('Patch.create_install', scale, patch.create_install)
+
+
+
+    def bench_export(self, scale):
+        exp = self.get_exporter()
+        self.measure('Export_DB.export', scale, exp.export)
+
+
+
+    def bench_cleanup(self, scale):
+        exp         = self.get_exporter()
+        payloads    = [(object_type, object_name, synthetic_repo.get_ddl(object_type, object_name)) for object_type, object_name in self.objects]
+        #
+        def cleanup():
+            for object_type, object_name, payload in payloads:
+                exp.export_object(object_type, object_name, payload = payload)
+        #
+        self.measure('Export_DB.export_object', scale, cleanup)
+
+
+
+    def bench_apex(self, scale):
+        apex = self.get_program(Export_APEX, ['-app', str(synthetic_repo.app_id)])
+        apex.auth_scheme_id = 0
+        synthetic_repo.create_apex_export(apex.config.sqlcl_root, scale)
+        #
+        self.measure('Export_APEX.move_files', scale, apex.move_files, synthetic_repo.app_id)
+
+        # export several apps one by one vs at the same time, each export call takes the same time
+        apps = [synthetic_repo.app_id + i for i in range(self.args.apps)]
+        for app_id in apps:
+            apex.apex_apps[app_id] = util.Attributed({**apex.apex_apps[synthetic_repo.app_id], 'app_id' : app_id, 'app_alias' : 'BENCH{}'.format(app_id)})
+        #
+        apex.arg_recent                 = 0
+        apex.timers                     = {}
+        apex.actions['split']           = True
+        apex.actions['readable']        = True
+        #
+        current = threading.local()     # app exported in the session
+        def export_call(**binds):
+            current.app_id = binds.get('app_id')
+            time.sleep(self.args.call / 1000)
+        def export_files():
+            return [{'seq_id' : i, 'file_name' : file, 'clob_content' : payload} for i, (file, payload) in enumerate(synthetic_repo.get_apex_files(current.app_id, scale))]
+        #
+        fake_oracle.Oracle.register(query_apex.apex_export_split,       export_call)
+        fake_oracle.Oracle.register(query_apex.apex_export_readable,    export_call)
+        fake_oracle.Oracle.register(query_apex.apex_export_fetch_files, export_files)
+        #
+        def export(workers):
+            if workers > 1:
+                apex.export_apps(apps, workers)
+            else:
+                for app_id in apps:
+                    apex.export_app(app_id)
+        #
+        self.measure('Export_APEX, {} apps'.format(len(apps)), scale, export, 1)
+        self.measure('Export_APEX, {} apps -parallel'.format(len(apps)), scale, export, len(apps))
+
+
+
+    def bench_sqlcl(self, scale):
+        # deploy scripts to several schemas, new SQLcl process for each script vs one session per schema
+        folder = '{}{}/sqlcl/'.format(self.root, scale)
+        plan   = []
+        for i in range(self.args.scripts):
+            schema  = self.schemas[i % len(self.schemas)]
+            file    = '{}{}_{}.sql'.format(folder, i + 1, schema)
+            util.write_file(file, ['PROMPT -- FILE {}'.format(i + 1), 'SELECT 1 FROM DUAL;', 'PROMPT -- SUCCESS'])
+            plan.append((schema, util.get_file_content(file)))
+
+        def deploy(session):
+            conns = {schema : self.get_sqlcl(schema, folder, session) for schema in self.schemas}
+            for schema, payload in plan:
+                output = conns[schema].sqlcl_request(payload, root = folder, silent = True)
+                if not ('-- SUCCESS' in output):
+                    util.raise_error('SQLCL REQUEST FAILED', output)
+            for conn in conns.values():
+                conn.disconnect()
+        #
+        with self.fake_sqlcl():
+            self.measure('SQLcl deploy, new processes', scale, deploy, False)
+            self.measure('SQLcl deploy, sessions', scale, deploy, True)
+
+
+
+    def bench_deploy(self, scale):
+        # deploy database files for several schemas and two APEX apps for each of them,
+        # files in plan order vs independent files at the same time,
+        # same pool and scheduler as Patch.deploy_patch, without the patch bookkeeping
+        folder  = '{}{}/deploy/'.format(self.root, scale)
+        plan    = []
+        for schema in sorted(self.schemas):
+            for app_id in [None, 100, 101]:
+                file = '{}{}.sql'.format(schema, '.{}'.format(app_id) if app_id else '')
+                util.write_file(folder + file, ['EXECUTE DBMS_SESSION.SLEEP({});'.format(self.args.script / 1000), 'PROMPT -- SUCCESS'])
+                plan.append({'order' : len(plan) + 1, 'file' : file, 'schema' : schema, 'app_id' : app_id})
+        #
+        def deploy(workers):
+            # same number of sessions per schema as in Patch.set_deploy_pool
+            pool = {}
+            for schema in self.schemas:
+                pool[schema] = queue.Queue()
+                for i in range(min(workers, len(plan) // len(self.schemas))):
+                    pool[schema].put(self.get_sqlcl(schema, folder, True))
+            #
+            def deploy_file(order):
+                conn = pool[plan[order]['schema']].get()
+                try:
+                    return conn.sqlcl_request(util.get_file_content(folder + plan[order]['file']), root = folder, silent = True)
+                finally:
+                    pool[plan[order]['schema']].put(conn)
+            #
+            waits = scheduler.get_dependencies(plan, depends = {schema : [] for schema in self.schemas})   # independent schemas
+            for order, output in scheduler.run(plan, deploy_file, waits, workers = workers):
+                if not ('-- SUCCESS' in output):
+                    util.raise_error('SQLCL REQUEST FAILED', output)
+            #
+            for schema in self.schemas:
+                while not pool[schema].empty():
+                    pool[schema].get().disconnect()
+        #
+        with self.fake_sqlcl():
+            self.measure('Deploy plan via scheduler.run', scale, deploy, 1)
+            self.measure('Deploy plan via scheduler.run -parallel', scale, deploy, len(plan))
+
+
+
+    @contextlib.contextmanager
+    def fake_sqlcl(self):
+        # use fake SQLcl binary from this folder
+        path                                    = os.environ.get('PATH', '')
+        os.environ['PATH']                      = os.path.dirname(os.path.realpath(__file__)) + os.pathsep + path
+        os.environ['ADT_FAKE_SQLCL_STARTUP']    = str(self.args.startup / 1000)
+        try:
+            yield
+        finally:
+            os.environ['PATH'] = path
+
+
+
+    def get_sqlcl(self, schema, folder, session):
+        # real wrapper without database connection
+        conn            = real_oracle.__new__(real_oracle)
+        conn.conn       = None
+        conn.cursors    = {}
+        conn.columns    = {}
+        conn.sqlcl      = {}
+        conn.debug      = False
+        conn.trace      = False
+        conn.tns        = util.Attributed({'user' : schema, 'pwd' : schema, 'host' : 'localhost', 'port' : 1521, 'service' : 'FREEPDB1'})
+        conn.config     = util.Attributed({'sqlcl_root' : folder, 'sqlcl_temp_file' : 'sqlcl.tmp', 'sqlcl_session' : session})
+        return conn
+
+
+
+if __name__ == '__main__':
+    Benchmark()
+
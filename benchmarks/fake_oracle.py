@@ -0,0 +1,178 @@
+# coding: utf-8
+import sys, os, time, threading
+#
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+#
+from lib import util
+
+#
+# stand-in for lib/wrapper.Oracle, serves canned results instead of a live database
+#
+# results are registered by the query text (typically a constant from lib/queries*.py),
+# the value is either a list of rows or a function which gets the binds and returns rows,
+# rows are tuples for fetch() and dictionaries for fetch_assoc()
+#
+
+class Oracle:
+
+    latency     = 0         # seconds spent on every round trip
+    results     = {}        # query => rows or function(**binds)
+    round_trips = 0         # counter shared by all sessions
+    lock        = threading.Lock()
+
+    def __init__(self, tns, config = {}, debug = False, ping_sqlcl = False, silent = False, trace = False):
+        self.conn       = None
+        self.curs       = None
+        self.cols       = []
+        self.desc       = {}
+        self.config     = config
+        self.silent     = silent
+        self.debug      = debug
+        self.tns        = util.Attributed({'lang' : '.AL32UTF8', **tns})
+        self.tns.host   = self.tns.hostname if 'hostname' in self.tns else None
+        self.versions   = {
+            'DATABASE'  : '23.5',
+            'APEX'      : '24.1',
+        }
+        #
+        if not self.silent:
+            self.show_header()
+            util.print_pipes(self.versions)
+
+
+
+    def show_header(self):
+        util.print_header('CONNECTING TO {}, {}:'.format(self.tns.get('schema', ''), self.tns.get('env', '')))
+
+
+
+    @classmethod
+    def register(cls, query, result):
+        cls.results[query.strip()] = result
+
+
+
+    @classmethod
+    def reset(cls):
+        cls.results     = {}
+        cls.round_trips = 0
+
+
+
+    def get_result(self, query, binds):
+        with self.lock:
+            Oracle.round_trips += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        #
+        result = self.results.get(query.strip(), [])
+        if callable(result):
+            result = result(**self.get_binds(query, binds))
+        return result if result != None else []
+
+
+
+    def get_binds(self, query, binds):
+        # remove passed arguments which are not in the query
+        pass_binds = {}
+        for key, value in binds.items():
+            if ':{}'.format(key) in query:
+                pass_binds[key] = None if value == '' else value
+        return pass_binds
+
+
+
+    def set_columns(self, data):
+        if len(data) > 0 and isinstance(data[0], dict):
+            self.cols = list(data[0].keys())
+            self.desc = {col : (col.upper(),) for col in self.cols}
+
+
+
+    def sqlcl_request(self, request, root = None, silent = False):
+        if isinstance(request, list):
+            request = '\n'.join(request)
+        return self.get_result(request, {}) or ''
+
+
+
+    def fetch(self, query, limit = 0, arraysize = 5000, **binds):
+        data = self.get_result(query, binds)
+        self.set_columns(data)
+        data = [tuple(row.values()) if isinstance(row, dict) else tuple(row) for row in data]
+        #
+        return data[0:limit] if limit > 0 else data
+
+
+
+    def fetch_clob_result(self, query, **binds):
+        return self.get_result(query, binds) or ''
+
+
+
+    def fetch_assoc(self, query, limit = 0, **binds):
+        data = self.get_result(query, binds)
+        self.set_columns(data)
+        data = [util.Attributed(row) for row in data]
+        #
+        return data[0:limit] if limit > 0 else data
+
+
+
+    def iter_rows(self, query, arraysize = 5000, prefetchrows = 2, named = False, **binds):
+        return iter(self.fetch(query, **binds))
+
+
+
+    def iter_assoc(self, query, arraysize = 5000, prefetchrows = 2, **binds):
+        return iter(self.fetch_assoc(query, **binds))
+
+
+
+    def fetch_value(self, query, **binds):
+        data = self.fetch(query, limit = 1, **binds)
+        if len(data):
+            return data[0][0]
+        return None
+
+
+
+    def execute(self, query, **binds):
+        self.get_result(query, binds)
+
+
+
+    def executemany(self, query, **binds):
+        self.get_result(query, binds)
+
+
+
+    def is_alive(self):
+        self.get_result('PING', {})
+        return True
+
+
+
+    def reset_session(self):
+        self.get_result('RESET', {})
+
+
+
+    def drop_object(self, object_type, object_name):
+        self.execute('DROP {} {}'.format(object_type, object_name))
+
+
+
+    def disconnect(self):
+        pass
+
+
+
+    def commit(self):
+        pass
+
+
+
+    def rollback(self):
+        pass
+
@@ -0,0 +1,10 @@
+CREATE OR REPLACE FUNCTION get_customer_name (
+    in_customer_id      customers.customer_id%TYPE
+)
+RETURN customers.customer_name%TYPE
+AS
+BEGIN
+    RETURN NULL;  -- not implemented
+END;
+/
+
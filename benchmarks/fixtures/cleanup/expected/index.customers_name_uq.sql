@@ -0,0 +1,4 @@
+CREATE UNIQUE INDEX customers_name_uq
+    ON customers (UPPER(customer_name))
+  ;
+
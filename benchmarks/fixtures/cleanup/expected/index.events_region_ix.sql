@@ -0,0 +1,8 @@
+CREATE INDEX IF NOT EXISTS events_region_ix
+    ON events (
+        region,
+        created_at
+    )
+  LOCAL
+  ;
+
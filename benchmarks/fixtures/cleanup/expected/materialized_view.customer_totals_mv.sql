@@ -0,0 +1,20 @@
+BEGIN
+    DBMS_UTILITY.EXEC_DDL_STATEMENT('DROP MATERIALIZED VIEW CUSTOMER_TOTALS_MV');
+    DBMS_OUTPUT.PUT_LINE('--');
+    DBMS_OUTPUT.PUT_LINE('-- DROP MATERIALIZED VIEW CUSTOMER_TOTALS_MV, DONE');
+    DBMS_OUTPUT.PUT_LINE('--');
+EXCEPTION
+WHEN OTHERS THEN
+    NULL;
+END;
+/
+--
+CREATE MATERIALIZED VIEW customer_totals_mv
+BUILD IMMEDIATE
+REFRESH COMPLETE ON DEMAND
+AS
+SELECT customer_id, SUM(amount) AS total
+FROM orders_legacy
+GROUP BY customer_id;
+/
+
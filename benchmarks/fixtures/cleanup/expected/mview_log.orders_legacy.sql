@@ -0,0 +1,17 @@
+BEGIN
+    DBMS_UTILITY.EXEC_DDL_STATEMENT('DROP MATERIALIZED VIEW LOG ON ORDERS_LEGACY');
+    DBMS_OUTPUT.PUT_LINE('--');
+    DBMS_OUTPUT.PUT_LINE('-- DROP MATERIALIZED VIEW LOG ON ORDERS_LEGACY, DONE');
+    DBMS_OUTPUT.PUT_LINE('--');
+EXCEPTION
+WHEN OTHERS THEN
+    NULL;
+END;
+/
+--
+CREATE MATERIALIZED VIEW LOG ON orders_legacy
+PCTFREE 10 PCTUSED 40 INITRANS 1 MAXTRANS 255 LOGGING
+TABLESPACE users  WITH PRIMARY KEY, ROWID (amount, customer_id)
+INCLUDING NEW VALUES;
+/
+
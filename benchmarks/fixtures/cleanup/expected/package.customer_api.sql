@@ -0,0 +1,23 @@
+CREATE OR REPLACE PACKAGE customer_api AS
+
+    PROCEDURE deactivate (
+        in_customer_id      customers.customer_id%TYPE
+    );
+
+END CUSTOMER_API;
+/
+  CREATE OR REPLACE EDITIONABLE PACKAGE BODY "APP"."CUSTOMER_API" AS
+
+    PROCEDURE deactivate (
+        in_customer_id      customers.customer_id%TYPE
+    ) AS
+    BEGIN
+        UPDATE customers c
+        SET c.is_active = 'N'
+        WHERE c.customer_id = in_customer_id;
+    END;
+
+END CUSTOMER_API;
+/;
+/
+
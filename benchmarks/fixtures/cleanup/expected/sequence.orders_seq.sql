@@ -0,0 +1,5 @@
+-- DROP SEQUENCE orders_seq;
+CREATE SEQUENCE orders_seq
+    MINVALUE 1;
+/
+
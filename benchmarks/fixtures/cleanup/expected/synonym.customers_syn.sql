@@ -0,0 +1,4 @@
+CREATE OR REPLACE SYNONYM customers_syn
+    FOR other.customers;
+/
+
@@ -0,0 +1,29 @@
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id                     INTEGER               GENERATED BY DEFAULT ON NULL AS IDENTITY NOT NULL,
+    customer_name                   VARCHAR2(64 CHAR)     NOT NULL,
+    email                           VARCHAR2(256 BYTE),
+    country_id                      CHAR(2 CHAR),
+    profile                         XMLTYPE,
+    is_active                       CHAR(1 CHAR)          DEFAULT 'Y',
+    created_at                      DATE                  DEFAULT SYSDATE NOT NULL,
+    --
+    CONSTRAINT customers_is_active_ch
+        CHECK (
+            is_active IN('Y', 'N')
+        ),
+    --
+    CONSTRAINT customers_pk
+        PRIMARY KEY (customer_id),
+    --
+    CONSTRAINT customers_uq
+        UNIQUE (
+            email,
+            country_id
+        ),
+    --
+    CONSTRAINT customers_countries_fk
+        FOREIGN KEY (country_id)
+        REFERENCES countries (country_id)
+        DEFERRABLE INITIALLY DEFERRED
+   );
+
@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS events (
+    event_id                        INTEGER               NOT NULL,
+    created_at                      DATE                  NOT NULL,
+    region                          VARCHAR2(8 CHAR)
+)
+PARTITION BY RANGE (created_at) INTERVAL(NUMTOYMINTERVAL(1,'MONTH')) (
+    PARTITION p0 VALUES()
+);
+
@@ -0,0 +1,27 @@
+CREATE TABLE IF NOT EXISTS orders_legacy (
+    order_id                        NUMBER                DEFAULT orders_seq.nextval NOT NULL,
+    customer_id                     INTEGER,
+    amount                          NUMBER(12,2),
+    note                            VARCHAR2(4000 BYTE),
+    --
+    CHECK (
+        amount >= 0
+    ),
+    --
+    PRIMARY KEY (order_id),
+    --
+    FOREIGN KEY (customer_id)
+        REFERENCES customers (customer_id)
+);
+--
+CREATE INDEX IF NOT EXISTS orders_legacy_customer_ix
+    ON orders_legacy (
+        customer_id,
+        order_id
+);
+  ;
+--
+ALTER TABLE orders_legacy
+    ADD CONSTRAINT orders_legacy_note_ch
+        CHECK(note IS NOT NULL) DISABLE;
+
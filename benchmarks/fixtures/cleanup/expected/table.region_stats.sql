@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS region_stats (
+    region                          VARCHAR2(8 CHAR),
+    total                           NUMBER
+)
+PARTITION BY LIST (region) (
+    PARTITION p_eu VALUES('EU')
+);
+
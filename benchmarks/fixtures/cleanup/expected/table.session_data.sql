@@ -0,0 +1,6 @@
+CREATE GLOBAL TEMPORARY TABLE session_data (
+    session_id                      NUMBER,
+    payload                         CLOB
+)
+ON COMMIT PRESERVE ROWS;
+
@@ -0,0 +1,12 @@
+CREATE OR REPLACE TRIGGER customers_trg
+BEFORE INSERT OR UPDATE ON customers
+FOR EACH ROW
+BEGIN
+    :NEW.customer_name := UPPER(:NEW.customer_name);  -- keep names in upper case
+END;
+/
+/
+--
+ALTER TRIGGER customers_trg DISABLE;
+/
+
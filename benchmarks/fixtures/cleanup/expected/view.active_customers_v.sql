@@ -0,0 +1,9 @@
+CREATE OR REPLACE FORCE VIEW active_customers_v BEQUEATH DEFINER AS
+SELECT
+    c.customer_id,
+    c.customer_name
+FROM customers c
+WHERE c.is_active = 'Y'
+WITH READ ONLY;
+/
+
@@ -0,0 +1,11 @@
+CREATE OR REPLACE FORCE VIEW customer_orders_v AS
+SELECT 
+    c.CUSTOMER_ID,
+    c.CUSTOMER_NAME,
+    o.AMOUNT
+FROM customers c
+JOIN orders_legacy o
+    ON o.customer_id = c.customer_id
+WHERE c.is_active = 'Y';
+/
+
@@ -0,0 +1,8 @@
+CREATE OR REPLACE FORCE VIEW customers_v AS
+select
+    customer_id,
+    customer_name,
+    email
+from customers;
+/
+
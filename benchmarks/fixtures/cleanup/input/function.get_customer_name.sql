@@ -0,0 +1,9 @@
+
+  CREATE OR REPLACE NONEDITIONABLE FUNCTION "APP"."GET_CUSTOMER_NAME" (
+    in_customer_id      customers.customer_id%TYPE
+)
+RETURN customers.customer_name%TYPE
+AS
+BEGIN
+    RETURN NULL;  -- not implemented
+END;
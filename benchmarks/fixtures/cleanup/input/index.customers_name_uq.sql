@@ -0,0 +1,3 @@
+
+  CREATE UNIQUE INDEX "APP"."CUSTOMERS_NAME_UQ" ON "APP"."CUSTOMERS" (UPPER("CUSTOMER_NAME"))
+  ;
@@ -0,0 +1,5 @@
+
+  CREATE INDEX "APP"."EVENTS_REGION_IX" ON "APP"."EVENTS" ("REGION", "CREATED_AT")
+  LOCAL
+ (PARTITION "P0" )
+  ;
@@ -0,0 +1,4 @@
+
+  CREATE MATERIALIZED VIEW LOG ON "APP"."ORDERS_LEGACY"
+ PCTFREE 10 PCTUSED 40 INITRANS 1 MAXTRANS 255 LOGGING
+  TABLESPACE "USERS"  WITH PRIMARY KEY, ROWID ( "AMOUNT", "CUSTOMER_ID" ) INCLUDING NEW VALUES
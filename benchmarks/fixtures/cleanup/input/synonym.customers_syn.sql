@@ -0,0 +1,2 @@
+
+  CREATE OR REPLACE EDITIONABLE SYNONYM "APP"."CUSTOMERS_SYN" FOR "OTHER"."CUSTOMERS"
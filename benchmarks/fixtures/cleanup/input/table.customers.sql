@@ -0,0 +1,17 @@
+
+  CREATE TABLE "APP"."CUSTOMERS"
+   (	"CUSTOMER_ID" NUMBER(*,0) GENERATED BY DEFAULT ON NULL AS IDENTITY MINVALUE 1 MAXVALUE 9999999999999999999999999999 INCREMENT BY 1 START WITH 1 CACHE 20 NOORDER  NOCYCLE  NOKEEP  NOSCALE  NOT NULL ENABLE,
+	"CUSTOMER_NAME" VARCHAR2(64 CHAR) COLLATE "USING_NLS_COMP" NOT NULL ENABLE,
+	"EMAIL" VARCHAR2(256 BYTE) COLLATE "USING_NLS_COMP",
+	"COUNTRY_ID" CHAR(2 CHAR) COLLATE "USING_NLS_COMP",
+	"PROFILE" "SYS"."XMLTYPE",
+	"IS_ACTIVE" CHAR(1 CHAR) COLLATE "USING_NLS_COMP" DEFAULT 'Y',
+	"CREATED_AT" DATE DEFAULT SYSDATE NOT NULL ENABLE,
+	 CONSTRAINT "CUSTOMERS_IS_ACTIVE_CH" CHECK (is_active IN ('Y', 'N')) ENABLE,
+	 CONSTRAINT "CUSTOMERS_PK" PRIMARY KEY ("CUSTOMER_ID")
+  USING INDEX  ENABLE,
+	 CONSTRAINT "CUSTOMERS_UQ" UNIQUE ("EMAIL", "COUNTRY_ID")
+  USING INDEX  ENABLE,
+	 CONSTRAINT "CUSTOMERS_COUNTRIES_FK" FOREIGN KEY ("COUNTRY_ID")
+	  REFERENCES "APP"."COUNTRIES" ("COUNTRY_ID") DEFERRABLE INITIALLY DEFERRED ENABLE
+   )  DEFAULT COLLATION "USING_NLS_COMP" ;
@@ -0,0 +1,8 @@
+
+  CREATE TABLE "APP"."EVENTS"
+   (	"EVENT_ID" NUMBER(*,0) NOT NULL ENABLE,
+	"CREATED_AT" DATE NOT NULL ENABLE,
+	"REGION" VARCHAR2(8 CHAR) COLLATE "USING_NLS_COMP"
+   )  DEFAULT COLLATION "USING_NLS_COMP" 
+  PARTITION BY RANGE ("CREATED_AT") INTERVAL (NUMTOYMINTERVAL(1,'MONTH')) 
+ (PARTITION "P0"  VALUES LESS THAN (TO_DATE(' 2020-01-01 00:00:00', 'SYYYY-MM-DD HH24:MI:SS', 'NLS_CALENDAR=GREGORIAN')) ) ;
@@ -0,0 +1,15 @@
+
+  CREATE TABLE "APP"."ORDERS_LEGACY"
+   (	"ORDER_ID" NUMBER DEFAULT "APP"."ORDERS_SEQ"."NEXTVAL" NOT NULL ENABLE,
+	"CUSTOMER_ID" NUMBER(*,0),
+	"AMOUNT" NUMBER(12,2),
+	"NOTE" VARCHAR2(4000 BYTE),
+	 CHECK (amount >= 0) ENABLE,
+	 PRIMARY KEY ("ORDER_ID")
+  USING INDEX  ENABLE,
+	 FOREIGN KEY ("CUSTOMER_ID")
+	  REFERENCES "APP"."CUSTOMERS" ("CUSTOMER_ID") ENABLE
+   ) NO INMEMORY ;
+  CREATE INDEX "APP"."ORDERS_LEGACY_CUSTOMER_IX" ON "APP"."ORDERS_LEGACY" ("CUSTOMER_ID", "ORDER_ID")
+  ;
+ALTER TABLE "APP"."ORDERS_LEGACY" ADD CONSTRAINT "ORDERS_LEGACY_NOTE_CH" CHECK (note IS NOT NULL) DISABLE;
@@ -0,0 +1,8 @@
+
+  CREATE TABLE "APP"."REGION_STATS"
+   (	"REGION" VARCHAR2(8 CHAR) COLLATE "USING_NLS_COMP",
+	"TOTAL" NUMBER
+   )  DEFAULT COLLATION "USING_NLS_COMP" 
+  PARTITION BY LIST ("REGION")
+ (PARTITION "P_EU"  VALUES ('EU') ,
+ PARTITION "P_US"  VALUES ('US') ) ;
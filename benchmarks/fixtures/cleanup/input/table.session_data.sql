@@ -0,0 +1,5 @@
+
+  CREATE GLOBAL TEMPORARY TABLE "APP"."SESSION_DATA"
+   (	"SESSION_ID" NUMBER,
+	"PAYLOAD" CLOB COLLATE "USING_NLS_COMP"
+   ) ON COMMIT PRESERVE ROWS ;
@@ -0,0 +1,9 @@
+
+  CREATE OR REPLACE EDITIONABLE TRIGGER "APP"."CUSTOMERS_TRG"
+BEFORE INSERT OR UPDATE ON customers
+FOR EACH ROW
+BEGIN
+    :NEW.customer_name := UPPER(:NEW.customer_name);  -- keep names in upper case
+END;
+/
+ALTER TRIGGER "APP"."CUSTOMERS_TRG" DISABLE;
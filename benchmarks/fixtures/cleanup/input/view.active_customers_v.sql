@@ -0,0 +1,8 @@
+
+  CREATE OR REPLACE FORCE EDITIONABLE VIEW "APP"."ACTIVE_CUSTOMERS_V" ("CUSTOMER_ID", "CUSTOMER_NAME") DEFAULT COLLATION "USING_NLS_COMP"  BEQUEATH DEFINER AS
+  SELECT
+    c.customer_id,
+    c.customer_name
+FROM customers c
+WHERE c.is_active = 'Y'
+WITH READ ONLY
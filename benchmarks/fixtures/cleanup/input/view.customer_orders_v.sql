@@ -0,0 +1,7 @@
+
+  CREATE OR REPLACE FORCE NONEDITIONABLE VIEW "APP"."CUSTOMER_ORDERS_V" ("CUSTOMER_ID", "CUSTOMER_NAME", "AMOUNT") DEFAULT COLLATION "USING_NLS_COMP"  AS
+  SELECT c."CUSTOMER_ID",c."CUSTOMER_NAME",o."AMOUNT"
+FROM customers c
+JOIN orders_legacy o
+    ON o.customer_id = c.customer_id
+WHERE c.is_active = 'Y'
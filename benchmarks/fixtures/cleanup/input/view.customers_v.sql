@@ -0,0 +1,3 @@
+
+  CREATE OR REPLACE FORCE EDITIONABLE VIEW "APP"."CUSTOMERS_V" ("CUSTOMER_ID", "CUSTOMER_NAME", "EMAIL") DEFAULT COLLATION "USING_NLS_COMP"  AS
+  select "CUSTOMER_ID","CUSTOMER_NAME","EMAIL" from customers
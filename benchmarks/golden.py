@@ -0,0 +1,123 @@
+# coding: utf-8
+import sys, os, argparse, tempfile, glob, difflib
+#
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+#
+from lib                    import util
+from benchmarks.benchmark   import Benchmark
+from benchmarks             import synthetic_repo
+
+#
+#                                                      (R)
+#                      ---                  ---
+#                    #@@@@@@              &@@@@@@
+#                    @@@@@@@@     .@      @@@@@@@@
+#          -----      @@@@@@    @@@@@@,   @@@@@@@      -----
+#       &@@@@@@@@@@@    @@@   &@@@@@@@@@.  @@@@   .@@@@@@@@@@@#
+#           @@@@@@@@@@@   @  @@@@@@@@@@@@@  @   @@@@@@@@@@@
+#             \@@@@@@@@@@   @@@@@@@@@@@@@@@   @@@@@@@@@@
+#               @@@@@@@@@   @@@@@@@@@@@@@@@  &@@@@@@@@
+#                 @@@@@@@(  @@@@@@@@@@@@@@@  @@@@@@@@
+#                  @@@@@@(  @@@@@@@@@@@@@@,  @@@@@@@
+#                  .@@@@@,   @@@@@@@@@@@@@   @@@@@@
+#                   @@@@@@  *@@@@@@@@@@@@@   @@@@@@
+#                   @@@@@@@@@@@@@@@@@@@@@@@@@@@@@@.
+#                    @@@@@@@@@@@@@@@@@@@@@@@@@@@@@
+#                    @@@@@@@@@@@@@@@@@@@@@@@@@@@@
+#                     .@@@@@@@@@@@@@@@@@@@@@@@@@
+#                       .@@@@@@@@@@@@@@@@@@@@@
+#                            jankvetina.cz
+#                               -------
+#
+# Copyright (c) Jan Kvetina, 2024
+# https://github.com/jkvetina/ADT
+#
+
+#
+# run object cleanup from Export_DB on DDL fixtures and compare the result with expected files,
+# so changes in cleanup rules dont change the exported files by accident
+#
+# input files are named as object_type.object_name.sql (spaces in object type as underscores)
+#
+
+class Golden(Benchmark):
+
+    fixtures = os.path.dirname(os.path.realpath(__file__)) + '/fixtures/cleanup/'
+
+    def define_parser(self):
+        parser = argparse.ArgumentParser(add_help = False)
+
+        # actions and flags
+        group = parser.add_argument_group('MAIN ACTIONS')
+        group.add_argument('-only',         help = 'Check just fixtures starting with these names',                     nargs = '*')
+        group.add_argument('-accept',       help = 'Overwrite expected files with current output', action = 'store_true')
+        #
+        return parser
+
+
+
+    def __init__(self, args = None):
+        self.args       = util.Attributed(vars(self.define_parser().parse_args(args = args)))
+        self.args.workers = 1
+        self.root       = util.fix_path(tempfile.mkdtemp(prefix = 'adt_golden_'))
+        self.results    = []
+
+        # small repo just to have config and connection for the exporter
+        cwd = os.getcwd()
+        try:
+            self.objects = synthetic_repo.create_repo(self.root, 10, commits = 1)
+            self.set_results()
+            os.chdir(self.root)
+            self.check_fixtures(self.get_exporter())
+        finally:
+            os.chdir(cwd)
+            util.delete_folder(self.root)
+        #
+        util.print_header('RESULTS:')
+        util.print_table(self.results)
+        print()
+        #
+        failed = [row['fixture'] for row in self.results if row['status'] in ('CHANGED', 'MISSING')]
+        if failed:
+            util.print_header('CLEANUP OUTPUT CHANGED:', ', '.join(failed))
+            print()
+            sys.exit(1)     # unlike raise_error, so it can be used as a check
+
+
+
+    def check_fixtures(self, exp):
+        util.print_header('CLEANUP FIXTURES:')
+        print()
+        #
+        for file in sorted(glob.glob(self.fixtures + 'input/*.sql')):
+            fixture = os.path.basename(file)
+            if self.args.only and not any(fixture.startswith(name) for name in self.args.only):
+                continue
+            #
+            object_type, object_name = fixture.split('.')[0:2]
+            object_type     = object_type.replace('_', ' ').upper()
+            object_name     = object_name.upper()
+            output          = self.quiet(exp.export_object, object_type, object_name, payload = util.get_file_content(file))
+            expected_file   = self.fixtures + 'expected/' + fixture
+            expected        = util.get_file_content(expected_file) if os.path.exists(expected_file) else None
+            #
+            if self.args.accept and output != expected:
+                util.write_file(expected_file, output)
+                status = 'UPDATED'
+            elif expected == None:
+                status = 'MISSING'
+            elif output != expected:
+                status = 'CHANGED'
+                print(''.join(difflib.unified_diff(expected.splitlines(True), output.splitlines(True), 'expected/' + fixture, 'output/' + fixture)))
+            else:
+                status = 'OK'
+            #
+            self.results.append({
+                'fixture'   : fixture,
+                'status'    : status,
+            })
+
+
+
+if __name__ == '__main__':
+    Golden()
@@ -0,0 +1,272 @@
+# coding: utf-8
+import sys, os
+#
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+#
+import git          # pip3 install GitPython    --upgrade
+#
+from lib import util
+
+#
+# generator of synthetic repositories and database outputs for the benchmarks
+#
+
+schema_name     = 'APP'
+env_name        = 'BENCH'
+patch_code      = 'BENCH'
+app_id          = 100
+app_alias       = 'BENCH'
+
+# object types in the order they are generated, with the folder and the file extension
+object_types = {
+    'TABLE'         : ['tables/',       '.sql'],
+    'INDEX'         : ['indexes/',      '.sql'],
+    'SEQUENCE'      : ['sequences/',    '.sql'],
+    'VIEW'          : ['views/',        '.sql'],
+    'TRIGGER'       : ['triggers/',     '.sql'],
+    'PACKAGE'       : ['packages/',     '.spec.sql'],
+    'PACKAGE BODY'  : ['packages/',     '.sql'],
+    'PROCEDURE'     : ['procedures/',   '.sql'],
+    'FUNCTION'      : ['functions/',    '.sql'],
+    'SYNONYM'       : ['synonyms/',     '.sql'],
+}
+
+# objects changed in commits after the initial one, tables are left out on purpose,
+# because changed tables need the table diff on a real database
+changing_types = ['VIEW', 'TRIGGER', 'PACKAGE', 'PACKAGE BODY', 'PROCEDURE', 'FUNCTION']
+
+# outputs of DBMS_METADATA.GET_DDL
+templates = {
+    'TABLE': '''
+  CREATE TABLE "{schema}"."{name}"
+   (	"ID" NUMBER(*,0) GENERATED BY DEFAULT ON NULL AS IDENTITY MINVALUE 1 MAXVALUE 9999999999999999999999999999 INCREMENT BY 1 START WITH 1 CACHE 20 NOORDER  NOCYCLE  NOKEEP  NOSCALE  NOT NULL ENABLE,
+{columns}
+	"CREATED_AT" DATE DEFAULT SYSDATE,
+	 CONSTRAINT "{name}_PK" PRIMARY KEY ("ID")
+  USING INDEX  ENABLE,
+	 CONSTRAINT "{name}_CH" CHECK (name = UPPER(name)) ENABLE
+   )  DEFAULT COLLATION "USING_NLS_COMP" {partitions};''',
+    #
+    'INDEX': '''
+  CREATE UNIQUE INDEX "{schema}"."{name}" ON "{schema}"."{base}" ("NAME", "ID")
+  ;''',
+    #
+    'SEQUENCE': '''
+   CREATE SEQUENCE  "{schema}"."{name}"  MINVALUE 1 MAXVALUE 9999999999999999999999999999 INCREMENT BY 1 START WITH 1001 CACHE 20 NOORDER  NOCYCLE  NOKEEP  NOSCALE  GLOBAL ;''',
+    #
+    'VIEW': '''
+  CREATE OR REPLACE FORCE EDITIONABLE VIEW "{schema}"."{name}" ("ID", "NAME") DEFAULT COLLATION "USING_NLS_COMP"  AS
+  SELECT t.id, t.name
+FROM {base} t
+WHERE t.id > 0
+''',
+    #
+    'TRIGGER': '''
+  CREATE OR REPLACE EDITIONABLE TRIGGER "{schema}"."{name}"
+BEFORE INSERT ON {base}
+FOR EACH ROW
+BEGIN
+    :NEW.id := NVL(:NEW.id, 1);
+END;
+/
+ALTER TRIGGER "{schema}"."{name}" ENABLE;''',
+    #
+    'PACKAGE': '''
+  CREATE OR REPLACE EDITIONABLE PACKAGE "{schema}"."{name}" AS
+    PROCEDURE run;
+END;
+/''',
+    #
+    'PACKAGE BODY': '''
+  CREATE OR REPLACE EDITIONABLE PACKAGE BODY "{schema}"."{name}" AS
+    PROCEDURE run AS
+    BEGIN
+        UPDATE {base} SET name = UPPER(name);
+    END;
+END;
+/''',
+    #
+    'PROCEDURE': '''
+  CREATE OR REPLACE EDITIONABLE PROCEDURE "{schema}"."{name}" AS
+BEGIN
+    DELETE FROM {base} WHERE id < 0;
+END;
+/''',
+    #
+    'FUNCTION': '''
+  CREATE OR REPLACE EDITIONABLE FUNCTION "{schema}"."{name}" RETURN NUMBER AS
+BEGIN
+    RETURN 1;
+END;
+/''',
+    #
+    'SYNONYM': '''
+  CREATE OR REPLACE EDITIONABLE SYNONYM "{schema}"."{name}" FOR "OTHER"."{base}"''',
+}
+
+# every 50th table is wide and partitioned
+wide_table_each     = 50
+wide_table_columns  = 300
+
+
+
+def get_objects(count):
+    # spread requested number of objects over the object types
+    objects = []
+    types   = list(object_types.keys())
+    for i in range(count):
+        object_type = types[i % len(types)]
+        if object_type == 'PACKAGE BODY':
+            object_name = objects[-1][1]    # body for the previous package
+        else:
+            object_name = '{}_{:05d}'.format(object_type.split(' ')[0][0:3], i)
+        objects.append((object_type, object_name))
+    return objects
+
+
+
+def get_ddl(object_type, object_name):
+    base        = 'TAB_{:05d}'.format(util.extract_int(r'(\d+)$', object_name) or 0)
+    columns     = 20
+    partitions  = ''
+    #
+    if object_type == 'TABLE' and (util.extract_int(r'(\d+)$', object_name) or 0) % wide_table_each == 0:
+        columns     = wide_table_columns
+        partitions  = '\n  PARTITION BY RANGE ("CREATED_AT") INTERVAL (NUMTOYMINTERVAL(1,\'MONTH\')) \n (PARTITION "P0"  VALUES LESS THAN (TO_DATE(\' 2020-01-01 00:00:00\', \'SYYYY-MM-DD HH24:MI:SS\', \'NLS_CALENDAR=GREGORIAN\')) ) '
+    #
+    return templates[object_type].format(
+        schema      = schema_name,
+        name        = object_name,
+        base        = base,
+        partitions  = partitions,
+        columns     = '\n'.join(['\t"COL_{:03d}" VARCHAR2(64 CHAR) COLLATE "USING_NLS_COMP", '.format(i) for i in range(columns)]),
+    )
+
+
+
+def get_file(object_type, object_name):
+    folder, ext = object_types[object_type]
+    return 'database/{}{}{}'.format(folder, object_name.lower(), ext)
+
+
+
+def create_repo(root, count, commits = 10):
+    root = util.fix_path(os.path.abspath(root))
+    util.delete_folder(root)
+    os.makedirs(root + 'config/', exist_ok = True)
+
+    # connection details and config overrides to run ADT in this repo
+    util.write_file(root + 'config/connections.yaml', payload = {
+        env_name: {
+            'db': {
+                'hostname'  : 'localhost',
+                'port'      : 1521,
+                'service'   : 'BENCH',
+            },
+            'defaults': {
+                'schema_apex'   : schema_name,
+                'schema_db'     : schema_name,
+            },
+            'schemas': {
+                schema_name: {
+                    'db'    : {'user' : schema_name, 'pwd' : 'bench'},
+                    'apex'  : {'workspace' : env_name, 'app' : app_id},
+                },
+            },
+        },
+    }, yaml = True)
+    #
+    util.write_file(root + 'config/config.yaml', payload = {
+        'check_new_versions'    : False,
+        'chime_theme'           : '',
+        'default_env'           : env_name,
+        'default_schema'        : schema_name,
+    }, yaml = True)
+    #
+    util.write_file(root + 'config/apex_apps.yaml', payload = {
+        app_id: {
+            'app_id'        : app_id,
+            'app_alias'     : app_alias,
+            'app_name'      : 'Benchmark',
+            'app_group'     : '',
+            'workspace'     : env_name,
+        },
+    }, yaml = True)
+    util.write_file(root + '.gitignore', '.temp.nosync/\nconfig/commits/\npatch/\n')
+
+    # initial commit with all objects
+    repo = git.Repo.init(root)
+    with repo.config_writer() as git_config:
+        git_config.set_value('user', 'name', 'Benchmark')
+        git_config.set_value('user', 'email', 'bench@example.com')
+    repo.create_remote('origin', 'https://example.com/bench.git')
+    #
+    objects = get_objects(count)
+    for object_type, object_name in objects:
+        util.write_file(root + get_file(object_type, object_name), get_ddl(object_type, object_name).strip() + '\n')
+    #
+    repo.git.add('-A')
+    repo.git.commit('-m', 'Initial objects', '--quiet')
+
+    # commits for the patch, each one changes a different slice of objects,
+    # with more commits than objects some objects are changed repeatedly
+    changing = [obj for obj in objects if obj[0] in changing_types]
+    for i in range(commits):
+        for object_type, object_name in (changing[i::commits] or [changing[i % len(changing)]]):
+            util.write_file(root + get_file(object_type, object_name), '-- {}-{}\n'.format(patch_code, i + 1), mode = 'at')
+        #
+        repo.git.add('-A')
+        repo.git.commit('-m', '{}-{} change objects'.format(patch_code, i + 1), '--quiet')
+    #
+    return objects
+
+
+
+def create_apex_export(sqlcl_root, count):
+    # mimic SQLcl output of split and readable APEX export
+    util.write_file('{}/f{}.sql'.format(sqlcl_root.rstrip('/'), app_id), '''prompt --application/set_environment
+begin
+wwv_flow_imp.import_begin (
+ p_version_yyyy_mm_dd=>'2024.05.31'
+,p_default_workspace_id=>1000
+,p_default_application_id=>{}
+,p_default_id_offset=>123456789
+,p_default_owner=>'{}'
+);
+end;
+/
+'''.format(app_id, schema_name))
+    #
+    for file, payload in get_apex_files(app_id, count):
+        util.write_file('{}/{}'.format(sqlcl_root.rstrip('/'), file), payload)
+
+
+
+def get_apex_files(app_id, count):
+    # files of split and readable APEX export, as they come from the export collection
+    page = '''prompt --application/pages/page_{page:05d}
+begin
+wwv_flow_imp_page.create_page(
+ p_id=>{page}
+,p_name=>'Page {page}'
+,p_default_id_offset=>123456789
+,p_last_updated_by=>'DEVELOPER'
+,p_last_upd_yyyymmddhh24miss=>'20240101120000'
+);
+end;
+/
+'''
+    source_dir  = 'f{}/'.format(app_id)
+    files       = []
+    for i in range(1, count + 1):
+        if i % 2:
+            files.append((source_dir + 'application/pages/page_{:05d}.sql'.format(i), page.format(page = i)))
+            files.append((source_dir + 'readable/application/pages/p{:05d}.json'.format(i), '{{"id": {}}}\n'.format(i)))
+        else:
+            files.append((source_dir + 'application/shared_components/logic/application_items/item_{:05d}.sql'.format(i), page.format(page = i)))
+    #
+    files.append((source_dir + 'install.sql', 'prompt --install\n'))
+    files.append((source_dir + 'application/create_application.sql', 'prompt --application/create_application\n'))
+    files.append((source_dir + 'readable/application/f{}.json'.format(app_id), '{}\n'))
+    return files
+
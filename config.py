@@ -11,6 +11,7 @@ import requests     # pip3 install requests     --upgrade
 import git          # pip3 install GitPython    --upgrade
 #
 from lib import wrapper
+from lib import blobs
 from lib import util
 from lib import messages
 from lib import queries as query
@@ -126,6 +127,13 @@ class Config(util.Attributed):
         },
     }
 
+    # database sessions shared by all programs in the same process
+    sessions        = {}
+    session_keys    = ['env', 'schema', 'user', 'proxy', 'hostname', 'port', 'service', 'sid', 'wallet', 'thick']
+
+    # results of is_usable_file by repo and file
+    usable_files    = {}
+
     # move some command line args to info group
     info_attributes = [
         'repo',
@@ -203,6 +211,7 @@ class Config(util.Attributed):
             group.add_argument('-verbose',      help = 'Show more details',                         type = util.is_boolean, nargs = '?', const = True,  default = False)
             group.add_argument('-debug',        help = 'Show even more details and exceptions',     type = util.is_boolean, nargs = '?', const = True,  default = False)
             group.add_argument('-go',           help = 'When you need to run without args',         type = util.is_boolean, nargs = '?', const = True,  default = False)
+            group.add_argument('-trace',        help = 'Show slowest queries and store trace file', type = util.is_boolean, nargs = '?', const = True,  default = False)
 
             # cleanup junk files created on Mac by iCloud sync
             util.remove_cloud_junk()
@@ -299,12 +308,13 @@ class Config(util.Attributed):
         self.dependencies       = {}
         self.objects_todo       = []
         self.objects_processed  = []
-        self.objects_path       = []
+        self.objects_cycles     = []
         self.all_objects_sorted = []
         self.apex_apps          = {}
 
         # some helping files
         self.dependencies_file  = '{}/config/db_dependencies.yaml'.format(self.repo_root)
+        self.manifest_file      = '{}/config/db_manifest_#SCHEMA_NAME#.yaml'.format(self.repo_root)
         self.timers_file        = '{}/config/apex_timers.yaml'.format(self.repo_root)
         self.developers_file    = '{}/config/apex_developers.yaml'.format(self.repo_root)
         self.apex_apps_file     = '{}/config/apex_apps.yaml'.format(self.repo_root)
@@ -361,6 +371,8 @@ class Config(util.Attributed):
 
     def __del__(self):
         if 'start_timer' in self and self.start_timer:
+            if len(wrapper.Oracle.traces) > 0:
+                wrapper.Oracle.show_trace(top = self.config.get('db_trace_top') or 10, file = self.config.get('db_trace_file'))
             print('\nTIMER: {}s\n'.format(int(round(timeit.default_timer() - self.start_timer + 0.5, 0))))
 
 
@@ -576,14 +588,30 @@ class Config(util.Attributed):
 
 
 
-    def db_connect(self, ping_sqlcl = False, silent = False):
-        conn = wrapper.Oracle(
-            tns         = dict(self.connection),
-            config      = self.config,
-            debug       = self.debug,
-            ping_sqlcl  = ping_sqlcl,
-            silent      = silent
-        )
+    def db_connect(self, ping_sqlcl = False, silent = False, reuse = True):
+        # reuse healthy session for the same env and schema
+        key     = tuple([str(self.connection.get(arg) or '') for arg in self.session_keys])
+        conn    = self.sessions.get(key) if reuse else None
+        #
+        if conn and (not conn.is_alive() or (ping_sqlcl and not ('SQLCL' in conn.versions))):
+            conn = None
+        #
+        if conn:
+            if not silent:
+                conn.show_header()
+                util.print_pipes(conn.versions)
+        else:
+            conn = wrapper.Oracle(
+                tns         = dict(self.connection),
+                config      = self.config,
+                debug       = self.debug,
+                ping_sqlcl  = ping_sqlcl,
+                silent      = silent,
+                trace       = self.args.get('trace') or self.config.get('db_trace') or False
+            )
+            if reuse:
+                self.sessions[key] = conn
+        #
         self.objects_prefix = conn.tns.get('prefix')    or ''
         self.objects_ignore = conn.tns.get('ignore')    or ''
         self.objects_folder = conn.tns.get('subfolder') or ''
@@ -767,6 +795,15 @@ class Config(util.Attributed):
 
 
     def is_usable_file(self, file):
+        # same files are checked over and over, paths are changed for each schema in export
+        key = (self.repo_root, self.config.path_objects, self.config.path_apex, self.config.apex_path_files, self.config.patch_scripts_snap, file)
+        if not (key in Config.usable_files):
+            Config.usable_files[key] = self.is_usable_file__(file)
+        return Config.usable_files[key]
+
+
+
+    def is_usable_file__(self, file):
         file = file.replace(self.repo_root, '')
 
         # skip embedded code report files
@@ -793,39 +830,71 @@ class Config(util.Attributed):
 
 
 
+    def get_usable_paths(self):
+        # folders with usable files to limit Git diffs, nothing if some folder is not known
+        paths = [self.config.path_objects, self.config.path_apex, self.config.patch_scripts_snap]
+        for path in paths:
+            if not path or '{$' in path or path.startswith('/'):
+                return None
+        return paths
+
+
+
     def sort_objects(self, todo = []):
         if todo != []:
             self.objects_todo = todo
         self.objects_processed  = []
-        self.objects_path       = []
+        self.objects_cycles     = []
+        #
+        processed   = set()
+        path        = set()     # objects with explored dependencies
         #
         for obj_code in self.objects_todo:
-            self.sort_objects__(obj_code)
+            # same order as recursive walk, but with explicit stack
+            stack = [(obj_code, '', iter(self.dependencies.get(obj_code, [])))]
+            while stack:
+                curr, caller, deps = stack[-1]
+                for obj in deps:
+                    if obj in path or obj in processed or obj in (caller, curr):
+                        if not (obj in processed):
+                            self.add_cycle([frame[0] for frame in stack], obj)
+                        continue
+                    #
+                    path.add(curr)
+                    stack.append((obj, curr, iter(self.dependencies.get(obj, []))))
+                    break
+                else:
+                    stack.pop()
+                    if not (curr in processed):
+                        processed.add(curr)
+                        self.objects_processed.append(curr)
         #
         return self.objects_processed
 
 
 
-    def sort_objects__(self, obj_code, caller = '', level = 0):
-        level = level + 1
-        if caller != '':
-            self.objects_path.append(caller)
-        #
-        for obj in self.dependencies.get(obj_code, []):
-            if (obj in self.objects_path or obj in self.objects_processed or obj == caller):
-                continue
-            #
-            self.sort_objects__(obj, caller = obj_code, level = level)
-        #
-        if not (obj_code in self.objects_processed):
-            self.objects_processed.append(obj_code)
+    def add_cycle(self, stack, obj_code):
+        # report circular dependency as a chain of objects
+        cycle = ' > '.join(stack[stack.index(obj_code):] + [obj_code])
+        if not (cycle in self.objects_cycles):
+            self.objects_cycles.append(cycle)
+
+
+
+    def get_objects_rank(self):
+        # position of objects in sorted list, refreshed when the list is replaced
+        if self.get('objects_rank_src') is not self.all_objects_sorted:
+            self.objects_rank_src   = self.all_objects_sorted
+            self.objects_rank       = {}
+            for index, obj_code in enumerate(self.all_objects_sorted):
+                self.objects_rank.setdefault(obj_code, index)
+        return self.objects_rank
 
 
 
     def sort_files_by_deps(self, files):
-        out_files   = []
         todo        = []
-        indexes     = []
+        rank        = self.get_objects_rank()
 
         # sort files by dependencies
         for file in files:
@@ -839,20 +908,14 @@ class Config(util.Attributed):
             if not ('object_code' in obj):
                 continue
             #
-            if obj['object_code'] in self.all_objects_sorted:
-                index   = self.all_objects_sorted.index(obj['object_code'])
-            else:
+            index = rank.get(obj['object_code'])
+            if index == None:
                 index   = 1000000 + len(self.obj_not_found)
                 self.obj_not_found.append(obj['object_code'])
             #
-            todo.append(file)
-            indexes.append(index)
-        #
-        for file in [x for _, x in sorted(zip(indexes, todo))]:
-            if not (file in out_files):
-                out_files.append(file)
+            todo.append((index, file))
         #
-        return out_files
+        return list(dict.fromkeys(file for _, file in sorted(todo)))
 
 
 
@@ -978,6 +1041,7 @@ class Config(util.Attributed):
         try:
             self.repo       = git.Repo(repo_root)
             self.repo_url   = self.repo.remotes[0].url
+            self.blobs      = blobs.Blobs(self.repo)
             if self.repo.bare:
                 raise Exception()
         except:
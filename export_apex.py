@@ -1,5 +1,5 @@
 # coding: utf-8
-import sys, os, re, argparse, datetime
+import sys, os, re, argparse, datetime, copy, queue
 from multiprocessing.pool import ThreadPool
 #
 import config
@@ -34,6 +34,18 @@ from lib import queries_export_apex as query
 
 class Export_APEX(config.Config):
 
+    # export actions in the order of execution
+    todo = [
+        {'action' : 'recent',       'header' : '  CHANGED COMPONENTS' },
+        {'action' : 'full',         'header' : '  FULL APP EXPORT' },
+        {'action' : 'split',        'header' : '  SPLIT COMPONENTS' },
+        {'action' : 'readable',     'header' : '  READABLE COMPONENTS' },
+        {'action' : 'embedded',     'header' : '  EMBEDDED CODE REPORT' },
+        {'action' : 'rest',         'header' : '  REST SERVICES' },
+        {'action' : 'files',        'header' : '  APPLICATION FILES' },
+        {'action' : 'files_ws',     'header' : '  WORKSPACE FILES' },
+    ]
+
     def define_parser(self):
         parser = argparse.ArgumentParser(add_help = False)
 
@@ -53,6 +65,7 @@ class Export_APEX(config.Config):
         group.add_argument('-fetch',        help = 'Fetch Git changes before patching',                             nargs = '?', const = True, default = False)
         group.add_argument('-reveal',       help = 'Reveal APEX workspaces and/or apps',                            nargs = '?', const = True, default = False)
         group.add_argument('-release',      help = 'To export as specific release',                                 nargs = '?')
+        group.add_argument('-parallel',     help = 'Export apps at the same time',          type = int,             nargs = '?', const = os.cpu_count(), default = 1)
         #
         group = parser.add_argument_group('NEGATING ACTIONS')
         group.add_argument('-nofull',       help = 'Skip full export',                                              nargs = '?', const = True, default = False)
@@ -157,75 +170,82 @@ class Export_APEX(config.Config):
         if len(self.apex_apps) == 0:
             util.print_warning('NO APEX APPS FOUND')
 
-        # for each requested app
-        for app_id in sorted(self.apex_apps.keys()):
-            if not (app_id in self.arg_apps):
-                continue
-            #
-            self.get_enrichments(app_id)
-            #
-            util.delete_folder('{}f{}/'.format(self.config.sqlcl_root, app_id))
-            self.get_comments(app_id)
+        # for each requested app, independent apps can be exported at the same time
+        apps    = [app_id for app_id in sorted(self.apex_apps.keys()) if app_id in self.arg_apps]
+        workers = min(self.args.get('parallel') or 1, len(apps))
+        #
+        if workers > 1 and not self.debug:
+            self.export_apps(apps, workers)
+        else:
+            for app_id in apps:
+                if not self.export_app(app_id):
+                    return
 
-            # show recent changes
-            if self.arg_recent > 0:
-                self.show_recent_changes(app_id)
+        # cleanup temp folder
+        #if not self.debug and os.path.exists(self.config.sqlcl_root):
+        #    util.delete_folder(self.config.sqlcl_root)
 
-            util.print_header('APP {}/{}, EXPORTING:'.format(app_id, self.apex_apps[app_id]['app_alias']))
-            self.conn.execute(query.apex_export_start, app_id = app_id)
 
-            if self.debug:
-                data = self.conn.fetch_assoc('SELECT attribute, value FROM session_context WHERE namespace = \'APEX$SESSION\' ORDER BY 1')
-                util.print_header('SESSION_CONTEXT')
-                util.print_table(data)
 
-            # get default authentication scheme
-            self.auth_scheme_id     = 0
-            self.auth_scheme_name   = ''
-            #
-            if len(self.config.apex_authentication) > 0:
-                for row in self.conn.fetch_assoc(query.apex_authentication_schemes, app_id = app_id):
-                    if self.config.apex_authentication in row.authentication_name:
-                        self.auth_scheme_id     = row.authentication_id
-                        self.auth_scheme_name   = row.authentication_name
+    def export_app(self, app_id):
+        self.prepare_app(app_id)
+        #
+        util.print_header('APP {}/{}, EXPORTING:'.format(app_id, self.apex_apps[app_id]['app_alias']))
+        self.conn.execute(query.apex_export_start, app_id = app_id)
 
-            # create folders
-            os.makedirs(os.path.dirname(self.get_root(app_id)), exist_ok = True)
+        if self.debug:
+            data = self.conn.fetch_assoc('SELECT attribute, value FROM session_context WHERE namespace = \'APEX$SESSION\' ORDER BY 1')
+            util.print_header('SESSION_CONTEXT')
+            util.print_table(data)
 
-            # create a queue
-            todo = [
-                {'action' : 'recent',       'header' : '  CHANGED COMPONENTS' },
-                {'action' : 'full',         'header' : '  FULL APP EXPORT' },
-                {'action' : 'split',        'header' : '  SPLIT COMPONENTS' },
-                {'action' : 'readable',     'header' : '  READABLE COMPONENTS' },
-                {'action' : 'embedded',     'header' : '  EMBEDDED CODE REPORT' },
-                {'action' : 'rest',         'header' : '  REST SERVICES' },
-                {'action' : 'files',        'header' : '  APPLICATION FILES' },
-                {'action' : 'files_ws',     'header' : '  WORKSPACE FILES' },
-            ]
-            for row in todo:
-                action = row['action']
-                if self.actions[action]:
-                    if not (app_id in self.timers):
-                        self.timers[app_id] = {}
-                    if not (action in self.timers[app_id]):
-                        self.timers[app_id][action] = 0
-                    #
-                    progress_target = self.timers[app_id][action] or 999
-                    progress_done   = 0
-                    start           = util.get_start()
-                    #
-                    export_fn       = 'export_' + action
-                    if not (hasattr(self.__class__, export_fn) and callable(getattr(self, export_fn))):
-                        continue
+        # get default authentication scheme
+        self.get_auth_scheme(app_id)
+
+        # create folders
+        os.makedirs(os.path.dirname(self.get_root(app_id)), exist_ok = True)
+
+        # go thru the queue
+        for row in self.todo:
+            action = row['action']
+            if self.actions[action]:
+                progress_target = self.get_timer(app_id, action) or 999
+                progress_done   = 0
+                start           = util.get_start()
+                #
+                export_fn       = 'export_' + action
+                if not (hasattr(self.__class__, export_fn) and callable(getattr(self, export_fn))):
+                    continue
 
-                    # check if we actually have some recent changes to export
-                    if action == 'recent' and self.recent_count == 0:
-                        continue
+                # check if we actually have some recent changes to export
+                if action == 'recent' and self.recent_count == 0:
+                    continue
 
-                    # execute in a thread so we can show progress in main process
-                    if self.debug:
-                        getattr(self, export_fn)(app_id)
+                # execute in a thread so we can show progress in main process
+                if self.debug:
+                    getattr(self, export_fn)(app_id)
+
+                    # cleanup files
+                    cleanup_fn = 'cleanup_' + action
+                    if hasattr(self.__class__, cleanup_fn) and callable(getattr(self, cleanup_fn)):
+                        getattr(self, 'cleanup_' + action)(app_id)
+
+                    # move files from temp folders right away after each block
+                    self.move_files(app_id)
+
+                else:
+                    with ThreadPool(processes = 1) as pool:
+                        result = pool.apply_async(getattr(self, export_fn), [app_id])
+                        while True:
+                            try:
+                                if result.ready():
+                                    break
+                                #
+                                progress_done = util.print_progress(progress_done, progress_target, extra = row['header'], start = start)
+                                result.wait(1)      # refresh progress every second, but dont wait when finished
+                                #
+                            except KeyboardInterrupt:
+                                print('\n')
+                                return False
 
                         # cleanup files
                         cleanup_fn = 'cleanup_' + action
@@ -235,47 +255,157 @@ class Export_APEX(config.Config):
                         # move files from temp folders right away after each block
                         self.move_files(app_id)
 
-                    else:
-                        with ThreadPool(processes = 1) as pool:
-                            result = pool.apply_async(getattr(self, export_fn), [app_id])
-                            while True:
-                                try:
-                                    if result.ready():
-                                        break
-                                    #
-                                    progress_done = util.print_progress(progress_done, progress_target, extra = row['header'], start = start, sleep = 1)
-                                    #
-                                except KeyboardInterrupt:
-                                    print('\n')
-                                    return
-
-                            # cleanup files
-                            cleanup_fn = 'cleanup_' + action
+                        # finish the progress
+                        if progress_done != -1:
+                            util.print_progress_done(extra = row['header'], start = start)
+
+                # update timers
+                self.set_timer(app_id, action, util.get_start() - start)
+
+        # move files from temp folders to target folders
+        self.move_files(app_id)
+        self.move_ws_files()
+        self.store_timers()
+        print()
+        return True
+
+
+
+    def export_apps(self, apps, workers):
+        # prepare apps one by one, so the output is not mixed,
+        # every app gets its own copy of the exporter to keep app specific attributes apart
+        exporters = {}
+        for app_id in apps:
+            exporter = copy.copy(self)
+            exporter.start_timer    = None      # just the main program shows timer and trace on exit
+            exporter.comp_changed   = []
+            exporter.prepare_app(app_id)
+            #
+            self.conn.execute(query.apex_export_start, app_id = app_id)
+            exporter.get_auth_scheme(app_id)
+            os.makedirs(os.path.dirname(self.get_root(app_id)), exist_ok = True)
+            exporters[app_id] = exporter
+
+        # REST services and workspace files are not app specific, export them just once at the end
+        actions = []
+        for row in self.todo:
+            if self.actions[row['action']] and not (row['action'] in ('rest', 'files_ws')) and hasattr(self.__class__, 'export_' + row['action']):
+                actions.append(row['action'])
+
+        # open extra sessions, one for each worker
+        sessions = queue.Queue()
+        conns    = []
+        for i in range(workers):
+            conn = self.db_connect(ping_sqlcl = False, silent = True, reuse = False)
+            conns.append(conn)
+            sessions.put(conn)
+
+        # estimate time for all apps from previous runs
+        progress_target = sum([self.get_timer(app_id, action) for app_id in apps for action in actions]) / workers or 999
+        progress_done   = 0
+        start           = util.get_start()
+        #
+        util.print_header('APPS {}, EXPORTING WITH {} SESSIONS:'.format(', '.join([str(app_id) for app_id in apps]), workers))
+        try:
+            with ThreadPool(processes = workers) as pool:
+                results = {app_id : pool.apply_async(self.export_app_worker, [exporters[app_id], app_id, actions, sessions]) for app_id in apps}
+
+                # move files from temp folders in the order of apps, so the repo ends the same way as without parallel
+                for app_id in apps:
+                    exporter = exporters[app_id]
+                    header   = '  APP {}/{}'.format(app_id, self.apex_apps[app_id]['app_alias'])
+                    #
+                    while not results[app_id].ready():
+                        try:
+                            progress_done = util.print_progress(progress_done, progress_target, extra = header, start = start)
+                            results[app_id].wait(1)
+                        except KeyboardInterrupt:
+                            print('\n')
+                            return
+                    #
+                    # workspace offset is found in the first cleaned file and reused for next apps, as without parallel,
+                    # workers only export files, so it is enough to pass it along here
+                    exporter.workspace_offset = self.workspace_offset
+                    #
+                    app_start, timers = results[app_id].get()
+                    for action in actions:
+                        if action in timers:
+                            cleanup_start   = util.get_start()
+                            cleanup_fn      = 'cleanup_' + action
                             if hasattr(self.__class__, cleanup_fn) and callable(getattr(self, cleanup_fn)):
-                                getattr(self, 'cleanup_' + action)(app_id)
+                                getattr(exporter, cleanup_fn)(app_id)
+                            #
+                            self.set_timer(app_id, action, timers[action] + util.get_start() - cleanup_start)
+                    #
+                    self.workspace_offset = exporter.workspace_offset
+                    exporter.move_files(app_id)
+                    exporter.move_ws_files()
+                    self.store_timers()
+                    util.print_progress_done(extra = header, start = app_start)
+        finally:
+            for conn in conns:
+                conn.disconnect()
+
+        # shared exports with the context of the last app, as without parallel
+        exporter        = exporters[apps[-1]]
+        exporter.conn   = self.conn
+        for row in self.todo:
+            if self.actions[row['action']] and row['action'] in ('rest', 'files_ws'):
+                start = util.get_start()
+                getattr(exporter, 'export_' + row['action'])(apps[-1])
+                util.print_progress_done(extra = row['header'], start = start)
+                self.set_timer(apps[-1], row['action'], util.get_start() - start)
+        #
+        exporter.move_ws_files()
+        self.store_timers()
+        print()
+
+
+
+    def export_app_worker(self, exporter, app_id, actions, sessions):
+        # export app in its own session with its own APEX context, return time spent on each action
+        conn = sessions.get()
+        try:
+            exporter.conn = conn
+            conn.execute(query.apex_security_context_raw, workspace = self.apex_apps[app_id]['workspace'])
+            conn.execute(query.apex_export_start, app_id = app_id)
+            #
+            app_start   = util.get_start()
+            timers      = {}
+            for action in actions:
+                if action == 'recent' and exporter.recent_count == 0:
+                    continue
+                #
+                start = util.get_start()
+                getattr(exporter, 'export_' + action)(app_id)
+                timers[action] = util.get_start() - start
+            return (app_start, timers)
+        finally:
+            sessions.put(conn)
 
-                            # move files from temp folders right away after each block
-                            self.move_files(app_id)
 
-                            # finish the progress
-                            if progress_done != -1:
-                                util.print_progress_done(extra = row['header'], start = start)
 
-                    # update timers
-                    timer = util.get_start() - start
-                    if self.timers[app_id][action] > 0:
-                        timer = (timer + self.timers[app_id][action]) / 2
-                    self.timers[app_id][action] = round(timer, 2)
+    def prepare_app(self, app_id):
+        self.get_enrichments(app_id)
+        #
+        util.delete_folder('{}f{}/'.format(self.config.sqlcl_root, app_id))
+        self.get_comments(app_id)
 
-            # move files from temp folders to target folders
-            self.move_files(app_id)
-            self.move_ws_files()
-            self.store_timers()
-            print()
+        # show recent changes
+        if self.arg_recent > 0:
+            self.show_recent_changes(app_id)
 
-        # cleanup temp folder
-        #if not self.debug and os.path.exists(self.config.sqlcl_root):
-        #    util.delete_folder(self.config.sqlcl_root)
+
+
+    def get_auth_scheme(self, app_id):
+        self.auth_scheme_id     = 0
+        self.auth_scheme_name   = ''
+        #
+        if len(self.config.apex_authentication) > 0:
+            for row in self.conn.fetch_assoc(query.apex_authentication_schemes, app_id = app_id):
+                if self.config.apex_authentication in row.authentication_name:
+                    self.auth_scheme_id     = row.authentication_id
+                    self.auth_scheme_name   = row.authentication_name
 
 
 
@@ -301,7 +431,7 @@ class Export_APEX(config.Config):
             'workspace'     : self.arg_workspace,
         }
         rows = []
-        for row in self.conn.fetch_assoc(query.apex_workspaces, **args):
+        for row in self.conn.iter_assoc(query.apex_workspaces, **args):
             rows.append(row)
         #
         util.print_header('WORKSPACES:')
@@ -320,7 +450,7 @@ class Export_APEX(config.Config):
         self.apex_apps  = {}
         groups          = {}
         #
-        for row in self.conn.fetch_assoc(query.apex_applications, **args):
+        for row in self.conn.iter_assoc(query.apex_applications, **args):
             # split to groups for screen output
             row.app_group = (row.app_group or '-')
             rec = {
@@ -365,7 +495,7 @@ class Export_APEX(config.Config):
             'app_id'    : app_id,
         }
         self.enrich_ids = {}
-        for row in self.conn.fetch_assoc(query.apex_id_names, **args):
+        for row in self.conn.iter_assoc(query.apex_id_names, **args):
             self.enrich_ids[row.component_id] = '{}: {}'.format(row.component_type, row.component_name)
 
 
@@ -383,9 +513,26 @@ class Export_APEX(config.Config):
 
 
 
+    def get_timer(self, app_id, action):
+        if not (app_id in self.timers):
+            self.timers[app_id] = {}
+        if not (action in self.timers[app_id]):
+            self.timers[app_id][action] = 0
+        return self.timers[app_id][action]
+
+
+
+    def set_timer(self, app_id, action, timer):
+        # average with the previous run
+        if self.get_timer(app_id, action) > 0:
+            timer = (timer + self.timers[app_id][action]) / 2
+        self.timers[app_id][action] = round(timer, 2)
+
+
+
     def get_workspace_developers(self):
         self.developers = {}
-        for row in self.conn.fetch_assoc(query.workspace_developers):
+        for row in self.conn.iter_assoc(query.workspace_developers):
             if not (row.workspace in self.developers):
                 self.developers[row.workspace] = {}
             self.developers[row.workspace][row.user_name] = row.user_mail
@@ -396,7 +543,7 @@ class Export_APEX(config.Config):
 
     def get_comments(self, app_id):
         comments = {}
-        for row in self.conn.fetch_assoc(query.page_comments, app_id = app_id):
+        for row in self.conn.iter_assoc(query.page_comments, app_id = app_id):
             comments[row.page_id] = {
                 'page' : {
                     'page_name'     : row.page_name,
@@ -407,7 +554,7 @@ class Export_APEX(config.Config):
                 'regions' : {},
             }
         #
-        for row in self.conn.fetch_assoc(query.page_region_comments, app_id = app_id):
+        for row in self.conn.iter_assoc(query.page_region_comments, app_id = app_id):
             if not (row.page_id in comments):
                 comments[row.page_id] = {
                     'page' : {
@@ -433,8 +580,7 @@ class Export_APEX(config.Config):
 
     def fetch_exported_files(self):
         # get files from collection
-        data = self.conn.fetch_assoc(query.apex_export_fetch_files)
-        for file in data:
+        for file in self.conn.iter_assoc(query.apex_export_fetch_files, arraysize = 10):     # large CLOBs
             payload = str(file.clob_content)
             if self.args.release and file.file_name.endswith('.sql'):
                 payload = util.replace(payload, r"p_release=>'\d+.\d+.\d+'", replacement = "p_release=>'" + self.args.release + "'")
@@ -680,7 +826,7 @@ class Export_APEX(config.Config):
         util.delete_folder(target_dir)
 
         # create files
-        for row in self.conn.fetch_assoc(query.apex_files, app_id = app_id):
+        for row in self.conn.iter_assoc(query.apex_files, arraysize = 10, app_id = app_id):
             file = target_dir + row.filename
             os.makedirs(os.path.dirname(file), exist_ok = True)
             #
@@ -100,7 +100,7 @@ class Export_Data(config.Config):
             'objects_ignore'    : self.objects_ignore   or '',
         }
         #
-        for row in self.conn.fetch_assoc(query.matching_objects, **args):
+        for row in self.conn.iter_assoc(query.matching_objects, **args):
             if not (row.object_name in self.tables_curr) and row.object_type == 'TABLE':
                 self.tables_curr.append(row.object_name)
 
@@ -109,7 +109,7 @@ class Export_Data(config.Config):
             self.tables_desc[table_name] = {}
             self.tables_cols[table_name] = []
             #
-            for row in self.conn.fetch_assoc(query.csv_columns, table_name = table_name):
+            for row in self.conn.iter_assoc(query.csv_columns, table_name = table_name):
                 self.tables_desc[table_name][row.column_name] = row
                 self.tables_cols[table_name].append(row.column_name)
 
@@ -141,22 +141,17 @@ class Export_Data(config.Config):
         # fetch data from table
         try:
             stmt    = 'SELECT {}\nFROM {}{}\nORDER BY {}'.format(', '.join(columns), table_name, where_filter, order_by)
-            data    = self.conn.fetch_assoc(stmt)
+            data    = self.conn.iter_rows(stmt)
         except Exception:
             util.raise_error('EXPORT_FAILED')
 
         # save as CSV
         writer.writerow(columns)    # attach headers
         for row in data:
-            row_append = []
-            for col in columns:
-                row_append.append(row[col.lower()])
-
-                # adjust data types
-                #if isinstance(col, float):
-                #    row[idx] = str(col).replace('.', ',')
-
-            writer.writerow(row_append)
+            # adjust data types
+            #if isinstance(col, float):
+            #    row[idx] = str(col).replace('.', ',')
+            writer.writerow(row)
         csv_file.close()
 
         # create also the .sql file
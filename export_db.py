@@ -1,5 +1,7 @@
 # coding: utf-8
-import sys, os, re, argparse, datetime
+import sys, os, re, argparse, datetime, threading, queue
+from multiprocessing.pool import ThreadPool
+import oracledb         # pip3 install oracledb     --upgrade
 #
 import config
 from lib import util
@@ -34,12 +36,116 @@ from lib.file import File
 
 class Export_DB(config.Config):
 
+    # limits for objects exported in a single query
+    bulk_size       = 200
+    bulk_length     = 4000      # in bytes
+
+    # precompiled patterns for cleanup functions
+    re_quoted_name      = re.compile(r'"([A-Z0-9_$#]+)"')
+    re_quoted_names     = re.compile(r'(\"[A-Z0-9_$#]+\")')
+    re_quoted_any       = re.compile(r'("[^"]+")')
+    re_brackets         = re.compile(r'[(]([^\)]+)[)]')
+    re_indent           = re.compile(r'^(\s*)')
+    re_not_quoted       = re.compile(r'^([^"]+)')
+    re_spaces           = re.compile(r'\s+')
+    re_space_semicolon  = re.compile(r'(\s+;)')
+    re_start_with       = re.compile(r' START WITH (\d+) ')
+    re_values           = re.compile(r'VALUES\(([^\)]+)')
+    re_index_name       = re.compile(r'INDEX\s+([^\s]+)')
+    re_index_table      = re.compile(r' ON ([^\s]+)')
+    re_alter_table      = re.compile(r'\n(ALTER TABLE ["][^;]+)[;]', re.M)
+    re_view_select      = re.compile(r'^SELECT(\s+)', re.I)
+    re_view_from        = re.compile(r'(\s+FROM\s+)', re.I)
+    re_view_aliased     = re.compile(r'"([A-Z0-9_$#]+)",.*"')
+    re_view_aliased_col = re.compile(r'([^\.,"]\.)"([A-Z0-9_$#]+)"')
+    re_view_columns     = re.compile(r'"([A-Z0-9_$#]+)","')
+    re_mview_columns    = re.compile(r'\s*\([^)]+\)')
+    re_job_start        = re.compile(r'start_date=>TO_TIMESTAMP_TZ[^)]*[)]')
+    re_job_action       = re.compile(r"job_action\s*=>\s*'((?:''|[^'])*)'", re.IGNORECASE | re.DOTALL)
+    re_job_args         = re.compile(r'\s*,\s*([a-z_]+)\s*=>\s*')
+
+    # replacements applied in order, pattern can be a string or a compiled regexp
+    rules_table_line = [
+        (' (',                                          '('),
+        (' CHAR)',                                      '|CHAR)'),
+        (' BYTE)',                                      '|BYTE)'),
+        (')  DEFAULT COLLATION "USING_NLS_COMP"',       ')'),       # table level collation
+    ]
+    rules_identity = [
+        (re.compile(r'( MAXVALUE 9{27,}) '),            ' '),
+        (' MINVALUE 1 ',                                ' '),
+        (' INCREMENT BY 1 ',                            ' '),
+        (' NOORDER',                                    ''),
+        (' NOCYCLE',                                    ''),
+        (' NOKEEP',                                     ''),
+        (' NOSCALE',                                    ''),
+        (' CACHE 20 ',                                  ' '),
+        (re.compile(r'([\s]{2,})'),                     ' '),
+    ]
+    rules_constraint = [
+        ('     CONSTRAINT',                             '    CONSTRAINT'),
+        (' CHECK(',                                     '\n        CHECK (\n            '),
+        (' PRIMARY KEY(',                               '\n        PRIMARY KEY ('),
+        (' FOREIGN KEY(',                               '\n        FOREIGN KEY ('),
+        (' UNIQUE(',                                    '\n        UNIQUE ('),
+    ]
+    rules_constraint_check = [
+        (') ENABLE',                                    '\n        )'),
+        (') DISABLE',                                   '\n        ) DISABLE'),
+    ]
+    rules_unnamed_constraint = [
+        (' ENABLE',                                     ''),
+        ('PRIMARY KEY(',                                '\n    PRIMARY KEY ('),
+        ('FOREIGN KEY(',                                '\n    FOREIGN KEY ('),
+        ('UNIQUE(',                                     '\n    UNIQUE ('),
+    ]
+    rules_unnamed_check = [
+        (') ENABLE',                                    '\n    )'),
+        (') DISABLE',                                   '\n    ) DISABLE'),
+        (' CHECK(',                                     '--\n    CHECK (\n        '),
+    ]
+    rules_alter = [
+        (' ADD',                                        '\n    ADD'),
+        (' PRIMARY',                                    '\n        PRIMARY'),
+        (' FOREIGN',                                    '\n        FOREIGN'),
+        (' UNIQUE',                                     '\n        UNIQUE'),
+        (' CHECK',                                      '\n        CHECK'),
+        (' USING',                                      '\n        USING'),
+    ]
+    rules_view_header = [
+        (re.compile(r'(\s*DEFAULT COLLATION [^\s]+\s)'),  ' '),       # remove collation
+        (re.compile(r'\s*\([^)]+\)\s*AS'),                ' AS'),     # remove columns
+        (re.compile(r'\s*\([^)]+\)\s*BEQUEATH'),          ' BEQUEATH'),
+        (' ()  AS',                                     ' AS'),
+        ('  ',                                          ' '),
+    ]
+    rules_sequence = [
+        (re.compile(r'( MAXVALUE 9{27,}) '),            ' '),
+        (' CACHE 20 ',                                  ' '),
+        (' INCREMENT BY 1 ',                            ' '),
+        (' NOORDER',                                    ''),
+        (' NOCYCLE',                                    ''),
+        (' NOKEEP',                                     ''),
+        (' NOSCALE',                                    ''),
+        (' NOPARTITION',                                ''),
+        (' GLOBAL',                                     ''),
+        (re.compile(r' START WITH \d+ '),               ' '),
+        (re.compile(r'\s+'),                            ' '),
+    ]
+    rules_sequence_split = [
+        (' MINVALUE',                                   '\n    MINVALUE'),
+        (' START',                                      '\n    START'),
+        (' CACHE',                                      '\n    CACHE'),
+        (re.compile(r'\s+;'),                           ';'),
+    ]
+
     def define_parser(self):
         parser = argparse.ArgumentParser(add_help = False)
 
         # actions and flags
         group = parser.add_argument_group('MAIN ACTIONS')
         group.add_argument('-recent',       help = 'Show objects changed in # days',        type = int,                 nargs = '?')
+        group.add_argument('-incremental',  help = 'Export objects changed since last export',                          nargs = '?', const = True,  default = False)
 
         # limit scope by object type and name (prefix)
         group = parser.add_argument_group('LIMIT SCOPE')
@@ -54,6 +160,7 @@ class Export_DB(config.Config):
         #
         group = parser.add_argument_group('ADDITIONAL ACTIONS')
         group.add_argument('-delete',       help = 'Delete existing folders before export',                             nargs = '?', const = True,  default = False)
+        group.add_argument('-workers',      help = 'Number of parallel sessions',           type = int,                 nargs = '?', default = 1)
         #
         return parser
 
@@ -95,6 +202,9 @@ class Export_DB(config.Config):
         self.comments       = {}
         self.comments_col   = {}
         self.comments_type  = {}
+        self.objects_skip   = set()
+        self.objects_files  = {}        # (object_type, object_name) => (file, hash of the content)
+        self.manifest       = {}
 
         # adjust target folder for multi schema approach
         self.target_root    = self.repo_root + self.get_path(self.config.path_objects)
@@ -110,10 +220,22 @@ class Export_DB(config.Config):
             'sorted'        : self.all_objects_sorted,
         }
         util.write_file(self.dependencies_file, payload = payload, yaml = True, fix = False)
+        if self.objects_cycles:
+            util.print_warning('CIRCULAR DEPENDENCIES', self.objects_cycles)
+
+        # load objects from previous export
+        self.manifest_file_curr = self.manifest_file.replace('#SCHEMA_NAME#', self.remove_schema)
+        if os.path.exists(self.manifest_file_curr):
+            with open(self.manifest_file_curr, 'rt', encoding = 'utf-8') as f:
+                self.manifest = dict(util.get_yaml(f, self.manifest_file_curr))
 
         # show affected objects
         self.show_overview()
 
+        # skip objects which did not change since last export
+        if self.args.incremental:
+            self.skip_unchanged()
+
         # delete lost diff tables
         for file in util.get_files(self.target_root + self.config.object_types['TABLE'][0] + '*$1.sql'):
             util.delete_file(file)
@@ -127,7 +249,27 @@ class Export_DB(config.Config):
         # detect deleted objects
         deleted_obj     = {}
         deleted_files   = []
-        if self.args.verbose:
+        #
+        if self.args.incremental and self.manifest and self.is_full_scope():
+            # compare previous export with current objects
+            for obj_code, info in self.manifest.items():
+                object_type, object_name = obj_code.split('.', 1)
+                if not (object_name in self.objects.get(object_type, {})):
+                    if not (object_type in deleted_obj):
+                        deleted_obj[object_type] = []
+                    deleted_obj[object_type].append(object_name)
+                    deleted_files.append(self.repo_root + info['file'])
+            #
+            if len(deleted_obj) > 0:
+                util.print_header('DELETED OBJECTS:')
+                util.print_pipes(deleted_obj)
+
+            # soft delete just for missing objects
+            if self.config.auto_delete:
+                for file in deleted_files:
+                    util.delete_file(file)
+        #
+        elif self.args.verbose:
             for file, obj in self.repo_files.items():
                 expecting = self.repo_root + '/'.join(os.path.dirname(file).replace('\\', '/').split('/')[0:-1])
                 if not (expecting in self.target_root):
@@ -173,6 +315,9 @@ class Export_DB(config.Config):
         self.export()
         self.update_comments()
 
+        # store objects overview for the next incremental export
+        self.store_manifest()
+
 
 
     def show_overview(self):
@@ -191,7 +336,7 @@ class Export_DB(config.Config):
         util.print_header('OBJECTS {}: {}'.format(show_header, show_filter).rstrip())
 
         # get objects to recompile
-        for row in self.conn.fetch_assoc(query.matching_objects, **args):
+        for row in self.conn.iter_assoc(query.matching_objects, **args):
             if row.object_type == 'TABLE' and (row.object_name.endswith('$1') or row.object_name.endswith('$2')):
                 continue
             #
@@ -210,6 +355,57 @@ class Export_DB(config.Config):
 
 
 
+    def is_full_scope(self):
+        return self.args.recent == None and not self.args.type and not self.args.name
+
+
+
+    def skip_unchanged(self):
+        for object_type in sorted(self.objects.keys()):
+            if not (object_type in self.config.object_types):
+                continue    # not exported anyway
+            #
+            for object_name, row in self.objects[object_type].items():
+                info = self.manifest.get('{}.{}'.format(object_type, object_name))
+                if not info or not row.last_ddl_time or info.get('last_ddl_time') != row.last_ddl_time:
+                    continue
+
+                # export object again if file is missing or if it was changed
+                if util.get_file_hash(self.repo_root + info['file']) != info.get('hash'):
+                    continue
+                #
+                self.objects_skip.add((object_type, object_name))
+        #
+        self.objects_total -= len(self.objects_skip)
+        util.print_header('UNCHANGED OBJECTS SKIPPED:', len(self.objects_skip))
+
+
+
+    def store_manifest(self):
+        manifest = {} if self.is_full_scope() else dict(self.manifest)
+        #
+        for object_type in sorted(self.objects.keys()):
+            if not (object_type in self.config.object_types):
+                continue
+            #
+            for object_name, row in self.objects[object_type].items():
+                obj_code = '{}.{}'.format(object_type, object_name)
+                if (object_type, object_name) in self.objects_skip:
+                    manifest[obj_code] = self.manifest[obj_code]
+                    continue
+                #
+                file, file_hash = self.objects_files.get((object_type, object_name)) or (None, None)
+                if file:
+                    manifest[obj_code] = {
+                        'file'          : file.replace(self.repo_root, ''),
+                        'hash'          : file_hash,
+                        'last_ddl_time' : row.last_ddl_time,
+                    }
+        #
+        util.write_file(self.manifest_file_curr, payload = manifest, yaml = True, fix = False)
+
+
+
     def get_comments(self):
         args = {
             'object_name'       : ','.join(self.args.name or ['%']).upper(),
@@ -218,7 +414,7 @@ class Export_DB(config.Config):
             'objects_ignore'    : self.objects_ignore   or '',
         }
         #
-        for row in self.conn.fetch_assoc(query.pull_comments, **args):
+        for row in self.conn.iter_assoc(query.pull_comments, **args):
             if row.object_type:
                 self.comments_type[row.table_name] = row.object_type
             #
@@ -232,22 +428,35 @@ class Export_DB(config.Config):
 
 
 
-    def update_comments(self, object_name = None):
-        comments = {object_name : self.comments[object_name]} if (object_name and object_name in self.comments) else self.comments
-
+    def update_comments(self):
         # add comments to tables even if tables didnt changed
-        for table_name in comments.keys():
+        for table_name in self.comments.keys():
             if not (table_name in self.comments_type):
                 continue
             #
-            object_type = self.comments_type[table_name]
-            object_file = self.get_object_file(object_type, table_name)
-            comments    = self.get_object_comments(table_name, object_type)
-            #
-            if len(comments) > 0 and os.path.exists(object_file):
-                payload = util.get_file_content(object_file).strip()
-                if not ('\n--\nCOMMENT ON ' in payload):
-                    util.write_file(object_file, '{}\n{}\n\n'.format(payload, '\n'.join(comments)))
+            object_file = self.get_object_file(self.comments_type[table_name], table_name)
+            if os.path.exists(object_file):
+                payload = util.get_file_content(object_file)
+                updated = self.merge_comments(table_name, payload)
+                if updated != payload:
+                    util.write_file(object_file, updated)
+
+                    # keep the hash for manifest in sync
+                    obj = (self.comments_type[table_name], table_name)
+                    if obj in self.objects_files:
+                        self.objects_files[obj] = (object_file, util.get_payload_hash(updated))
+
+
+
+    def merge_comments(self, object_name, payload):
+        if not (object_name in self.comments_type):
+            return payload
+        #
+        comments = self.get_object_comments(object_name, self.comments_type[object_name])
+        if len(comments) > 0 and not ('\n--\nCOMMENT ON ' in payload.strip()):
+            payload = '{}\n{}\n\n'.format(payload.strip(), '\n'.join(comments))
+        #
+        return payload
 
 
 
@@ -260,55 +469,163 @@ class Export_DB(config.Config):
 
         # minimize the clutter in exports
         self.conn.execute(query.setup_dbms_metadata)
+        self.worker = threading.local()
 
-        # export objects one by one
-        progress_target = self.objects_total
-        progress_done   = 0
-        recent_type     = ''
-        #
+        # prepare list of objects to export, grouped in batches by object type
+        todo = []
         for object_type in sorted(self.objects.keys()):
             if not (object_type in self.config.object_types):
                 continue
             #
+            object_names = []
             for object_name in sorted(self.objects[object_type].keys()):
-                if self.args.verbose:
-                    show_type   = object_type if object_type != recent_type else ''
-                    recent_type = object_type
-                    print('{:>20} | {:<54}'.format(show_type, util.get_string(object_name, 54)))
-                else:
-                    progress_done = util.print_progress(progress_done, progress_target)
-
-                # export object from database and save in file
-                payload     = self.export_object(object_type, object_name)
-                object_file = self.get_object_file(object_type, object_name)
-                #
-                if object_file:
-                    # if existing file uses different casing, use its name variant on the first line
-                    file_name = os.path.basename(object_file)[:len(object_name)]
-                    if file_name != object_name.lower():
-                        lines = payload.splitlines(keepends = True)
-                        if lines:
-                            lines[0] = re.sub(re.escape(object_name), file_name, lines[0], count = 1, flags = re.IGNORECASE)
-                            payload = ''.join(lines)
-                    #
-                    util.write_file(object_file, payload)
-                    #
-                    if object_type in self.config.object_comments:
-                        self.update_comments(object_name)
+                if not ((object_type, object_name) in self.objects_skip):
+                    object_names.append(object_name)
+            #
+            todo.extend(self.get_batches(object_type, object_names))
 
-            # show extra line in between different object types
+        # export objects from database and save them in files, always in the same order
+        progress_target = self.objects_total
+        progress_done   = 0
+        recent_type     = ''
+        changed_files   = 0
+        #
+        for object_type, object_name, payload in self.export_objects(todo):
             if self.args.verbose:
-                if len(self.objects[object_type].keys()) > 0:
+                # show extra line in between different object types
+                if recent_type and object_type != recent_type:
                     print('{:>20} |'.format(''))
+                #
+                show_type   = object_type if object_type != recent_type else ''
+                recent_type = object_type
+                print('{:>20} | {:<54}'.format(show_type, util.get_string(object_name, 54)))
+            else:
+                progress_done = util.print_progress(progress_done, progress_target)
+            #
+            object_file = self.get_object_file(object_type, object_name)
+            if object_file:
+                # if existing file uses different casing, use its name variant on the first line
+                file_name = os.path.basename(object_file)[:len(object_name)]
+                if file_name != object_name.lower():
+                    lines = payload.splitlines(keepends = True)
+                    if lines:
+                        lines[0] = re.sub(re.escape(object_name), file_name, lines[0], count = 1, flags = re.IGNORECASE)
+                        payload = ''.join(lines)
+                #
+                # add comments and write the file just when it changed
+                if object_type in self.config.object_comments and self.comments_type.get(object_name) == object_type:
+                    payload = self.merge_comments(object_name, payload)
+                #
+                if util.write_file(object_file, payload, check_hash = True):
+                    changed_files += 1
+                self.objects_files[object_type, object_name] = (object_file, util.get_payload_hash(payload))
         #
-        if not self.args.verbose:
+        if self.args.verbose:
+            if recent_type:
+                print('{:>20} |'.format(''))
+        else:
             util.print_progress_done()
         util.beep_success()
         #
+        util.print_header('CHANGED FILES:', changed_files)
         print()
 
 
 
+    def get_batches(self, object_type, object_names):
+        # objects with specific query are exported one by one
+        if not self.is_bulk_type(object_type):
+            return [(object_type, [object_name]) for object_name in object_names]
+
+        # split names to batches which fit to the bind variable
+        batches, batch, size = [], [], 0
+        for object_name in object_names:
+            if ',' in object_name:
+                batches.append((object_type, [object_name]))
+                continue
+            #
+            length = len(object_name.encode('utf-8')) + 1     # bind limit is in bytes
+            if len(batch) >= self.bulk_size or size + length > self.bulk_length:
+                batches.append((object_type, batch))
+                batch, size = [], 0
+            #
+            batch.append(object_name)
+            size += length
+        #
+        if batch:
+            batches.append((object_type, batch))
+        return batches
+
+
+
+    def is_bulk_type(self, object_type):
+        return not hasattr(query, 'describe_' + object_type.lower().replace(' ', '_'))
+
+
+
+    def export_objects(self, todo):
+        # export objects in current session
+        workers = min(self.args.get('workers') or 1, len(todo))
+        if workers <= 1:
+            for task in todo:
+                for result in self.export_batch(task):
+                    yield result
+            return
+
+        # open extra sessions with the same metadata setup, one for each worker
+        sessions = queue.Queue()
+        conns    = []
+        for i in range(workers):
+            conn = self.db_connect(ping_sqlcl = False, silent = True, reuse = False)
+            conn.execute(query.setup_dbms_metadata)
+            conns.append(conn)
+            sessions.put(conn)
+
+        # export and cleanup objects in parallel, but pass them back in the original order
+        try:
+            with ThreadPool(processes = workers, initializer = self.init_worker, initargs = (sessions,)) as pool:
+                for results in pool.imap(self.export_batch_worker, todo):
+                    if results == None:
+                        util.quit()     # error was already reported by the worker
+                    for result in results:
+                        yield result
+        finally:
+            for conn in conns:
+                conn.disconnect()
+
+
+
+    def init_worker(self, sessions):
+        # assign dedicated session to the worker thread
+        self.worker.conn = sessions.get()
+
+
+
+    def export_batch(self, task):
+        object_type, object_names = task
+        payloads = self.get_object_payloads(object_type, object_names)
+        #
+        out = []
+        for object_name, payload in zip(object_names, payloads):
+            out.append((object_type, object_name, self.export_object(object_type, object_name, payload = payload)))
+        return out
+
+
+
+    def export_batch_worker(self, task):
+        try:
+            return self.export_batch(task)
+        except SystemExit:
+            return None
+
+
+
+    def get_conn(self):
+        # use worker session in parallel mode
+        return getattr(self.worker, 'conn', None) or self.conn
+
+
+
     def export_grants(self):
         args = {
             'objects_prefix'    : self.objects_prefix   or '%',
@@ -319,7 +636,7 @@ class Export_DB(config.Config):
         last_type   = ''
         content     = []
         #
-        for row in self.conn.fetch_assoc(query.grants_made, **args):
+        for row in self.conn.iter_assoc(query.grants_made, **args):
             # show object type header
             if last_type != row.type:
                 content.append('\n--\n-- {}\n--'.format(row.type))
@@ -327,11 +644,11 @@ class Export_DB(config.Config):
             last_type = row.type
         #
         content = '{}\n\n'.format('\n'.join(content)).lstrip()
-        util.write_file(self.grants_made_file, content)
+        util.write_file(self.grants_made_file, content, check_hash = True)
 
         # extract received grants
         received_grants = {}
-        for row in self.conn.fetch_assoc(query.grants_recd):
+        for row in self.conn.iter_assoc(query.grants_recd):
             if not (row.owner in received_grants):
                 received_grants[row.owner] = {}
             if not (row.type in received_grants[row.owner]):
@@ -351,35 +668,36 @@ class Export_DB(config.Config):
             content.append(query.switch_schema.format(self.remove_schema))
             #
             file = self.grants_recd_file.replace('#SCHEMA_NAME#', owner)
-            util.write_file(file, ('\n'.join(content) + '\n').lstrip())
+            util.write_file(file, ('\n'.join(content) + '\n').lstrip(), check_hash = True)
 
         # extract privileges granted to user
         content = ''
-        for row in self.conn.fetch_assoc(query.user_roles):
+        for row in self.conn.iter_assoc(query.user_roles):
             content += row.line + '\n'
         content += '--\n'
-        for row in self.conn.fetch_assoc(query.user_privs):
+        for row in self.conn.iter_assoc(query.user_privs):
             content += row.line + '\n'
         #
-        util.write_file(self.grants_privs_file, content.lstrip('--\n') + '\n')
+        util.write_file(self.grants_privs_file, content.lstrip('--\n') + '\n', check_hash = True)
 
         # export directories
         content = ''
-        for row in self.conn.fetch_assoc(query.directories):
+        for row in self.conn.iter_assoc(query.directories):
             content += row.line + '\n'
         #
-        util.write_file(self.grants_dirs_file, (content + '\n').lstrip())
+        util.write_file(self.grants_dirs_file, (content + '\n').lstrip(), check_hash = True)
 
 
 
-    def export_object(self, object_type, object_name, object_file = ''):
+    def export_object(self, object_type, object_name, object_file = '', payload = None):
         # export object from database through DBMS_METADATA package
-        payload     = self.get_object_payload(object_type, object_name)
-        lines       = []
+        if payload == None:
+            payload = self.get_object_payload(object_type, object_name)
+        lines = []
 
         # cleanup all objects
         if len(payload) > 0:
-            payload = re.sub('\t', '    ', payload.strip())  # replace tabs with 4 spaces
+            payload = payload.strip().replace('\t', '    ')   # replace tabs with 4 spaces
             lines   = payload.splitlines()
             #
             if len(lines) > 0:
@@ -399,7 +717,7 @@ class Export_DB(config.Config):
             )
 
         # final cleanup
-        payload = payload + util.replace('\n'.join(lines), r';\n;', ';') + '\n\n'
+        payload = payload + '\n'.join(lines).replace(';\n;', ';') + '\n\n'
         return payload
 
 
@@ -465,11 +783,9 @@ class Export_DB(config.Config):
         #
         for (i, line) in enumerate(lines):
             if i > 0:
-                line = line.replace(' (', '(')
-                line = line.replace(' CHAR)', '|CHAR)').replace(' BYTE)', '|BYTE)')
+                line = self.apply_rules(line, self.rules_table_line)
 
                 # remove collation junk
-                line = line.replace(')  DEFAULT COLLATION "USING_NLS_COMP"', ')')  # table level
                 if ' COLLATE "USING_NLS_COMP"' in line:
                     line = line.replace(' COLLATE "USING_NLS_COMP"', '').rstrip()
 
@@ -491,17 +807,9 @@ class Export_DB(config.Config):
                         extras = self.unquote_object_name(extras, remove_schema = self.remove_schema)
 
                     # remove identity/sequences clutter
-                    extras      = util.replace(extras, r'( MAXVALUE 9{27,}) ', ' ')
-                    extras      = extras.replace(' MINVALUE 1 ', ' ')
-                    extras      = extras.replace(' INCREMENT BY 1 ', ' ')
-                    extras      = extras.replace(' NOORDER', '')
-                    extras      = extras.replace(' NOCYCLE', '')
-                    extras      = extras.replace(' NOKEEP',  '')
-                    extras      = extras.replace(' NOSCALE', '')
-                    extras      = extras.replace(' CACHE 20 ', ' ')
-                    extras      = util.replace(extras, r'([\s]{2,})', ' ')
+                    extras      = self.apply_rules(extras, self.rules_identity)
                     #
-                    if util.extract_int(r' START WITH (\d+) ', extras) == 1:
+                    if util.extract_int(self.re_start_with, extras) == 1:
                         extras  = extras.replace(' START WITH 1 ', ' ')
 
                     # cleanup constraint names
@@ -520,18 +828,13 @@ class Export_DB(config.Config):
                 # fix constraints
                 if line.lstrip().startswith('CONSTRAINT'):
                     line = self.unquote_object_name(line)
-                    line = line.replace('     CONSTRAINT', '    CONSTRAINT')
-                    line = line.replace(' CHECK(',          '\n        CHECK (\n            ')
-                    line = line.replace(' PRIMARY KEY(',    '\n        PRIMARY KEY (')
-                    line = line.replace(' FOREIGN KEY(',    '\n        FOREIGN KEY (')
-                    line = line.replace(' UNIQUE(',         '\n        UNIQUE (')
+                    line = self.apply_rules(line, self.rules_constraint)
 
                     # fix checks
                     if not (' CHECK (' in line):
                         line = self.split_columns(line)
                     else:
-                        line = line.replace(') ENABLE',     '\n        )')
-                        line = line.replace(') DISABLE',    '\n        ) DISABLE')
+                        line = self.apply_rules(line, self.rules_constraint_check)
                     line = '    --\n    ' + line.strip()
 
                 # remove inlined indexes
@@ -547,21 +850,14 @@ class Export_DB(config.Config):
                 # fix unnamed constraints
                 if not line.lstrip().startswith('ALTER'):
                     if (' PRIMARY KEY("' in line or ' FOREIGN KEY("' in line or ' UNIQUE("' in line):
-                        line = line.strip()
-                        line = line.replace(' ENABLE', '')
-                        line = line.replace('PRIMARY KEY(', '\n    PRIMARY KEY (')
-                        line = line.replace('FOREIGN KEY(', '\n    FOREIGN KEY (')
-                        line = line.replace('UNIQUE(',      '\n    UNIQUE (')
+                        line = self.apply_rules(line.strip(), self.rules_unnamed_constraint)
                         #
                         line = self.split_columns(line)
                         line = '    --\n    ' + line.strip()
 
                     # just align check start, we dont want to touch the content
                     if line.lstrip().startswith('CHECK'):
-                        line = line.replace(') ENABLE',     '\n    )')
-                        line = line.replace(') DISABLE',    '\n    ) DISABLE')
-                        #
-                        line = line.replace(' CHECK(', '--\n    CHECK (\n        ')
+                        line = self.apply_rules(line, self.rules_unnamed_check)
 
                 # finish up the foreign keys
                 if line.lstrip().startswith('REFERENCES'):
@@ -583,7 +879,7 @@ class Export_DB(config.Config):
 
                 # remove other junk
                 if ' NO INMEMORY' in line:
-                    line = util.replace(line.replace(' NO INMEMORY', ''), r'(\s+;)', ';').strip()
+                    line = util.replace(line.replace(' NO INMEMORY', ''), self.re_space_semicolon, ';').strip()
 
                 # partition/index related
                 #line = line.replace('USING INDEX  ', '')
@@ -615,8 +911,8 @@ class Export_DB(config.Config):
 
                 # keep just first VALUE partition
                 if 'VALUES' in line:
-                    part_name   = self.unquote_object_name(util.extract(r'("[^"]+")', line))
-                    part_value  = util.extract(r'VALUES\(([^\)]+)', line.lstrip('('))
+                    part_name   = self.unquote_object_name(util.extract(self.re_quoted_any, line))
+                    part_value  = util.extract(self.re_values, line.lstrip('('))
                     #
                     if not partition_found:
                         line = '    PARTITION ' + part_name + ' VALUES(' + part_value + ')'
@@ -660,7 +956,7 @@ class Export_DB(config.Config):
 
                 # reuse dedicated index cleanup
                 if ('CREATE INDEX' in line or 'CREATE UNIQUE INDEX' in line):
-                    index_name      = self.unquote_object_name(util.extract(r'INDEX\s+([^\s]+)', line), remove_schema = self.remove_schema)
+                    index_name      = self.unquote_object_name(util.extract(self.re_index_name, line), remove_schema = self.remove_schema)
                     index_payload   = [lines[i].replace('"("', '" ("')]
                     index_payload   = self.cleanup_general(index_payload, index_name, 'INDEX')
                     index_payload   = self.clean_index(index_payload, object_name = index_name, config = config)
@@ -690,7 +986,7 @@ class Export_DB(config.Config):
         # reformat alter statements
         lines = '\n'.join(lines)
         for i in range(1, 10):
-            alter = util.extract(r'\n(ALTER TABLE ["][^;]+)[;]', lines, flags = re.M)
+            alter = util.extract(self.re_alter_table, lines)
             if not alter:
                 break
             #
@@ -698,14 +994,8 @@ class Export_DB(config.Config):
             formatted = formatted.replace('("', ' ("')
             formatted = formatted.replace(' ENABLE', '')
             formatted = self.unquote_object_name(formatted, remove_schema = self.remove_schema)
-            formatted = util.replace(formatted, r'\s+', ' ').strip()
-            #
-            formatted = formatted.replace(' ADD',       '\n    ADD')  # for create script this is enough
-            formatted = formatted.replace(' PRIMARY',   '\n        PRIMARY')
-            formatted = formatted.replace(' FOREIGN',   '\n        FOREIGN')
-            formatted = formatted.replace(' UNIQUE',    '\n        UNIQUE')
-            formatted = formatted.replace(' CHECK',     '\n        CHECK')
-            formatted = formatted.replace(' USING',     '\n        USING')
+            formatted = util.replace(formatted, self.re_spaces, ' ').strip()
+            formatted = self.apply_rules(formatted, self.rules_alter)   # for create script this is enough
             #
             lines = lines.replace(alter, formatted)
         lines = lines.splitlines()
@@ -739,7 +1029,7 @@ class Export_DB(config.Config):
         lines = self.rebuild_lines(lines)
 
         # extract table name
-        table_name  = util.extract(r' ON ([^\s]+)', lines[1]).upper()
+        table_name  = util.extract(self.re_index_table, lines[1]).upper()
         table_tblsp = (self.objects.get('TABLE', {}).get(table_name, {}).get('tablespace_name') or '').replace('"', '').lower()
 
         # partitioning
@@ -767,17 +1057,13 @@ class Export_DB(config.Config):
 
     def clean_view(self, lines, object_name = '', config = {}):
         # fix the FORCE flag
-        lines[0] = util.replace(lines[0], r' FORCE ', ' ')
+        lines[0] = lines[0].replace(' FORCE ', ' ')
         if config.cleanup_view.get('keep_force'):
-            lines[0] = util.replace(lines[0], r' REPLACE ', ' REPLACE FORCE ')
+            lines[0] = lines[0].replace(' REPLACE ', ' REPLACE FORCE ')
 
         # remove column from view definition
         # you should have correct names in the query
-        lines[0] = util.replace(lines[0], r'(\s*DEFAULT COLLATION [^\s]+\s)', ' ')      # remove collation
-        lines[0] = util.replace(lines[0], r'\s*\([^)]+\)\s*AS', ' AS')                  # remove columns
-        lines[0] = util.replace(lines[0], r'\s*\([^)]+\)\s*BEQUEATH', ' BEQUEATH')      # remove columns
-        lines[0] = lines[0].replace(' ()  AS', ' AS')
-        lines[0] = lines[0].replace('  ', ' ')
+        lines[0] = self.apply_rules(lines[0], self.rules_view_header)
 
         # fix wrong indentation on first line
         lines[1] = lines[1].lstrip()
@@ -785,30 +1071,33 @@ class Export_DB(config.Config):
         # fix one liners, split by FROM to two lines, convert columns to lower if possible
         if len(lines) == 3 and ' FROM ' in lines[1].upper():
             # split columns from select * from
-            lines[1] = util.replace(lines[1], r'^SELECT(\s+)', lines[1][0:6] + '\n    ', flags = re.I)
+            lines[1] = util.replace(lines[1], self.re_view_select, lines[1][0:6] + '\n    ')
             lines[1] = '",\n    "'.join(lines[1].split('","'))
             lines[1] = self.cleanup_names(lines[1])
 
             # move FROM to next line
-            split_from = util.extract(r'(\s+FROM\s+)', lines[1], flags = re.I)
+            split_from = util.extract(self.re_view_from, lines[1])
             split_line = lines[1].split(split_from)
             lines[1] = '{}\n{} {}'.format(split_line[0].rstrip(), split_from.strip(), split_line[1])
             lines = self.rebuild_lines(lines)
 
         # fix column names
         for (i, line) in enumerate(lines):
-            indent      = util.extract(r'^(\s*)', line) or '    '
-            start       = util.extract(r'^([^"]+)', line).strip()
+            if not ('"' in line):   # nothing to expand
+                continue
+            #
+            indent      = util.extract(self.re_indent, line) or '    '
+            start       = util.extract(self.re_not_quoted, line).strip()
             expanded    = []
 
             # fix SELECT * FROM ..., expand column names
-            if util.extract(r'"([A-Z0-9_$#]+)",.*"', line):         # with table alias
-                for col in re.findall(r'([^\.,"]\.)"([A-Z0-9_$#]+)"', line):
+            if util.extract(self.re_view_aliased, line):            # with table alias
+                for col in self.re_view_aliased_col.findall(line):
                     expanded.append('{}{}{}'.format(indent, col[0], self.cleanup_names(col[1])))
                     start = start.replace(col[0], '')
             #
-            if util.extract(r'"([A-Z0-9_$#]+)","', line):           # no alias
-                for col in re.findall(r'"([A-Z0-9_$#]+)"', line):
+            if util.extract(self.re_view_columns, line):            # no alias
+                for col in self.re_quoted_name.findall(line):
                     expanded.append('{}{}'.format(indent, self.cleanup_names(col)))
             #
             if len(expanded) > 0:
@@ -819,7 +1108,7 @@ class Export_DB(config.Config):
 
 
     def clean_materialized_view(self, lines, object_name = '', config = {}):
-        lines[0] = util.replace(lines[0], r'\s*\([^)]+\)', '')          # remove columns
+        lines[0] = util.replace(lines[0], self.re_mview_columns, '')    # remove columns
         lines[0] = lines[0].replace(' ()  AS', ' AS')
         lines[0] = self.cleanup_names(lines[0])
 
@@ -896,24 +1185,8 @@ class Export_DB(config.Config):
 
 
     def clean_sequence(self, lines, object_name = '', config = {}):
-        lines[0] = util.replace(lines[0], r'( MAXVALUE 9{27,}) ', ' ')
-        lines[0] = lines[0].replace(' CACHE 20 ', ' ')
-        lines[0] = lines[0].replace(' INCREMENT BY 1 ', ' ')
-        lines[0] = lines[0].replace(' NOORDER', '')
-        lines[0] = lines[0].replace(' NOCYCLE', '')
-        lines[0] = lines[0].replace(' NOKEEP', '')
-        lines[0] = lines[0].replace(' NOSCALE', '')
-        lines[0] = lines[0].replace(' NOPARTITION', '')
-        lines[0] = lines[0].replace(' GLOBAL', '')
-        #
-        lines[0] = util.replace(lines[0], r' START WITH \d+ ', ' ')
-        lines[0] = util.replace(lines[0], r'\s+', ' ').strip()
-        #
-        lines[0] = lines[0].replace(' MINVALUE',  '\n    MINVALUE')
-        lines[0] = lines[0].replace(' START',     '\n    START')
-        lines[0] = lines[0].replace(' CACHE',     '\n    CACHE')
-        #
-        lines[0] = util.replace(lines[0], r'\s+;', ';')
+        lines[0] = self.apply_rules(lines[0], self.rules_sequence).strip()
+        lines[0] = self.apply_rules(lines[0], self.rules_sequence_split)
         #
         drop_obj = '-- DROP SEQUENCE {};'.format(object_name.lower())
         #
@@ -932,14 +1205,13 @@ class Export_DB(config.Config):
         job_action = ''
         for (i, line) in enumerate(lines):
             if line.startswith('start_date=>'):
-                lines[i] = util.replace(lines[i], r'start_date=>TO_TIMESTAMP_TZ[^)]*[)]', 'start_date=>SYSDATE')
+                lines[i] = util.replace(lines[i], self.re_job_start, 'start_date=>SYSDATE')
             if line.lstrip().startswith('sys.dbms_scheduler.set_attribute(') and 'NLS_ENV' in line:
                 lines[i] = ''
             if line.startswith(');'):
                 lines   = '\n'.join(lines[2:i])  # everything to 1 line
                 #
-                pattern = re.compile(r"job_action\s*=>\s*'((?:''|[^'])*)'", re.IGNORECASE | re.DOTALL)
-                match   = pattern.search(lines)
+                match   = self.re_job_action.search(lines)
                 if match:
                     job_action = match.group(1)
                     lines = lines.replace(job_action, '{JOB_ACTION}')   # replace back later
@@ -948,14 +1220,14 @@ class Export_DB(config.Config):
                 lines = lines.replace('job_class=>\'"DEFAULT_JOB_CLASS"\',', '')
                 break
         #
-        lines = ['job_name=>in_job_name,'] + util.replace(lines, r'\s*,\s*([a-z_]+)\s*=>\s*', r',\n\1=>').split('\n')
+        lines = ['job_name=>in_job_name,'] + util.replace(lines, self.re_job_args, r',\n\1=>').split('\n')
         for (i, line) in enumerate(lines):
             line = line.split('=>')
             line = '        {:<20}=> {}'.format(line[0], '=>'.join(line[1:]))
             lines[i] = line
 
         # fix priority and status
-        data = self.conn.fetch_assoc(query.describe_job_details, job_name = object_name)
+        data = self.get_conn().fetch_assoc(query.describe_job_details, job_name = object_name)
         if len(data) == 0:
             return []
         #
@@ -964,7 +1236,7 @@ class Export_DB(config.Config):
 
         # fix arguments
         args            = ''
-        data            = self.conn.fetch_assoc(query.describe_job_args, job_name = object_name)
+        data            = self.get_conn().fetch_assoc(query.describe_job_args, job_name = object_name)
         for row in data:
             kind        = 'position'
             name        = row.argument_position
@@ -1010,7 +1282,7 @@ class Export_DB(config.Config):
 
         # get object from database
         try:
-            result = self.conn.fetch(q, **args)
+            result = self.get_conn().fetch(q, **args)
             if len(result) > 0:
                 return str(result[0][0])
             return ''
@@ -1022,11 +1294,34 @@ class Export_DB(config.Config):
 
 
 
+    def get_object_payloads(self, object_type, object_names):
+        # get all objects from the batch in a single round trip
+        if len(object_names) > 1:
+            args = {
+                'object_type'   : object_type,
+                'object_names'  : ','.join(object_names),
+            }
+            try:
+                payloads = {}
+                for object_name, payload in self.get_conn().fetch(query.describe_objects, arraysize = len(object_names), **args):
+                    payloads[object_name] = str(payload)
+                #
+                return [payloads.get(object_name, '') for object_name in object_names]
+            except oracledb.DatabaseError as e:
+                # go one by one to find the failing object
+                if not self.get('bulk_failed'):
+                    self.bulk_failed = True
+                    util.print_warning('BULK EXPORT FAILED, EXPORTING ONE BY ONE', [str(e).splitlines()[0]])
+        #
+        return [self.get_object_payload(object_type, object_name) for object_name in object_names]
+
+
+
     def unquote_object_name(self, line, remove_schema = ''):
         if remove_schema:
             line = line.replace('"{}".'.format(remove_schema), '')
         #
-        line = re.sub(r'"([A-Z0-9_$#]+)"', lambda x : x.group(1).lower(), line)
+        line = self.re_quoted_name.sub(lambda x : x.group(1).lower(), line)
         #
         return line
 
@@ -1043,11 +1338,11 @@ class Export_DB(config.Config):
 
     def split_columns(self, line, indent = 4):
         # split columns in between brackets to multiple lines
-        content = util.extract(r'[(]([^\)]+)[)]', line)
+        content = util.extract(self.re_brackets, line)
         columns = content.replace(', ', ',').split(',')
         #
         if len(columns) > 1:
-            start   = '\n' + util.extract(r'^(\s*)', line.split('\n')[-1])
+            start   = '\n' + util.extract(self.re_indent, line.split('\n')[-1])
             splttr  = ',' + start + (' ' * indent)
             line    = line.replace(content, splttr.lstrip(',') + splttr.join(columns) + start)
         #
@@ -1056,13 +1351,26 @@ class Export_DB(config.Config):
 
 
     def cleanup_names(self, line):
-        for col in re.findall(r'(\"[A-Z0-9_$#]+\")', line):
+        if not ('"' in line):
+            return line
+        #
+        for col in self.re_quoted_names.findall(line):
             line = line.replace(col, col.replace('"', '').lower())
         #
         return line
 
 
 
+    def apply_rules(self, subject, rules):
+        for pattern, replacement in rules:
+            if isinstance(pattern, str):
+                subject = subject.replace(pattern, replacement)
+            else:
+                subject = pattern.sub(replacement, subject)
+        return subject
+
+
+
     def get_object_comments(self, object_name, object_type):
         # check if we actually have some comments on the object
         found = 0
@@ -0,0 +1,140 @@
+# coding: utf-8
+import sys, os, collections
+import git          # pip3 install GitPython    --upgrade
+#
+from lib import util
+
+#
+# file versions and changes from Git commits, read through one persistent git cat-file process
+# (object database of GitPython), with LRU cache of recently read blobs
+#
+
+class Blobs:
+
+    def __init__(self, repo, cache_size = 512):
+        self.repo       = repo
+        self.cache_size = cache_size
+        self.commits    = collections.OrderedDict()     # commit hash => commit object
+        self.paths      = collections.OrderedDict()     # (commit hash, file) => blob id
+        self.contents   = collections.OrderedDict()     # blob id => content
+        self.hashes     = {}                            # blob id => content hash
+
+
+
+    def get_commit(self, commit):
+        if isinstance(commit, git.Commit):
+            return commit
+        #
+        obj = self.get_cached(self.commits, commit)
+        if obj == None:
+            obj = self.set_cached(self.commits, commit, self.repo.commit(commit))     # keep parsed trees
+        return obj
+
+
+
+    def get_blob_id(self, commit, file):
+        key     = (str(commit), file)
+        blob_id = self.get_cached(self.paths, key)
+        if blob_id == None:
+            try:
+                blob_id = (self.get_commit(commit).tree / file).hexsha
+            except:
+                blob_id = ''    # file deleted or renamed in this commit
+            self.set_cached(self.paths, key, blob_id)
+        return blob_id
+
+
+
+    def get_content(self, commit, file):
+        return self.get_blob_content(self.get_blob_id(commit, file))
+
+
+
+    def get_contents(self, requests):
+        # get content for list of (commit, file), same blobs are read just once
+        blob_ids = [self.get_blob_id(commit, file) for commit, file in requests]
+        contents = {blob_id : self.get_blob_content(blob_id) for blob_id in set(blob_ids)}
+        return [contents[blob_id] for blob_id in blob_ids]
+
+
+
+    def get_blob_content(self, blob_id):
+        if not blob_id:
+            return ''
+        #
+        content = self.get_cached(self.contents, blob_id)
+        if content == None:
+            content = self.set_cached(self.contents, blob_id, self.read_blob(blob_id))
+        return content
+
+
+
+    def get_hash(self, commit, file):
+        # same content is hashed just once, git blob id cant be used directly
+        # because hashes are compared with hashes of local files
+        blob_id = self.get_blob_id(commit, file)
+        if not blob_id:
+            return ''
+        #
+        if not (blob_id in self.hashes):
+            self.hashes[blob_id] = util.get_hash(self.read_blob(blob_id))
+        return self.hashes[blob_id]
+
+
+
+    def get_changes(self, old_commit, new_commit, paths = None, usable = None):
+        # structured list of changed files, renames are detected by git
+        # paths limit the diff to these folders, usable is a function to filter files
+        changes = []
+        for diff in self.get_commit(old_commit).diff(self.get_commit(new_commit), paths = paths or None):
+            change = util.Attributed({
+                'file'      : self.fix_path(diff.b_path or diff.a_path),
+                'old_file'  : self.fix_path(diff.a_path or diff.b_path),
+                'change'    : diff.change_type[0],      # A = added, D = deleted, M = modified, R = renamed, T = type changed
+                'old_blob'  : diff.a_blob.hexsha if diff.a_blob else '',
+                'new_blob'  : diff.b_blob.hexsha if diff.b_blob else '',
+            })
+            if usable and not (usable(change.file) or usable(change.old_file)):
+                continue
+            changes.append(change)
+        return changes
+
+
+
+    def get_deleted(self, old_commit, new_commit, paths = None, usable = None):
+        # files which dont exist in the new commit, including renamed files
+        deleted = []
+        for change in self.get_changes(old_commit, new_commit, paths = paths, usable = usable):
+            if change.change in ('D', 'R'):
+                deleted.append(change.old_file)
+        return deleted
+
+
+
+    def fix_path(self, file):
+        return (file or '').replace('\\', '/').replace('//', '/')
+
+
+
+    def read_blob(self, blob_id):
+        # text file is expected, normalize line endings same way as text mode of git show
+        payload = self.repo.odb.stream(bytes.fromhex(blob_id)).read()
+        payload = payload.decode('utf-8', errors = 'replace')
+        return payload.replace('\r\n', '\n').replace('\r', '\n')
+
+
+
+    def get_cached(self, cache, key):
+        value = cache.get(key)
+        if value != None:
+            cache.move_to_end(key)
+        return value
+
+
+
+    def set_cached(self, cache, key, value):
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last = False)     # remove least recently used
+        return value
+
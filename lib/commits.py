@@ -0,0 +1,197 @@
+# coding: utf-8
+import sys, os, datetime, sqlite3
+#
+from lib import util
+
+#
+# stores for the commits history, the store is picked by the file extension
+#
+# all stores return and expect the same structure:
+#   {commit_id: {'id', 'summary', 'author', 'date', 'files': {file: hash}, 'patch', 'deleted': [files]}}
+#
+
+def get_store(file, ticket_pattern = ''):
+    if file.endswith('.yaml') or file.endswith('.yml'):
+        return Commits_YAML(file)
+    return Commits_SQLite(file, ticket_pattern = ticket_pattern)
+
+
+
+class Commits_YAML:
+
+    def __init__(self, file, ticket_pattern = ''):
+        self.file           = file
+        self.yaml_file      = os.path.splitext(file)[0] + '.yaml'
+        self.ticket_pattern = ticket_pattern
+
+
+
+    def exists(self):
+        return os.path.exists(self.file)
+
+
+
+    def load(self):
+        if not os.path.exists(self.file):
+            return {}
+        with open(self.file, 'rt', encoding = 'utf-8') as f:
+            return dict(util.get_yaml(f, self.file))
+
+
+
+    def save(self, all_commits, rebuild = False, changed = []):
+        # whole file has to be rewritten
+        if os.path.exists(self.file):
+            os.remove(self.file)
+        util.write_file(self.file, all_commits, yaml = True)
+
+
+
+    def get_files(self, all_commits):
+        # commits with files as keys
+        all_files = {}
+        for commit_id in sorted(all_commits.keys()):
+            for file in all_commits[commit_id]['files'].keys():
+                if not (file in all_files):
+                    all_files[file] = []
+                all_files[file].append(commit_id)
+        return all_files
+
+
+
+    def export_yaml(self, file = None):
+        Commits_YAML(file or self.yaml_file).save(self.load(), rebuild = True)
+
+
+
+class Commits_SQLite(Commits_YAML):
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS commits (
+            commit_id       INTEGER PRIMARY KEY,
+            commit_hash     TEXT NOT NULL,
+            summary         TEXT,
+            author          TEXT,
+            authored_at     TEXT,
+            patch           TEXT,
+            ticket          TEXT
+        );
+        CREATE TABLE IF NOT EXISTS files (
+            commit_id       INTEGER NOT NULL,
+            file            TEXT NOT NULL,
+            file_hash       TEXT,
+            PRIMARY KEY (commit_id, file)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS deleted (
+            commit_id       INTEGER NOT NULL,
+            file            TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS commits_author    ON commits (author);
+        CREATE INDEX IF NOT EXISTS commits_ticket    ON commits (ticket);
+        CREATE INDEX IF NOT EXISTS commits_date      ON commits (authored_at);
+        CREATE INDEX IF NOT EXISTS files_file        ON files (file, commit_id);
+        CREATE INDEX IF NOT EXISTS deleted_commit    ON deleted (commit_id);
+    """
+
+    def connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.file)), exist_ok = True)
+        conn = sqlite3.connect(self.file)
+        conn.executescript(self.schema)
+        return conn
+
+
+
+    def exists(self):
+        return os.path.exists(self.file) or os.path.exists(self.yaml_file)
+
+
+
+    def load(self):
+        # import commits from the old format (YAML file with the same name)
+        if not os.path.exists(self.file):
+            if not os.path.exists(self.yaml_file):
+                return {}
+            self.import_yaml(self.yaml_file)
+        #
+        all_commits = {}
+        conn        = self.connect()
+        try:
+            for commit_id, commit_hash, summary, author, authored_at, patch in conn.execute('SELECT commit_id, commit_hash, summary, author, authored_at, patch FROM commits ORDER BY commit_id'):
+                all_commits[commit_id] = {
+                    'id'        : commit_hash,
+                    'summary'   : summary,
+                    'author'    : author,
+                    'date'      : datetime.datetime.fromisoformat(authored_at),
+                    'files'     : {},
+                }
+                if patch:
+                    all_commits[commit_id]['patch'] = patch
+                all_commits[commit_id]['deleted'] = []
+            #
+            for commit_id, file, file_hash in conn.execute('SELECT commit_id, file, file_hash FROM files ORDER BY commit_id, file'):
+                all_commits[commit_id]['files'][file] = file_hash
+            #
+            for commit_id, file in conn.execute('SELECT commit_id, file FROM deleted ORDER BY rowid'):
+                all_commits[commit_id]['deleted'].append(file)
+        finally:
+            conn.close()
+        #
+        return all_commits
+
+
+
+    def save(self, all_commits, rebuild = False, changed = []):
+        # append new commits, remove old or changed commits,
+        # commits recalculated by the caller are replaced even with the same hash
+        conn = self.connect()
+        try:
+            stored = {} if rebuild else dict(conn.execute('SELECT commit_id, commit_hash FROM commits'))
+            if rebuild:
+                for table in ('commits', 'files', 'deleted'):
+                    conn.execute('DELETE FROM {}'.format(table))
+            #
+            removed = {commit_id for commit_id, commit_hash in stored.items() if all_commits.get(commit_id, {}).get('id') != commit_hash or commit_id in changed}
+            added   = [commit_id for commit_id in sorted(all_commits.keys()) if not (commit_id in stored) or commit_id in removed]
+            #
+            for table in ('commits', 'files', 'deleted'):
+                conn.executemany('DELETE FROM {} WHERE commit_id = ?'.format(table), [(commit_id,) for commit_id in removed])
+            #
+            for commit_id in added:
+                obj = all_commits[commit_id]
+                conn.execute('INSERT INTO commits VALUES (?, ?, ?, ?, ?, ?, ?)', (
+                    commit_id,
+                    obj['id'],
+                    obj['summary'],
+                    obj['author'],
+                    obj['date'].isoformat(),
+                    obj.get('patch'),
+                    util.extract(self.ticket_pattern, obj['summary']) if self.ticket_pattern else None,
+                ))
+                conn.executemany('INSERT INTO files VALUES (?, ?, ?)', [(commit_id, file, file_hash) for file, file_hash in obj['files'].items()])
+                conn.executemany('INSERT INTO deleted VALUES (?, ?)', [(commit_id, file) for file in obj.get('deleted') or []])
+            #
+            conn.commit()
+        finally:
+            conn.close()
+
+
+
+    def get_files(self, all_commits):
+        # commits with files as keys, straight from the index
+        all_files   = {}
+        conn        = self.connect()
+        try:
+            for file, commit_id in conn.execute('SELECT file, commit_id FROM files ORDER BY file, commit_id'):
+                if commit_id in all_commits:
+                    if not (file in all_files):
+                        all_files[file] = []
+                    all_files[file].append(commit_id)
+        finally:
+            conn.close()
+        return all_files
+
+
+
+    def import_yaml(self, file):
+        self.save(Commits_YAML(file).load(), rebuild = True)
+
@@ -1,32 +1,72 @@
 # coding: utf-8
-import sys, os, re
+import sys, os, re, collections
 #
 from lib import util
 
 class File(util.Attributed):
 
+    # classification of already seen files (bounded LRU) and object types prepared for each config
+    cache           = collections.OrderedDict()
+    cache_size      = 50000
+    types           = {}
+    page_pattern    = re.compile(r'/pages/page_(\d+)\.sql$')
+
     def __init__(self, file, config = {}):
+        # config paths are changed for each schema in export, so they are part of the key
+        key     = (file, config.path_objects, config.path_apex, config.apex_path_app_id, self.get_types_key(config))
+        info    = File.cache.get(key)
+        if info != None:
+            File.cache.move_to_end(key)
+            self.update(info)
+            return
+        #
+        self.classify(file, config)
+
+        # values are immutable, so shallow copy is enough
+        File.cache[key] = dict(self)
+        if len(File.cache) > self.cache_size:
+            File.cache.popitem(last = False)
+
+
+
+    def get_types_key(self, config):
+        return tuple((object_type, tuple(info)) for object_type, info in config.object_types.items())
+
+
+
+    def get_types(self, config):
+        # object types as lookup tables, prepared just once for same object types
+        key = self.get_types_key(config)
+        if not (key in File.types):
+            folders = set()
+            needles = []
+            for object_type, info in config.object_types.items():
+                folder, ext = info
+                folders.add(folder.rstrip('/'))
+                needles.append(('/' + folder, ext, object_type))
+            File.types[key] = (folders, needles)
+        return File.types[key]
+
+
+
+    def classify(self, file, config):
         self.file           = file.replace('\\', '/').replace('//', '/')
         self.is_object      = False
         self.is_apex        = False
         self.is_template    = False
         self.is_script      = False
 
-        object_types = config.object_types.items()
+        type_folders, type_needles = self.get_types(config)
 
         # change file name on alternative file names (/type.name.sql) to correctly detect object type
         base = os.path.basename(file).split('.')
-        if len(base) > 2:
-            for object_type, info in object_types:
-                folder, ext = info
-                if folder.rstrip('/') == base[0]:
-                    file = file.replace('/{}.{}'.format(base[0], base[1]), '/{}/{}'.format(base[0], base[1]))
-                    break
+        if len(base) > 2 and base[0] in type_folders:
+            file = file.replace('/{}.{}'.format(base[0], base[1]), '/{}/{}'.format(base[0], base[1]))
 
         # check for APEX stuff
         app_id      = util.extract_int(config.apex_path_app_id, file.replace(config.path_apex, ''))
         #apex_root   = self.get_root(app_id, remove_root = True)
-        find_page   = re.search(r'/pages/page_(\d+)\.sql$', self.file)
+        find_page   = self.page_pattern.search(self.file)
         page_id     = int(find_page.group(1)) if app_id and find_page else None
         #
         if app_id:
@@ -39,9 +79,8 @@ class File(util.Attributed):
             # detect object type and fix type check for SPEC/BODY
             self.object_type = None
             folders = {}
-            for object_type, info in object_types:
-                folder, ext = info
-                if '/' + folder in file:
+            for needle, ext, object_type in type_needles:
+                if needle in file:
                     folders[ext] = object_type
             #
             for ext in sorted(folders.keys(), key = len):
@@ -24,7 +24,8 @@ SELECT DISTINCT
     o.object_name,
     t.tablespace_name,
     t.partitioned,
-    t.global_stats
+    t.global_stats,
+    TO_CHAR(o.last_ddl_time, 'YYYY-MM-DD HH24:MI:SS') AS last_ddl_time
 FROM user_objects o
 LEFT JOIN user_tables t
     ON t.table_name         = o.object_name
@@ -57,7 +58,8 @@ SELECT
     j.job_name      AS object_name,
     NULL            AS tablespace_name,
     NULL            AS partitioned,
-    NULL            AS global_stats
+    NULL            AS global_stats,
+    NULL            AS last_ddl_time
 FROM user_scheduler_jobs j
 JOIN objects_prefix a
     ON j.job_name           LIKE a.object_like ESCAPE '\\'
@@ -77,7 +79,13 @@ SELECT
     l.master                AS object_name,
     NULL                    AS tablespace_name,
     NULL                    AS partitioned,
-    NULL                    AS global_stats
+    NULL                    AS global_stats,
+    (
+        SELECT TO_CHAR(o.last_ddl_time, 'YYYY-MM-DD HH24:MI:SS')
+        FROM user_objects o
+        WHERE o.object_type     = 'TABLE'
+            AND o.object_name   = l.log_table
+    ) AS last_ddl_time
 FROM user_mview_logs l
 JOIN objects_prefix a
     ON l.master             LIKE a.object_like ESCAPE '\\'
@@ -96,7 +104,13 @@ SELECT
     t.index_name        AS object_name,
     t.tablespace_name,
     t.partitioned,
-    t.global_stats
+    t.global_stats,
+    (
+        SELECT TO_CHAR(o.last_ddl_time, 'YYYY-MM-DD HH24:MI:SS')
+        FROM user_objects o
+        WHERE o.object_type     = 'INDEX'
+            AND o.object_name   = t.index_name
+    ) AS last_ddl_time
 FROM user_indexes t
 LEFT JOIN user_constraints c
     ON c.table_name         = t.table_name
@@ -667,6 +681,17 @@ WHERE o.object_type     = :object_type
     AND o.object_name   = :object_name
 """
 
+# export all objects of the same type at once
+describe_objects = """
+SELECT
+    o.object_name,
+    DBMS_METADATA.GET_DDL(REPLACE(o.object_type, ' ', '_'), o.object_name) AS object_desc
+FROM user_objects o
+JOIN TABLE(APEX_STRING.SPLIT(:object_names, ',')) n
+    ON n.column_value   = o.object_name
+WHERE o.object_type     = :object_type
+"""
+
 describe_mview_log = """
 SELECT DBMS_METADATA.GET_DDL('MATERIALIZED_VIEW_LOG', l.log_table) AS object_desc
 FROM user_mview_logs l
@@ -18,3 +18,10 @@ FROM product_component_version p
 WHERE p.product LIKE 'Oracle Database%'
 """
 
+# discard package states in current session
+reset_package_state = """
+BEGIN
+    DBMS_SESSION.MODIFY_PACKAGE_STATE(DBMS_SESSION.REINITIALIZE);
+END;
+"""
+
@@ -0,0 +1,385 @@
+# coding: utf-8
+import sys, os, re, timeit
+#
+from lib import util
+
+#
+# run SQL scripts (patch files) through the database connection, without SQLcl
+#
+# supports @file and @@file includes, PROMPT, SET SERVEROUTPUT/DEFINE, WHENEVER SQLERROR/OSERROR,
+# SPOOL, EXEC, EXIT, SQL statements ended by ; or / and PL/SQL blocks ended by /,
+# quotes and comments are tracked over lines, so ; in strings doesnt end the statement,
+# formatting commands are skipped, commands changing the script (DEFINE, ACCEPT, HOST...)
+# and substitution variables stop the script with error, output mimics SQLcl so logs look the same
+#
+
+class Runner:
+
+    plsql_start = re.compile(r'^(CREATE\s+(OR\s+REPLACE\s+)?((NON)?EDITIONABLE\s+)?(PACKAGE|PROCEDURE|FUNCTION|TRIGGER|TYPE|LIBRARY|JAVA)\b|DECLARE\b|BEGIN\b)', re.I)
+    skipped     = ['SET', 'SHOW', 'SHO', 'REM', 'REMARK', 'CLEAR', 'CL', 'COLUMN', 'COL', 'TTITLE', 'BTITLE', 'BREAK', 'COMPUTE', 'TIMING', 'PAUSE']
+    unsupported = ['DEFINE', 'DEF', 'UNDEFINE', 'UNDEF', 'ACCEPT', 'ACC', 'VARIABLE', 'VAR', 'PRINT', 'HOST', 'HO', '!', '$', 'CONNECT', 'CONN', 'DISCONNECT',
+                    'START', 'STA', 'GET', 'SAVE', 'EDIT', 'ED', 'INPUT', 'APPEND', 'CHANGE', 'DEL', 'RUN', 'R', 'CD', 'DESC', 'DESCRIBE', 'LIQUIBASE', 'LB',
+                    'APEX', 'SCRIPT', 'LOAD', 'ALIAS', 'REPEAT', 'DDL', 'INFO', 'CTAS', 'SSHTUNNEL']
+    q_quotes    = {'[' : ']', '{' : '}', '(' : ')', '<' : '>'}
+    messages    = {
+        'CREATE'    : '{} created.',
+        'ALTER'     : '{} altered.',
+        'DROP'      : '{} dropped.',
+        'TRUNCATE'  : 'Table truncated.',
+        'COMMENT'   : 'Comment created.',
+        'GRANT'     : 'Grant succeeded.',
+        'REVOKE'    : 'Revoke succeeded.',
+        'COMMIT'    : 'Commit complete.',
+        'ROLLBACK'  : 'Rollback complete.',
+        'INSERT'    : '{} row inserted.',
+        'UPDATE'    : '{} row updated.',
+        'DELETE'    : '{} row deleted.',
+        'MERGE'     : '{} row merged.',
+    }
+
+    def __init__(self, conn, root = None, callback = None):
+        self.conn           = conn                  # wrapper.Oracle
+        self.root           = root or os.getcwd()   # folder for @file includes and spool files
+        self.callback       = callback              # called with every output line
+        self.output         = []                    # lines as SQLcl would show them
+        self.statements     = []                    # results of executed statements
+        self.spool          = None
+        self.sqlerror       = 'CONTINUE'
+        self.oserror        = 'CONTINUE'
+        self.dbms_output    = False
+        self.define         = '&'                   # substitution character, None = SET DEFINE OFF
+        self.success        = True
+        self.stopped        = False
+
+
+
+    def run(self, payload, file = ''):
+        start = timeit.default_timer()
+        try:
+            self.run_lines(payload.splitlines(), file = file)
+            if not self.stopped:
+                self.conn.commit()      # as SQLcl on exit
+        finally:
+            self.set_spool('OFF')
+        #
+        return util.Attributed({
+            'success'       : self.success,
+            'output'        : '\n'.join(self.output),
+            'statements'    : self.statements,
+            'seconds'       : round(timeit.default_timer() - start, 3),
+        })
+
+
+
+    def run_file(self, file, line, parent = ''):
+        # @ is relative to the root, @@ to the current file
+        name = file.lstrip('@').strip().rstrip(';').strip().strip('"')
+        if file.startswith('@@') and parent:
+            name = os.path.join(os.path.dirname(parent), name)
+        elif not os.path.isabs(name):
+            name = os.path.join(self.root, name)
+        #
+        if not os.path.exists(name):
+            self.set_error(parent, line, file, 'SP2-0310: Unable to open file: "{}"'.format(name), self.oserror)
+            return
+        self.run_lines(util.get_file_lines(name), file = name)
+
+
+
+    def run_lines(self, lines, file = ''):
+        buffer, start, state, comment, command = [], 0, '', False, None
+        #
+        for num, line in enumerate(lines, start = 1):
+            if self.stopped:
+                return
+            line    = line.rstrip()
+            trimmed = line.strip()
+
+            # commands continued on next line with -
+            if command != None:
+                command[1] += ' ' + trimmed.rstrip('-').strip()
+                if not trimmed.endswith('-'):
+                    self.run_command(command[1], file, command[0])
+                    command = None
+                continue
+
+            # commands outside of statements
+            if not buffer:
+                if comment or trimmed.startswith('/*'):
+                    comment = not ('*/' in trimmed)
+                    continue
+                if trimmed == '' or trimmed == '/' or trimmed.startswith('--'):
+                    continue
+                if trimmed.startswith('@'):
+                    self.run_file(trimmed, num, parent = file)
+                    continue
+                if self.is_command(trimmed):
+                    if trimmed.endswith(' -'):
+                        command = [num, trimmed.rstrip('-').strip()]
+                    else:
+                        self.run_command(trimmed, file, num)
+                    continue
+                #
+                start = num
+
+            # collect statement lines, PL/SQL ends with /, SQL also with ; at the end of the line
+            if not state and trimmed == '/':
+                self.run_statement('\n'.join(buffer), file, start, self.is_plsql(buffer))
+                buffer = []
+                continue
+            #
+            state, end = self.scan(line, state)
+            if not state and end != None and not self.is_plsql(buffer + [line]):
+                buffer.append(line[0:end].rstrip())
+                self.run_statement('\n'.join(buffer), file, start, False)
+                buffer = []
+            else:
+                buffer.append(line)
+        #
+        # unfinished statement at the end of the file is not executed, same as in SQLcl
+
+
+
+    def scan(self, line, state):
+        # walk thru the line, track quotes and comments over lines,
+        # return new state and position of ; which ends the line (just spaces or comment can follow)
+        end, i = None, 0
+        while i < len(line):
+            char = line[i]
+            if state == '/*':
+                if line.startswith('*/', i):
+                    state, i = '', i + 2
+                    continue
+            elif state in ("'", '"'):
+                if char == state:
+                    state = ''      # doubled quote just opens the string again
+            elif state:
+                if line.startswith(state + "'", i):
+                    state, i = '', i + 2
+                    continue
+            else:
+                if line.startswith('--', i):
+                    break
+                if line.startswith('/*', i):
+                    state, i = '/*', i + 2
+                    continue
+                if char in 'qQ' and line[i + 1:i + 2] == "'" and i + 2 < len(line) and not re.match(r'[\w$#]', line[i - 1:i].replace('n', '').replace('N', '')):
+                    state, end, i = self.q_quotes.get(line[i + 2], line[i + 2]), None, i + 3
+                    continue
+                if char in ("'", '"'):
+                    state = char
+                if char == ';':
+                    end = i
+                elif not char.isspace():
+                    end = None
+            i += 1
+        return (state, end)
+
+
+
+    def is_plsql(self, lines):
+        return bool(self.plsql_start.match(' '.join(' '.join(lines).split())))
+
+
+
+    def is_command(self, line):
+        words = line.rstrip(';').split()
+        if words[0].upper() == 'SET' and len(words) > 1 and words[1].upper() in ('TRANSACTION', 'ROLE', 'CONSTRAINT', 'CONSTRAINTS'):
+            return False    # SQL statements
+        return words[0].upper() in self.skipped + self.unsupported + ['PROMPT', 'PRO', 'EXEC', 'EXECUTE', 'WHENEVER', 'SPOOL', 'EXIT', 'QUIT'] or line.startswith(('!', '$'))
+
+
+
+    def run_command(self, command, file, line):
+        words   = command.rstrip(';').split()
+        keyword = words[0].upper()
+        args    = ' '.join(words[1:])
+        option  = words[1].upper() if len(words) > 1 else ''
+        value   = words[2].upper() if len(words) > 2 else ''
+        #
+        if keyword in self.unsupported or command.startswith(('!', '$')) or (keyword in ('COLUMN', 'COL') and re.search(r'\b(NEW|OLD)_V(ALUE)?\b', command, re.I)) or (keyword == 'SET' and option in ('AUTOCOMMIT', 'AUTO', 'ESCAPE', 'ESC') and value != 'OFF'):
+            self.set_error(file, line, command, 'Command not supported in native mode, deploy this script with SQLcl', 'EXIT ROLLBACK')
+        #
+        elif self.has_substitution(command, file, line):
+            pass
+        #
+        elif keyword in ('PROMPT', 'PRO'):
+            self.echo([command.rstrip(';')[len(words[0]):].strip()])
+        #
+        elif keyword in ('EXEC', 'EXECUTE'):
+            self.run_statement('BEGIN {}; END;'.format(command[len(words[0]):].strip().rstrip(';')), file, line, True)
+        #
+        elif keyword == 'WHENEVER' and len(words) > 2:
+            if option == 'SQLERROR':
+                self.sqlerror = ' '.join(words[2:]).upper()
+            else:
+                self.oserror = ' '.join(words[2:]).upper()
+        #
+        elif keyword == 'SPOOL':
+            self.set_spool(args)
+        #
+        elif keyword in ('EXIT', 'QUIT'):
+            self.stop(args.upper() or 'COMMIT')
+        #
+        elif keyword == 'SET' and option in ('SERVEROUTPUT', 'SERVEROUT') and value:
+            self.dbms_output = value == 'ON'
+            self.conn.execute('BEGIN DBMS_OUTPUT.{}; END;'.format('ENABLE(NULL)' if self.dbms_output else 'DISABLE'))
+        #
+        elif keyword == 'SET' and option in ('DEFINE', 'DEF', 'SCAN') and value:
+            if value in ('OFF', 'ON'):
+                self.define = (self.define or '&') if value == 'ON' else None
+            else:
+                self.define = words[2].strip('"\'')[0:1]
+
+
+
+    def has_substitution(self, text, file, line):
+        # substitution variables are replaced even in strings, which is not supported
+        if self.define and re.search(re.escape(self.define) + r'{1,2}[A-Za-z_]', text):
+            self.set_error(file, line, text, 'Substitution variables are not supported in native mode, use SET DEFINE OFF or deploy with SQLcl', 'EXIT ROLLBACK')
+            return True
+        return False
+
+
+
+    def run_statement(self, statement, file, line, plsql = False):
+        statement = statement.strip()
+        if not statement or self.has_substitution(statement, file, line):
+            return
+        #
+        start   = timeit.default_timer()
+        result  = util.Attributed({
+            'file'      : file,
+            'line'      : line,
+            'type'      : 'PLSQL' if plsql else 'SQL',
+            'statement' : statement.splitlines()[0][0:80],
+            'status'    : 'OK',
+            'error'     : '',
+            'rows'      : 0,
+            'seconds'   : 0,
+        })
+        self.statements.append(result)
+        #
+        try:
+            with self.conn.conn.cursor() as curs:
+                curs.execute(statement)
+                result.rows     = max(curs.rowcount, 0)
+                result.seconds  = round(timeit.default_timer() - start, 3)
+                #
+                if curs.description:
+                    rows = curs.fetchall()
+                    result.rows = len(rows)
+                    self.echo([' '.join([str(col[0]) for col in curs.description])] + [' '.join([str(value) for value in row]) for row in rows])
+                #
+                warning = getattr(curs, 'warning', None)
+            #
+            if warning:
+                result.status   = 'WARNING'
+                result.error    = str(warning)
+                self.echo([self.get_message(statement, plsql, result.rows).replace('created.', 'compiled'), '', 'Errors: check compiler log'])
+            else:
+                self.echo([self.get_message(statement, plsql, result.rows)])
+            self.echo(self.get_dbms_output())
+        #
+        except Exception as e:
+            result.status   = 'ERROR'
+            result.error    = str(e).splitlines()[0]
+            result.seconds  = round(timeit.default_timer() - start, 3)
+            self.set_error(file, line, statement, str(e), self.sqlerror, result = result)
+
+
+
+    def get_message(self, statement, plsql, rows):
+        # feedback same as in SQLcl
+        words   = statement.upper().split()
+        message = self.messages.get(words[0])
+        if message == None:
+            return 'PL/SQL procedure successfully completed.' if plsql else ''
+        #
+        if words[0] in ('INSERT', 'UPDATE', 'DELETE', 'MERGE'):
+            return message.replace(' row ', ' rows ' if rows != 1 else ' row ').format(rows)
+        #
+        words = [word for word in words[1:4] if not (word in ('OR', 'REPLACE', 'FORCE', 'NOFORCE', 'EDITIONABLE', 'NONEDITIONABLE', 'GLOBAL', 'TEMPORARY', 'UNIQUE', 'BITMAP', 'PUBLIC'))]
+        object_type = (words[0] + (' ' + words[1] if len(words) > 1 and words[1] == 'BODY' else '')) if words else ''
+        return message.format(object_type.title())
+
+
+
+    def get_dbms_output(self):
+        lines = []
+        if self.dbms_output:
+            with self.conn.conn.cursor() as curs:
+                line    = curs.var(str)
+                status  = curs.var(int)
+                while True:
+                    curs.callproc('DBMS_OUTPUT.GET_LINE', (line, status))
+                    if status.getvalue() != 0:
+                        break
+                    lines.append(line.getvalue() or '')
+        return lines
+
+
+
+    def set_error(self, file, line, command, message, action, result = None):
+        self.success = False
+
+        # errors outside of statements (commands, includes) are reported with statements too
+        if result == None:
+            self.statements.append(util.Attributed({
+                'file'      : file,
+                'line'      : line,
+                'type'      : 'COMMAND',
+                'statement' : command.splitlines()[0][0:80] if command else '',
+                'status'    : 'ERROR',
+                'error'     : message.splitlines()[0],
+                'rows'      : 0,
+                'seconds'   : 0,
+            }))
+        #
+        if file:
+            self.echo(['', 'Error starting at line : {} File @ {}'.format(line, file), 'In command -'])
+        else:
+            self.echo(['', 'Error starting at line : {} in command -'.format(line)])
+        self.echo([command, 'Error report -'] + message.splitlines())
+        #
+        if action.startswith('EXIT'):
+            self.stop('ROLLBACK' if 'ROLLBACK' in action else 'COMMIT')
+
+
+
+    def stop(self, action):
+        if 'ROLLBACK' in action:
+            self.conn.rollback()
+        else:
+            self.conn.commit()
+        self.stopped = True
+
+
+
+    def set_spool(self, args):
+        if self.spool:
+            self.spool.close()
+            self.spool = None
+        #
+        words = args.strip().rstrip(';').split()
+        if not words or words[0].upper() == 'OFF':
+            return
+        #
+        append  = words[-1].upper() == 'APPEND'
+        name    = args.strip().rstrip(';')
+        name    = name[0:len(name) - len(words[-1])].strip() if words[-1].upper() in ('APPEND', 'REPLACE', 'CREATE') else name
+        name    = os.path.join(self.root, name.strip('"'))
+        #
+        self.spool = open(name, 'at' if append else 'wt', encoding = 'utf-8', newline = util.newline)
+
+
+
+    def echo(self, lines):
+        for line in lines:
+            self.output.append(line)
+            if self.spool:
+                self.spool.write(line + '\n')
+                self.spool.flush()
+            if self.callback:
+                self.callback(line)
+
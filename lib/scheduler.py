@@ -0,0 +1,71 @@
+# coding: utf-8
+import sys, os, re, concurrent.futures
+
+#
+# run deployment plan as a graph, so every file waits just for the files it depends on
+#
+# explicit order comes from numeric prefixes (1_CORE.sql before 2_APP.sql, files without prefix go last),
+# APEX apps wait for the database file of their schema and files wait for database files of schemas
+# listed in depends (schema => [schemas deployed before]),
+# files can wait just for files above them, so the plan order is always a valid order
+#
+# without any dependencies configured the schemas are deployed in the plan order,
+# just APEX apps can run at the same time
+#
+
+def get_prefix(file):
+    found = re.match(r'^(\d+)[_-]', os.path.basename(file))
+    return int(found.group(1)) if found else None
+
+
+
+def get_dependencies(plan, depends = {}):
+    depends = {schema.upper() : [dep.upper() for dep in (deps or [])] for schema, deps in (depends or {}).items()}
+    serial  = len(depends) == 0
+    waits   = {}
+    for i, curr in enumerate(plan):
+        waits[i]        = set()
+        curr_prefix     = get_prefix(curr['file'])
+        curr_depends    = depends.get(curr['schema'].upper()) or []
+        #
+        for j, prev in enumerate(plan[0:i]):
+            prev_prefix = get_prefix(prev['file'])
+            if prev_prefix != None and (curr_prefix == None or prev_prefix < curr_prefix):
+                waits[i].add(j)
+            #
+            elif prev['schema'] == curr['schema'] and (not prev['app_id'] or prev['app_id'] == curr['app_id']):
+                waits[i].add(j)
+            #
+            elif not prev['app_id'] and prev['schema'].upper() in curr_depends:
+                waits[i].add(j)
+            #
+            elif serial and not (prev['app_id'] and curr['app_id']):
+                waits[i].add(j)
+    return waits
+
+
+
+def run(plan, function, waits, workers = 1):
+    # call function(index) for every file, yield (index, result) as they finish
+    if workers <= 1:
+        for i in range(len(plan)):
+            yield (i, function(i))
+        return
+    #
+    done    = set()
+    running = {}    # future => index
+    with concurrent.futures.ThreadPoolExecutor(max_workers = workers) as executor:
+        while len(done) < len(plan):
+            # start all files which are ready
+            for i in range(len(plan)):
+                if len(running) >= workers:
+                    break
+                if not (i in done) and not (i in running.values()) and waits[i] <= done:
+                    running[executor.submit(function, i)] = i
+            #
+            finished, _ = concurrent.futures.wait(running, return_when = concurrent.futures.FIRST_COMPLETED)
+            for future in sorted(finished, key = lambda future: running[future]):
+                i = running.pop(future)
+                done.add(i)
+                yield (i, future.result())
+
@@ -0,0 +1,165 @@
+# coding: utf-8
+import sys, os, subprocess, secrets, threading, queue, timeit
+
+#
+# long running SQLcl process, scripts are passed through stdin
+# and the output of each script is separated by unique markers,
+# so the JVM starts and connects just once per connection and folder
+#
+# each script is committed same way as on exit of the one-shot process and the session
+# settings are reset before the next script, but anything not listed in reset (NLS settings,
+# package state, temporary tables...) carries over, so sessions are opt-in (sqlcl_session)
+#
+
+class Session:
+
+    # reset settings which could be left over from the previous script
+    reset = [
+        'SPOOL OFF',
+        'WHENEVER OSERROR CONTINUE NONE',
+        'WHENEVER SQLERROR CONTINUE NONE',
+        'SET DEFINE "&"',
+        'SET DEFINE ON',
+        'SET ECHO OFF',
+        'SET FEEDBACK ON',
+        'SET HEADING ON',
+        'SET LINESIZE 80',
+        'SET PAGESIZE 14',
+        'SET SERVEROUTPUT OFF',
+        'SET SQLBLANKLINES OFF',
+        'SET TERMOUT ON',
+        'SET TIMING OFF',
+        'SET VERIFY ON',
+        'CLEAR BREAKS',
+        'CLEAR COLUMNS',
+        'CLEAR COMPUTES',
+        'EXEC EXECUTE IMMEDIATE \'ALTER SESSION SET CURRENT_SCHEMA = \' || SYS_CONTEXT(\'USERENV\', \'SESSION_USER\');',
+    ]
+
+    # end unfinished statement without running it (/ would run the last statement again)
+    # and commit as SQLcl does on exit
+    finish = [
+        '.',
+        'SET FEEDBACK OFF',
+        'COMMIT;',
+    ]
+
+    def __init__(self, connect, root, timeout = None):
+        self.root       = root
+        self.timeout    = timeout or None       # seconds for one request, None = no limit
+        self.timed_out  = False
+        self.marker     = 'ADT_{}'.format(secrets.token_hex(8))
+        self.requests   = 0
+        self.lines      = queue.Queue()
+        self.process    = subprocess.Popen(
+            'sql /nolog' if os.name == 'nt' else ['sql', '/nolog'],
+            shell       = (os.name == 'nt'),
+            cwd         = root,
+            stdin       = subprocess.PIPE,
+            stdout      = subprocess.PIPE,
+            stderr      = subprocess.STDOUT,
+            text        = True,
+            encoding    = 'utf-8',
+            errors      = 'replace',
+            bufsize     = 1,
+        )
+
+        # read output in a thread, so we can stop waiting for hanging scripts
+        self.reader = threading.Thread(target = self.read_output, args = (self.process.stdout, self.lines), daemon = True)
+        self.reader.start()
+
+        # keep banner and connection result for the first request
+        self.startup = self.send(connect, reset = False)
+        if not ('Connected.' in self.startup):
+            self.close()
+
+
+
+    def is_alive(self):
+        return self.process != None and self.process.poll() == None
+
+
+
+    def request(self, request, callback = None):
+        output = self.send(request, callback = callback)
+        if self.startup:
+            output, self.startup = '\n'.join(filter(None, [self.startup, output])), ''
+        return output
+
+
+
+    def send(self, request, reset = True, callback = None):
+        start   = '{}_START_{}'.format(self.marker, self.requests)
+        end     = '{}_END_{}'.format(self.marker, self.requests)
+        payload = self.reset if reset else []
+        finish  = self.finish if reset else []
+        payload = '\n'.join(payload + ['PROMPT {}'.format(start), request.rstrip()] + finish + ['PROMPT {}'.format(end), ''])
+        #
+        self.requests += 1
+        try:
+            self.process.stdin.write(payload)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            pass    # process ended, return whatever is left in the output
+
+        # read output until the end marker, process might exit on error or on exit command
+        lines   = []
+        started = not reset
+        expires = (timeit.default_timer() + self.timeout) if self.timeout else None
+        while True:
+            try:
+                line = self.lines.get(timeout = max(expires - timeit.default_timer(), 0) if expires else None)
+            except queue.Empty:
+                # script never reached the end marker (unclosed quote...), start over with new session
+                self.timed_out = True
+                self.close(kill = True)
+                break
+            #
+            if line == None:
+                self.close()
+                break
+            if line.endswith(end) and not line.upper().endswith(('PROMPT ' + end).upper()):
+                break
+            if line.endswith(start) and not line.upper().endswith(('PROMPT ' + start).upper()):
+                started = True
+                continue
+            if started:
+                lines.append(line)
+                if callback:
+                    callback(line)      # pass lines as they come
+        #
+        return '\n'.join(lines).strip()
+
+
+
+    def read_output(self, stdout, lines):
+        try:
+            for line in stdout:
+                lines.put(line.rstrip('\r\n'))
+        except (OSError, ValueError):
+            pass    # closed
+        lines.put(None)
+
+
+
+    def close(self, kill = False):
+        if self.process == None:
+            return
+        #
+        try:
+            if kill:
+                self.process.kill()
+            elif self.process.poll() == None:
+                self.process.stdin.write('exit;\n')
+                self.process.stdin.flush()
+            self.process.stdin.close()
+            self.process.wait(timeout = 10)
+        except Exception:
+            self.process.kill()
+        #
+        try:
+            self.process.stdout.close()
+        except Exception:
+            pass
+        self.process = None
+
@@ -1,4 +1,4 @@
-import sys, os, re, glob, traceback, inspect, io, subprocess, datetime, time, timeit, shutil, hashlib, mimetypes, pathlib
+import sys, os, re, glob, traceback, inspect, io, subprocess, threading, datetime, time, timeit, shutil, hashlib, mimetypes, pathlib
 import secrets, base64
 import yaml         # pip3 install pyyaml       --upgrade
 import chime        # pip3 install chime        --upgrade
@@ -10,6 +10,7 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
 newline = '\n'      # default line ending; set to '\r\n' via file_crlf in config.yaml
+file_hashes = {}    # file => [modified, size, hash] to skip hashing of unchanged files
 
 
 
@@ -214,7 +215,21 @@ def get_file_lines(file):
 
 def get_file_hash(file):
     if os.path.exists(file):
-        return hashlib.sha1(open(file, 'rb').read()).hexdigest()
+        stat    = os.stat(file)
+        cached  = file_hashes.get(file)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        #
+        with open(file, 'rb') as f:
+            hash = hashlib.sha1(f.read()).hexdigest()
+        file_hashes[file] = [stat.st_mtime_ns, stat.st_size, hash]
+        return hash
+
+
+
+def get_payload_hash(payload):
+    # same hash as get_file_hash on the file written by write_file
+    return hashlib.sha1(payload.replace('\n', newline).encode('utf-8')).hexdigest()
 
 
 
@@ -225,21 +240,21 @@ def write_file(file, payload, mode = 'wt', yaml = False, fix = False, check_hash
             folder = folder.replace('/../', '/')    # fix relative folders
         os.makedirs(folder)
     #
-    if check_hash and not yaml and os.path.exists(file):
-        old_hash = get_file_hash(file)
+    if isinstance(payload, list) and not yaml:
+        payload = '\n'.join(payload) + '\n'
+
+    # keep file untouched if it has the same content (as it would be written)
+    if check_hash and not yaml and mode == 'wt' and os.path.exists(file):
+        if get_file_hash(file) == get_payload_hash(payload):
+            return False
     #
     with open(file, mode, encoding = 'utf-8', newline = newline) as w:
         if yaml:
             store_yaml(w, payload = payload, fix = fix)
-            return
-        #
-        if isinstance(payload, list):
-            payload = '\n'.join(payload) + '\n'
-        #
-        if check_hash and not yaml and old_hash == get_hash(payload):
-            return
+            return True
         #
         w.write(payload)
+    return True
 
 
 
@@ -821,14 +836,17 @@ def assert_(condition, message, *extras):
 
 
 
-def run_command(command, stop = True, silent = False, capture_output = True, text = True):
-    try:
-        result = subprocess.run(command, shell = True, capture_output = capture_output, text = text, encoding = 'utf-8')
-    except:
+def run_command(command, stop = True, silent = False, capture_output = True, text = True, callback = None):
+    if callback:
+        result = stream_command(command, callback)
+    else:
         try:
-            result = subprocess.run(command, shell = True, capture_output = capture_output, text = text)
+            result = subprocess.run(command, shell = True, capture_output = capture_output, text = text, encoding = 'utf-8')
         except:
-            raise_error('CAPTURE ERROR', [command])
+            try:
+                result = subprocess.run(command, shell = True, capture_output = capture_output, text = text)
+            except:
+                raise_error('CAPTURE ERROR', [command])
     #
     if result.returncode != 0 and not silent:
         # get all lines below error line
@@ -848,6 +866,26 @@ def run_command(command, stop = True, silent = False, capture_output = True, tex
 
 
 
+def stream_command(command, callback):
+    # pass output lines to callback as they come, not just when the command ends,
+    # errors are read in a thread, so a full stderr pipe cant block the command
+    lines   = []
+    errors  = []
+    process = subprocess.Popen(command, shell = True, stdout = subprocess.PIPE, stderr = subprocess.PIPE, text = True, encoding = 'utf-8', errors = 'replace', bufsize = 1)
+    reader  = threading.Thread(target = lambda: errors.append(process.stderr.read()), daemon = True)
+    reader.start()
+    #
+    for line in process.stdout:
+        line = line.rstrip('\r\n')
+        lines.append(line)
+        callback(line)
+    process.wait()
+    reader.join()
+    #
+    return subprocess.CompletedProcess(command, process.returncode, stdout = '\n'.join(lines), stderr = ''.join(errors))
+
+
+
 def cleanup_sqlcl(output, lines = False):
     output = output.splitlines()
     for i, line in enumerate(output, start = 1):
@@ -856,7 +894,7 @@ def cleanup_sqlcl(output, lines = False):
             break
     #
     size = len(output)
-    if output[size - 2].startswith('Disconnected') and output[size - 1].startswith('Version'):
+    if size > 1 and output[size - 2].startswith('Disconnected') and output[size - 1].startswith('Version'):
         size -= 2
         output = output[:size]
     #
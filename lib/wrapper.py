@@ -1,9 +1,10 @@
 # coding: utf-8
-import sys, os, traceback, zipfile
+import sys, os, re, traceback, zipfile, json, timeit, threading, collections
 import oracledb         # pip3 install oracledb     --upgrade
 #import sshtunnel
 #
 from lib import util
+from lib import sqlcl
 from lib import queries_wrapper as query
 
 #
@@ -34,13 +35,29 @@ from lib import queries_wrapper as query
 
 class Oracle:
 
-    def __init__(self, tns, config = {}, debug = False, ping_sqlcl = False, silent = False):
+    # statements traced in all sessions
+    traces          = []
+    traces_lock     = threading.Lock()
+    query_names     = {}
+    query_modules   = 0
+
+    # statements parsed once for all sessions
+    statements      = {}
+    statements_max  = 1000    # limit for dynamic statements
+    bind_pattern    = re.compile(r':(\w+)')
+    cursors_max     = 20      # open cursors kept for reuse in each session
+
+    def __init__(self, tns, config = {}, debug = False, ping_sqlcl = False, silent = False, trace = False):
         self.conn       = None    # recent connection link
         self.curs       = None    # recent cursor
+        self.cursors    = {}      # open cursors by statement, to skip parsing on repeated calls
+        self.columns    = {}      # columns by statement, described once
+        self.sqlcl      = {}      # running SQLcl sessions by folder
         self.cols       = []      # recent columns mapping (name to position) to avoid associative arrays
         self.desc       = {}      # recent columns description (name, type, display_size, internal_size, precision, scale, null_ok)
         self.config     = config
         self.silent     = silent
+        self.trace      = trace   # measure all statements
         self.tns        = {
             'lang'      : '.AL32UTF8',
         }
@@ -70,9 +87,7 @@ class Oracle:
 
         # auto connect
         if not self.silent:
-            schema  = self.tns.get('proxy', '') or self.tns.get('schema', '') or self.tns.get('user', '')
-            env     = self.tns.get('env', '')
-            util.print_header('CONNECTING TO {}, {}:'.format(schema, env))
+            self.show_header()
         #
         self.connect()
         self.get_versions()
@@ -98,6 +113,13 @@ class Oracle:
 
 
 
+    def show_header(self):
+        schema  = self.tns.get('proxy', '') or self.tns.get('schema', '') or self.tns.get('user', '')
+        env     = self.tns.get('env', '')
+        util.print_header('CONNECTING TO {}, {}:'.format(schema, env))
+
+
+
     def connect(self):
         self.disconnect()       # to use as reconnect
         os.environ['NLS_LANG'] = self.tns.lang
@@ -203,6 +225,11 @@ class Oracle:
 
 
     def disconnect(self):
+        self.cursors = {}
+        self.columns = {}
+        for session in self.sqlcl.values():
+            session.close()
+        self.sqlcl = {}
         if self.conn:
             try:
                 self.conn.close()
@@ -211,6 +238,28 @@ class Oracle:
 
 
 
+    def is_alive(self):
+        # check if the session is still usable, costs one round trip
+        if not self.conn:
+            return False
+        try:
+            self.conn.ping()
+            return True
+        except Exception:
+            return False
+
+
+
+    def reset_session(self):
+        # discard package states without opening a new session
+        try:
+            self.curs = self.conn.cursor()
+            self.curs.execute(query.reset_package_state.strip())
+        except Exception:
+            self.connect()      # reconnect broken session
+
+
+
     def get_error_code(self):
         message = ''
         for line in traceback.format_exc().splitlines():
@@ -240,28 +289,90 @@ class Oracle:
 
 
 
-    def sqlcl_request(self, request, root = None, silent = False):
-        if isinstance(request, list):
-            request = '\n'.join(request)
-
-        # prepare connection string
+    def get_sqlcl_connect(self):
         if 'wallet' in self.tns:
-            request_conn = 'connect -cloudconfig "{}.zip" {}/"{}"@{}\n'.format(*[
+            return 'connect -cloudconfig "{}.zip" {}/"{}"@{}\n'.format(*[
                 self.tns.wallet.rstrip('.zip'),
                 self.tns.get('proxy') or self.tns.user,
                 self.tns.pwd if self.tns.get('pwd!', '') != 'Y' else util.decrypt(self.tns.pwd, self.tns.key),
                 self.tns.service
             ])
-        else:
-            request_conn = 'connect {}/"{}"@{}:{}/{}\n'.format(*[
-                self.tns.get('proxy') or self.tns.user,
-                self.tns.pwd if self.tns.get('pwd!', '') != 'Y' else util.decrypt(self.tns.pwd, self.tns.key),
-                self.tns.host,
-                self.tns.port,
-                self.tns.sid if self.tns.get('sid', '') != '' else self.tns.service
-            ])
+        #
+        return 'connect {}/"{}"@{}:{}/{}\n'.format(*[
+            self.tns.get('proxy') or self.tns.user,
+            self.tns.pwd if self.tns.get('pwd!', '') != 'Y' else util.decrypt(self.tns.pwd, self.tns.key),
+            self.tns.host,
+            self.tns.port,
+            self.tns.sid if self.tns.get('sid', '') != '' else self.tns.service
+        ])
+
+
+
+    def get_sqlcl_session(self, root):
+        # start SQLcl once per folder and keep it connected
+        session = self.sqlcl.get(root)
+        if session == None or not session.is_alive():
+            try:
+                session = sqlcl.Session(self.get_sqlcl_connect(), root = root, timeout = self.config.get('sqlcl_timeout'))
+            except OSError:
+                return None     # SQLcl not available this way
+            #
+            if not session.is_alive():
+                return None
+            self.sqlcl[root] = session
+        return session
+
+
+
+    def sqlcl_request(self, request, root = None, silent = False, callback = None):
+        if isinstance(request, list):
+            request = '\n'.join(request)
+        #
+        root    = os.path.abspath(root or self.config.sqlcl_root)
+        session = self.get_sqlcl_session(root) if self.config.get('sqlcl_session') else None
+        if session == None:
+            return self.sqlcl_request__(request, root = root, silent = silent, callback = callback)
+        #
+        start   = timeit.default_timer()
+        name    = 'SQLCL ' + request.strip().split('\n')[0]
+        result  = session.request(request, callback = callback)
+        #
+        if session.timed_out:
+            util.raise_error('SQLCL REQUEST TIMED OUT', 'script did not finish in {}s, check unclosed quotes and blocks'.format(self.config.get('sqlcl_timeout')))
+        self.check_sqlcl_result(request, result)
+        self.trace_query(name, {}, start, rows = len(result.splitlines()), size = len(result))
+        return result
+
+
+
+    def check_sqlcl_result(self, request, result):
+        failed = 'Error starting at line' in result
+        if (self.debug or failed):
+            print()
+            util.print_header('REQUEST:')
+            print(request.rstrip())
+            print()
+            util.print_header('RESULT:')
+            print(result)
+            print()
+            #
+            if failed:
+                error = ''
+                lines = result.splitlines()
+                for i, line in enumerate(lines):
+                    if 'Error report' in line:
+                        error = lines[i + 1]
+                util.raise_error('COMMAND ERROR', error.upper())
+
+
+
+    def sqlcl_request__(self, request, root = None, silent = False, callback = None):
+        # new SQLcl process for every request
+        request_conn = self.get_sqlcl_connect()
 
         # prepare process for normal platforms
+        start   = timeit.default_timer()
+        name    = 'SQLCL ' + request.strip().split('\n')[0]
         root    = os.path.abspath(root or self.config.sqlcl_root)
         request = '{}\n{}\nexit;\n'.format(request_conn, request)
         process = 'sql /nolog <<EOF\n{}EOF'.format(request)
@@ -283,61 +394,44 @@ class Oracle:
             process
         )
         #
-        result  = util.run_command(command, silent = silent).strip()
-        failed  = 'Error starting at line' in result
-        #
-        if (self.debug or failed):
-            print()
-            util.print_header('REQUEST:')
-            print(command.rstrip())
-            if os.name == 'nt':
-                print(request.rstrip())
-            print()
-            util.print_header('RESULT:')
-            print(result)
-            print()
-            #
-            if failed:
-                error = ''
-                lines = result.splitlines()
-                for i, line in enumerate(lines):
-                    if 'Error report' in line:
-                        error = lines[i + 1]
-                util.raise_error('COMMAND ERROR', error.upper())
+        result  = util.run_command(command, silent = silent, callback = callback).strip()
+        self.check_sqlcl_result(command.rstrip() + ('\n' + request.rstrip() if os.name == 'nt' else ''), result)
 
         # for Windows remove temp file
         if os.name == 'nt' and os.path.exists(full_tmp):
             os.remove(full_tmp)
         #
+        self.trace_query(name, {}, start, rows = len(result.splitlines()), size = len(result))
         return result
 
 
 
-    def fetch(self, query, limit = 0, **binds):
-        self.curs = self.conn.cursor()
+    def fetch(self, query, limit = 0, arraysize = 5000, **binds):
+        start   = timeit.default_timer()
+        curs    = self.get_cursor(query)
         if limit > 0:
-            self.curs.arraysize = limit
-            data = self.curs.execute(query.strip(), **self.get_binds(query, binds)).fetchmany(limit)
+            curs.arraysize = limit
+            data = curs.execute(self.get_statement(query).text, **self.get_binds(query, binds)).fetchmany(limit)
         else:
-            self.curs.arraysize = 5000
-            data = self.curs.execute(query.strip(), **self.get_binds(query, binds)).fetchall()
-        #
-        self.cols = [row[0].lower() for row in self.curs.description]
-        self.desc = {}
-        for row in self.curs.description:
-            self.desc[row[0].lower()] = row
+            curs.arraysize = arraysize          # lower it for large rows (CLOBs)
+            data = curs.execute(self.get_statement(query).text, **self.get_binds(query, binds)).fetchall()
         #
+        self.set_columns(query, curs)
+        self.trace_query(query, binds, start, data = data, arraysize = limit or arraysize)
         return data
 
 
 
     def fetch_clob_result(self, query, **binds):
-        self.curs   = self.conn.cursor()
-        result      = self.curs.var(oracledb.DB_TYPE_CLOB)
+        start       = timeit.default_timer()
+        curs        = self.get_cursor(query)
+        result      = curs.var(oracledb.DB_TYPE_CLOB)
         #
-        self.curs.execute(query.strip(), result = result, **self.get_binds(query, binds))
+        curs.execute(self.get_statement(query).text, result = result, **self.get_binds(query, binds))
         #
-        return result.getvalue()
+        value = result.getvalue()
+        self.trace_query(query, binds, start, rows = 1, size = len(value or ''))
+        return value
 
 
 
@@ -350,18 +444,146 @@ class Oracle:
     def row_as_dict(self, cursor):
         columns = [d[0].lower() for d in cursor.description]
         def row(*args):
-            return util.Attributed(dict(zip(columns, args)))
+            return util.Attributed(zip(columns, args))
         return row
 
 
 
+    def get_statement(self, query):
+        # parse query once, keep stripped text and bind names
+        statement = Oracle.statements.get(query)
+        if statement == None:
+            text        = query.strip()
+            statement   = util.Attributed({
+                'text'  : text,
+                'binds' : set(self.bind_pattern.findall(text)),
+                'calls' : 0,
+            })
+            if len(Oracle.statements) >= self.statements_max:
+                Oracle.statements.clear()
+            Oracle.statements[query] = statement
+        return statement
+
+
+
+    def get_cursor(self, query):
+        # reuse open cursor for the same statement, so it is not parsed again
+        statement = self.get_statement(query)
+        statement.calls += 1
+        #
+        curs = self.cursors.pop(query, None)
+        if curs == None:
+            curs = self.conn.cursor()
+        curs.rowfactory = None
+        self.curs       = curs
+
+        # keep cursors only for repeated statements, not for one time DDL
+        if statement.calls > 1:
+            if len(self.cursors) >= self.cursors_max:
+                self.cursors.pop(next(iter(self.cursors))).close()  # close least recently used
+            self.cursors[query] = curs
+        return curs
+
+
+
+    def set_columns(self, query, curs):
+        # describe columns once per statement
+        columns = self.columns.get(query)
+        if columns == None:
+            cols    = [row[0].lower() for row in curs.description]
+            columns = (cols, dict(zip(cols, curs.description)), self.row_as_dict(curs))
+            if len(self.columns) >= self.statements_max:
+                self.columns = {}
+            self.columns[query] = columns
+        #
+        self.cols, self.desc, row_factory = columns
+        return row_factory
+
+
+
+    def trace_query(self, query, binds, start, data = None, rows = 0, size = 0, arraysize = 0):
+        if not self.trace:
+            return
+        #
+        elapsed     = timeit.default_timer() - start
+        round_trips = 1
+        if data != None:
+            rows    = len(data)
+            size    = self.get_data_size(data)
+        if arraysize > 0:
+            round_trips += (max(rows - 2, 0) + arraysize - 1) // arraysize     # estimate, first 2 rows come with execute
+        #
+        record = {
+            'query'         : self.get_query_name(query),
+            'binds'         : len(self.get_binds(query, binds)),
+            'rows'          : rows,
+            'bytes'         : size,
+            'round_trips'   : round_trips,
+            'seconds'       : round(elapsed, 6),
+        }
+        with self.traces_lock:
+            Oracle.traces.append(record)
+
+
+
+    def get_data_size(self, data):
+        size = 0
+        for row in data:
+            for value in (row.values() if isinstance(row, dict) else row):
+                size += len(value) if isinstance(value, (str, bytes)) else 8
+        return size
+
+
+
+    def get_query_name(self, query):
+        # find the name of the query constant in loaded query modules
+        modules = [name for name in sys.modules.keys() if name.startswith('lib.queries')]
+        if len(modules) != Oracle.query_modules:
+            Oracle.query_modules = len(modules)
+            for name in modules:
+                for attr, value in vars(sys.modules[name]).items():
+                    if isinstance(value, str) and not attr.startswith('_'):
+                        Oracle.query_names[value.strip()] = '{}.{}'.format(name.replace('lib.', ''), attr)
+        #
+        return Oracle.query_names.get(query.strip()) or ' '.join(query.split())[0:60]
+
+
+
+    @staticmethod
+    def show_trace(top = 10, file = None):
+        # summarize statements by query
+        summary = {}
+        for row in Oracle.traces:
+            if not (row['query'] in summary):
+                summary[row['query']] = {'query' : row['query'], 'calls' : 0, 'rows' : 0, 'bytes' : 0, 'round_trips' : 0, 'seconds' : 0, 'max' : 0}
+            info = summary[row['query']]
+            info['calls']       += 1
+            info['rows']        += row['rows']
+            info['bytes']       += row['bytes']
+            info['round_trips'] += row['round_trips']
+            info['seconds']     += row['seconds']
+            info['max']          = max(info['max'], row['seconds'])
+        #
+        summary = sorted(summary.values(), key = lambda info: info['seconds'], reverse = True)
+        data    = []
+        for info in summary[0:top]:
+            data.append({**info, 'seconds' : '{:.3f}'.format(info['seconds']), 'max' : '{:.3f}'.format(info['max'])})
+        #
+        util.print_header('SLOWEST QUERIES:', '{} STATEMENTS'.format(len(Oracle.traces)))
+        util.print_table(data, right_align = ['calls', 'rows', 'bytes', 'round_trips', 'seconds', 'max'])
+
+        # store all statements for further analysis
+        if file:
+            util.write_file(file, json.dumps({'summary' : summary, 'statements' : Oracle.traces}, indent = 2))
+            print('  TRACE FILE:', file)
+            print()
+
+
+
     def get_binds(self, query, binds):
         # remove passed arguments which are not in the query
-        pass_binds = {}
-        for key, value in binds.items():
-            if ':{}'.format(key) in query:
-                pass_binds[key] = None if value == '' else value
-        return pass_binds
+        names = self.get_statement(query).binds
+        return {key : (None if value == '' else value) for key, value in binds.items() if key in names}
 
 
 
@@ -376,12 +598,15 @@ class Oracle:
 
 
 
-    def fetch_assoc(self, query, limit = 0, **binds):
-        self.curs = self.conn.cursor()
+    def open_cursor(self, query, binds, arraysize = 5000, prefetchrows = 2, reuse = True):
+        # iterators need their own cursor, because they can be interleaved with other queries
+        curs = self.get_cursor(query) if reuse else self.conn.cursor()
+        curs.arraysize      = max(arraysize, 1)     # rows fetched in one round trip, lower it for large rows (CLOBs)
+        curs.prefetchrows   = max(prefetchrows, 0)  # rows fetched with execute
+        self.curs           = curs
         #
         try:
-            binds   = self.get_binds(query, binds)
-            h       = self.curs.execute(query.strip(), **binds)
+            curs.execute(self.get_statement(query).text, **binds)
             #
         except oracledb.DatabaseError as e:
             if self.debug:
@@ -396,32 +621,79 @@ class Oracle:
             #
             util.raise_error('QUERY_ERROR', str(e).splitlines()[0])
         #
-        self.cols = [row[0].lower() for row in self.curs.description]
-        self.desc = {}
-        for row in self.curs.description:
-            self.desc[row[0].lower()] = row
-        #
-        self.curs.rowfactory = self.row_as_dict(self.curs)
+        self.set_columns(query, curs)
+        return curs
+
+
+
+    def fetch_assoc(self, query, limit = 0, **binds):
+        start   = timeit.default_timer()
+        binds   = self.get_binds(query, binds)
+        curs    = self.open_cursor(query, binds, arraysize = limit or 5000)
         #
+        curs.rowfactory = self.set_columns(query, curs)
         if limit > 0:
-            self.curs.arraysize = limit
-            return h.fetchmany(limit)
+            data = curs.fetchmany(limit)
+        else:
+            data = curs.fetchall()
         #
-        self.curs.arraysize = 5000
-        return h.fetchall()
+        self.trace_query(query, binds, start, data = data, arraysize = curs.arraysize)
+        return data
 
 
 
-    def fetch_value(self, query, **binds):
-        self.curs = self.conn.cursor()
-        self.curs.arraysize = 1
-        data = self.curs.execute(query.strip(), **self.get_binds(query, binds)).fetchmany(1)
+    def iter_rows(self, query, arraysize = 5000, prefetchrows = 2, named = False, **binds):
+        # return generator of rows as tuples (or named tuples), so the memory stays flat
+        # query is executed right away, so errors and columns are available before first row
+        start   = timeit.default_timer()
+        binds   = self.get_binds(query, binds)
+        curs    = self.open_cursor(query, binds, arraysize = arraysize, prefetchrows = prefetchrows, reuse = False)
+        #
+        if named:
+            row_type        = collections.namedtuple('Row', self.cols, rename = True)
+            curs.rowfactory = row_type
+        #
+        return self.iter_cursor(curs, query, binds, start)
+
+
+
+    def iter_assoc(self, query, arraysize = 5000, prefetchrows = 2, **binds):
+        # return generator of rows as dictionaries with attributes access
+        start   = timeit.default_timer()
+        binds   = self.get_binds(query, binds)
+        curs    = self.open_cursor(query, binds, arraysize = arraysize, prefetchrows = prefetchrows, reuse = False)
         #
-        self.cols = [row[0].lower() for row in self.curs.description]
-        self.desc = {}
-        for row in self.curs.description:
-            self.desc[row[0].lower()] = row
+        curs.rowfactory = self.set_columns(query, curs)
+        return self.iter_cursor(curs, query, binds, start)
+
+
+
+    def iter_cursor(self, curs, query, binds, start):
+        rows, size  = 0, 0
+        arraysize   = curs.arraysize
+        try:
+            while True:
+                data = curs.fetchmany()
+                if not data:
+                    break
+                rows += len(data)
+                if self.trace:
+                    size += self.get_data_size(data)
+                yield from data
+        finally:
+            curs.close()
+            self.trace_query(query, binds, start, rows = rows, size = size, arraysize = arraysize)
+
+
+
+    def fetch_value(self, query, **binds):
+        start   = timeit.default_timer()
+        curs    = self.get_cursor(query)
+        curs.arraysize = 1
+        data    = curs.execute(self.get_statement(query).text, **self.get_binds(query, binds)).fetchmany(1)
         #
+        self.set_columns(query, curs)
+        self.trace_query(query, binds, start, data = data)
         if len(data):
             return data[0][0]
         return None
@@ -429,9 +701,11 @@ class Oracle:
 
 
     def execute(self, query, **binds):
-        self.curs = self.conn.cursor()
+        start   = timeit.default_timer()
+        curs    = self.get_cursor(query)
         try:
-            r = self.curs.execute(query.strip(), **self.get_binds(query, binds))
+            r = curs.execute(self.get_statement(query).text, **self.get_binds(query, binds))
+            self.trace_query(query, binds, start, rows = max(curs.rowcount, 0))
             return r
         except oracledb.DatabaseError as e:
             if self.debug:
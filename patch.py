@@ -1,9 +1,14 @@
 # coding: utf-8
-import sys, os, re, argparse, datetime, base64, mimetypes
+import sys, os, re, argparse, datetime, base64, mimetypes, multiprocessing, bisect, json, queue, threading
+import git          # pip3 install GitPython    --upgrade
 #
 import config
 from lib            import queries_patch as query
 from lib            import util
+from lib            import commits
+from lib            import blobs
+from lib            import scheduler
+from lib            import runner
 from lib.file       import File
 from export_apex    import Export_APEX
 from recompile      import Recompile
@@ -43,6 +48,7 @@ class Patch(config.Config):
     new_object_flag         = '[NEW]'
     status_success          = 'SUCCESS'
     status_error            = 'ERROR'
+    commits_per_worker      = 50        # dont start processes for just few commits
 
 
 
@@ -57,6 +63,8 @@ class Patch(config.Config):
         group.add_argument('-deploy',       help = 'Deploy created patch right away',           type = util.is_boolstr, nargs = '?', const = True,  default = False)
         group.add_argument('-force',        help = 'Force (re)deployment',                                              nargs = '?', const = True,  default = False)
         group.add_argument('-continue',     help = 'Rollback or continue on DB error',                                  nargs = '?', const = True,  default = False)
+        group.add_argument('-parallel',     help = 'Deploy independent files at the same time', type = int,             nargs = '?', const = os.cpu_count(), default = 1)
+        group.add_argument('-native',       help = 'Deploy without SQLcl, just DB connection',  type = util.is_boolstr, nargs = '?', const = True,  default = None)
         #
         group = parser.add_argument_group('SUPPORTING ACTIONS')
         group.add_argument('-archive',      help = 'To archive patches with specific ref #',    type = int,             nargs = '*')
@@ -64,6 +72,7 @@ class Patch(config.Config):
         group.add_argument('-moveup',       help = 'Move driving patch files higher',                                   nargs = '?', const = True,  default = False)
         group.add_argument('-refresh',      help = 'Refresh used objects and APEX components',                          nargs = '?', const = True,  default = False)
         group.add_argument('-rebuild',      help = 'Rebuild temp files',                        type = util.is_boolint, nargs = '?', const = True,  default = False)
+        group.add_argument('-workers',      help = 'Number of processes to rebuild commits',    type = int,             nargs = '?', const = os.cpu_count(), default = 1)
         #
         group = parser.add_argument_group('SPECIFY ENVIRONMENT DETAILS')
         group.add_argument('-target',       help = 'Target environment',                                                nargs = '?')
@@ -88,6 +97,7 @@ class Patch(config.Config):
         group.add_argument('-fetch',        help = 'Fetch Git changes before patching',                                 nargs = '?', const = True,  default = False)
         group.add_argument('-implode',      help = 'Merge files in a folder',                                           nargs = '?')
         group.add_argument('-deldiff',      help = 'Delete diff tables',                                                nargs = '?', const = True,  default = False)
+        group.add_argument('-yaml',         help = 'Export commits file to YAML',                                       nargs = '?', const = True,  default = False)
         #
         return parser
 
@@ -132,6 +142,7 @@ class Patch(config.Config):
         self.postfix_before     = self.config.patch_postfix_before
         self.postfix_after      = self.config.patch_postfix_after
         self.commits_file       = self.config.repo_commits_file.replace('#BRANCH#', self.info.branch)
+        self.commits_store      = commits.get_store(self.commits_file, ticket_pattern = self.config.patch_commit_pattern)
         self.show_commits       = 0
         self.patch_recent       = 0
         self.ignored_scripts    = []
@@ -155,10 +166,11 @@ class Patch(config.Config):
         self.patch_file_moveup  = self.args.get('moveup')
         self.show_commits       = (self.args.get('commits') or self.default_commits) if self.patch_code == None else self.args.get('commits')
         self.logs_prefix        = self.config.patch_deploy_logs.replace('{$TARGET_ENV}', self.target_env or '')
+        self.rollout_index_file = self.config.patch_hashes_index.replace('{$TARGET_ENV}', self.target_env or '')
 
         # overrides for current file
         if __name__ == "__main__":
-            if not (self.args.install or self.args.rebuild or self.args.implode):
+            if not (self.args.install or self.args.rebuild or self.args.implode or self.args.yaml):
                 util.assert_(self.args.target, 'MISSING ARGUMENT: TARGET ENV')
             #
             if self.target_env:
@@ -199,6 +211,13 @@ class Patch(config.Config):
             self.implode_folder(self.args.implode)
             util.quit()
 
+        # export commits to the old format
+        if self.args.yaml:
+            self.commits_store.export_yaml()
+            print('COMMITS EXPORTED:', self.commits_store.yaml_file)
+            print()
+            util.quit()
+
         # delete lost/forgotten diff tables
         if self.args.deldiff:
             self.delete_diff_tables()
@@ -351,37 +370,35 @@ class Patch(config.Config):
             target_commit_num = max(self.relevant_commits or [self.head_commit_id])
         #
         self.rollout_file   = self.config.patch_hashes + 'rollout.{}.log'.format(target_commit_num)
-        hash_files          = util.get_files(self.config.patch_hashes + 'rollout.*.log')
+        hash_files          = sorted(util.get_files(self.config.patch_hashes + 'rollout.*.log'), key = self.get_rollout_commit)
 
         # get last known rollout log before target commit
         util.print_header('LOADING HASH FILES:')
         #
         hashes = [1]
         for file in hash_files:
-            commit_num = util.extract_int(r'rollout.(\d+).log', file)
+            commit_num = self.get_rollout_commit(file)
             if commit_num < target_commit_num:
                 hashes.append(commit_num)
                 #
                 print('  - {}'.format(file))
         print()
 
-        # get previous hashes
+        # get previous hashes, either from locked file or from all other logs
         hash_previous   = {}
         hash_commits    = {}
+        rollout_index   = self.load_rollout_index()
         #
-        for file in hash_files:
-            if not self.args.locked and file == self.rollout_file:  # skip current file
-                continue
-            #
-            if self.args.locked and file != self.rollout_file:
-                continue
-            #
-            for line in util.get_file_lines(file):
-                line = util.replace(line.strip(), r'\s+\|\s+', '|')
-                if line and '|' in line:
-                    hash_file, hash_commit, prev_hash = line.split('|')
-                    hash_previous[hash_file] = prev_hash.strip()
-                    hash_commits[hash_file]  = int(hash_commit.strip())
+        if self.args.locked:
+            previous = {}
+            if self.rollout_file in hash_files:
+                self.get_rollout_hashes(self.rollout_file, previous)
+        else:
+            previous = self.get_rollout_index(rollout_index, [file for file in hash_files if file != self.rollout_file])
+        #
+        for hash_file, (hash_commit, prev_hash) in previous.items():
+            hash_previous[hash_file] = prev_hash
+            hash_commits[hash_file]  = hash_commit
 
         # get last file modification
         self.get_hash_files(prev_commit = 1, curr_commit = 1)
@@ -413,6 +430,9 @@ class Patch(config.Config):
                 if not commit_num in self.hash_commits:
                     self.hash_commits.append(commit_num)
 
+        # keep local file hashes for next run
+        self.save_rollout_index(rollout_index)
+
         # override commits
         self.filtered_commits = self.hash_commits
 
@@ -436,6 +456,63 @@ class Patch(config.Config):
 
 
 
+    def get_rollout_commit(self, file):
+        return util.extract_int(r'rollout.(\d+).log', file) or 0
+
+
+
+    def get_rollout_hashes(self, file, hashes):
+        # parse rollout log, newer lines override older ones
+        for line in util.get_file_lines(file):
+            if '|' in line:
+                hash_file, hash_commit, prev_hash = line.split('|')
+                hashes[hash_file.strip()] = [int(hash_commit.strip()), prev_hash.strip()]
+        return hashes
+
+
+
+    def load_rollout_index(self):
+        # consolidated hashes from rollout logs and hashes of local files
+        rollout_index = {'logs' : [], 'hashes' : {}, 'files' : {}}
+        if os.path.exists(self.rollout_index_file):
+            try:
+                with open(self.rollout_index_file, 'rt', encoding = 'utf-8') as f:
+                    rollout_index.update(json.load(f))
+            except:
+                pass    # just rebuild it
+        #
+        util.file_hashes.update(rollout_index['files'])
+        return rollout_index
+
+
+
+    def get_rollout_index(self, rollout_index, hash_files):
+        # rollout logs are treated as append only journal,
+        # so just logs created since the last run are parsed
+        logs = []
+        for file in hash_files:
+            stat = os.stat(file)
+            logs.append([file, stat.st_size, stat.st_mtime_ns])
+        #
+        known = rollout_index['logs']
+        if logs[0:len(known)] != known:
+            known = []      # some log was changed or removed
+            rollout_index['hashes'] = {}
+        #
+        for log in logs[len(known):]:
+            self.get_rollout_hashes(log[0], rollout_index['hashes'])
+        rollout_index['logs'] = logs
+        #
+        return rollout_index['hashes']
+
+
+
+    def save_rollout_index(self, rollout_index):
+        rollout_index['files'] = {file : util.file_hashes[file] for file in self.hash_files if file in util.file_hashes}
+        util.write_file(self.rollout_index_file, json.dumps(rollout_index))
+
+
+
     def get_hash_files(self, prev_commit, curr_commit):
         # build list of all files
         if self.args.local:
@@ -499,6 +576,7 @@ class Patch(config.Config):
 
     def deploy_patch(self):
         self.check_connections()
+        self.set_deploy_pool()
 
         # create folder for logs
         log_folder = '{}/{}/'.format(self.patch_folder, self.logs_prefix)
@@ -510,88 +588,55 @@ class Patch(config.Config):
         for plan in self.deploy_plan:
             max_file_len = max(max_file_len, len(plan['file']))
         #
-        map = {         # widths (in charaters)
+        self.deploy_columns = {         # widths (in charaters)
             'order'     : 5,
             'file'      : max_file_len,
             'output'    : 6,
             'status'    : 7,
             'timer'     : 5,
         }
+        self.deploy_logs        = log_folder
+        self.deploy_native      = self.args.get('native') if self.args.get('native') != None else self.config.get('patch_deploy_native')
+        self.deploy_statements  = {}    # file => statement results, just for native deployment
+        self.deploy_failed      = {}    # order => line of the first error, empty when reported
+        self.deploy_last        = {}    # order => last output line
+        self.deploy_lock        = threading.Lock()
         util.print_header('PATCHING PROGRESS AND RESULTS:')
-        util.print_table([], columns = map)
+        util.print_table([], columns = self.deploy_columns)
 
         self.patch_status   = ''
         self.patch_results  = []
         build_logs          = {}
 
-        # run the target script(s) and spool the logs
-        for order, plan in enumerate(self.deploy_plan):
-            start = util.get_start()
-
-            # check if file exists
-            full = '{}/{}'.format(self.patch_folder, plan['file'])
-            if not os.path.exists(full):
-                util.raise_error('FILE MISSING', full)
-
-            # cleanup the script from comments, fix prompts
-            payload = []
-            for line in util.get_file_lines(full):
-                line = line.strip()
-                if line.startswith('--') or line == '':
-                    continue
-                if line.startswith('PROMPT'):
-                    line = line.replace('PROMPT --;', 'PROMPT ---;')
+        # run the target script(s) and spool the logs, independent files can run at the same time
+        waits = scheduler.get_dependencies(self.deploy_plan, depends = self.config.get('patch_deploy_depends'))
+        try:
+            for order, (results, payload) in scheduler.run(self.deploy_plan, self.deploy_file, waits, workers = self.args.get('parallel') or 1):
+                self.patch_results.append({**self.deploy_plan[order], **results})
+                self.patch_status = self.status_success if (results['status'] == self.status_success and (self.patch_status == self.status_success or self.patch_status == '')) else self.status_error
                 #
-                payload.append(line)
-            payload = '\n'.join(payload)
-
-            # execute the script
-            output  = self.deploy_conn[plan['schema']].sqlcl_request(payload, root = self.patch_folder, silent = True)
-            lines   = output.splitlines()
-
-            # search for error message
-            success = None
-            for line in lines:
-                if line.startswith('Error starting at line'):
-                    success = False
-                    break
-
-            # search for the success prompt at last few lines
-            if success == None:
-                for line in lines[-10:]:                # last 10 lines
-                    if line.startswith('-- SUCCESS'):   # this is in patch.py
-                        success = True
-                        break
-
-            # prep results for the template
-            results = {
-                'order'     : order + 1,
-                'file'      : plan['file'],
-                'output'    : len(lines),
-                'status'    : self.status_success if success else self.status_error,
-                'timer'     : int(round(util.get_start() - start + 0.5, 0)),  # ceil
-            }
-            self.patch_results.append({**self.deploy_plan[order], **results})
-            self.patch_status = self.status_success if (success and (self.patch_status == self.status_success or self.patch_status == '')) else self.status_error
-
-            # rename log to reflect the result in the file name
-            log_file    = full.replace('.sql', '.log')
-            log_status  = '{}/{} {} [{}].log'.format(log_folder, plan['file'].replace('.sql', ''), self.config.today_deploy, results['status'])
-            payload     = util.cleanup_sqlcl(output, lines = False).replace('---\n', '--\n')
-            payload     = util.replace(payload, r'(\nComment created.\n)', '\n', flags = re.M)
-            #
-            build_logs[os.path.basename(full)] = payload
-            #
-            if os.path.exists(log_file):
-                os.rename(log_file, log_status)
-            else:
-                # if no spooling, create file manually
-                util.write_file(log_status, payload)
-
-            # show progress
-            util.print_table([results], columns = map, right_align = ['order', 'output', 'timer'], no_header = True)
-            util.beep_success()
+                build_logs[os.path.basename(self.deploy_plan[order]['file'])] = payload
+
+                # show progress
+                with self.deploy_lock:
+                    util.print_now(' ' * 78 + '\r')   # clear live progress
+                    util.print_table([results], columns = self.deploy_columns, right_align = ['order', 'output', 'timer'], no_header = True)
+                util.beep_success()
+        finally:
+            self.close_deploy_pool()
         print()
+        #
+        self.patch_results = sorted(self.patch_results, key = lambda row: row['order'])
+
+        # show failed statements from native deployment
+        failed = []
+        for file, statements in self.deploy_statements.items():
+            for row in statements:
+                if row.status != 'OK':
+                    failed.append({'file' : os.path.basename(row.file or file), 'line' : row.line, 'status' : row.status, 'error' : row.error[0:80]})
+        if failed:
+            util.print_header('FAILED STATEMENTS:')
+            util.print_table(failed, right_align = ['line'])
 
         # verify views for matching columns
         self.verify_views()
@@ -652,6 +697,114 @@ class Patch(config.Config):
 
 
 
+    def deploy_file(self, order):
+        plan    = self.deploy_plan[order]
+        start   = util.get_start()
+
+        # check if file exists
+        full = '{}/{}'.format(self.patch_folder, plan['file'])
+        if not os.path.exists(full):
+            util.raise_error('FILE MISSING', full)
+
+        # cleanup the script from comments, fix prompts
+        payload = []
+        for line in util.get_file_lines(full):
+            line = line.strip()
+            if line.startswith('--') or line == '':
+                continue
+            if line.startswith('PROMPT'):
+                line = line.replace('PROMPT --;', 'PROMPT ---;')
+            #
+            payload.append(line)
+        payload = '\n'.join(payload)
+
+        # stream the output to the live log, so it can be watched while the script runs
+        log_live    = '{}/{} {} [RUNNING].log'.format(self.deploy_logs, plan['file'].replace('.sql', ''), self.config.today_deploy)
+        live        = open(log_live, 'wt', encoding = 'utf-8', newline = util.newline)
+        callback    = lambda line: self.deploy_progress(order, live, line)
+
+        # execute the script on free session for the schema
+        conn = self.deploy_pool[plan['schema']].get()
+        try:
+            if self.deploy_native:
+                result  = runner.Runner(conn, root = self.patch_folder, callback = callback).run(payload, file = full)
+                output  = result.output
+                self.deploy_statements[plan['file']] = result.statements
+            else:
+                output  = conn.sqlcl_request(payload, root = self.patch_folder, silent = True, callback = callback)
+        finally:
+            self.deploy_pool[plan['schema']].put(conn)
+            live.close()
+        lines = output.splitlines()
+
+        # native runner reports the result, SQLcl output has to be searched for error message
+        success = None
+        if self.deploy_native:
+            success = result.success
+        else:
+            for line in lines:
+                if line.startswith('Error starting at line'):
+                    success = False
+                    break
+
+        # search for the success prompt at last few lines
+        if success == None:
+            for line in lines[-10:]:                # last 10 lines
+                if line.startswith('-- SUCCESS'):   # this is in patch.py
+                    success = True
+                    break
+
+        # prep results for the template
+        results = {
+            'order'     : order + 1,
+            'file'      : plan['file'],
+            'output'    : len(lines),
+            'status'    : self.status_success if success else self.status_error,
+            'timer'     : int(round(util.get_start() - start + 0.5, 0)),  # ceil
+        }
+
+        # rename log to reflect the result in the file name
+        log_file    = full.replace('.sql', '.log')
+        log_status  = '{}/{} {} [{}].log'.format(self.deploy_logs, plan['file'].replace('.sql', ''), self.config.today_deploy, results['status'])
+        payload     = util.cleanup_sqlcl(output, lines = False).replace('---\n', '--\n')
+        payload     = util.replace(payload, r'(\nComment created.\n)', '\n', flags = re.M)
+        #
+        if os.path.exists(log_file):
+            os.rename(log_file, log_status)
+        else:
+            # if no spooling, create file manually
+            util.write_file(log_status, payload)
+        os.remove(log_live)
+        #
+        return (results, payload)
+
+
+
+    def deploy_progress(self, order, live, line):
+        live.write(line + '\n')
+        live.flush()
+        #
+        with self.deploy_lock:
+            prev = self.deploy_last.get(order, '')
+            self.deploy_last[order] = line
+
+            # report first error right away, so the deployment can be stopped early
+            if line.startswith('Error starting at line') and not (order in self.deploy_failed):
+                found = re.search(r'line\s*:\s*(\d+)', line)
+                self.deploy_failed[order] = found.group(1) if found else '?'
+            #
+            elif prev.startswith('Error report') and self.deploy_failed.get(order):
+                util.print_now(' ' * 78 + '\r')
+                util.print_help('{}, LINE {}: {}'.format(self.deploy_plan[order]['file'], self.deploy_failed[order], line.strip()))
+                util.beep_error()
+                self.deploy_failed[order] = ''
+
+            # show last prompt as the current step
+            elif line.startswith('-- ') and len(line) > 3:
+                util.print_now(util.get_string('  {:>5}   {}'.format(order + 1, line[3:].strip()), 78))
+
+
+
     def check_connections(self):
         # maybe we are already connected
         for schema in self.deploy_schemas.keys():
@@ -670,6 +823,29 @@ class Patch(config.Config):
 
 
 
+    def set_deploy_pool(self):
+        # free sessions for each schema, more sessions just for parallel deployment
+        self.deploy_pool = {}
+        for schema, orders in self.deploy_schemas.items():
+            self.deploy_pool[schema] = queue.Queue()
+            self.deploy_pool[schema].put(self.deploy_conn[schema])
+            #
+            for i in range(1, min(self.args.get('parallel') or 1, len(orders))):
+                self.init_connection(env_name = self.target_env, schema_name = schema)
+                self.deploy_pool[schema].put(self.db_connect(ping_sqlcl = False, silent = True, reuse = False))
+
+
+
+    def close_deploy_pool(self):
+        # close extra sessions (and their SQLcl sessions), keep the main ones for recompile
+        for schema, pool in self.deploy_pool.items():
+            while not pool.empty():
+                conn = pool.get()
+                if conn != self.deploy_conn[schema]:
+                    conn.disconnect()
+
+
+
     def get_schema_split(self, schema_with_app):
         schema, app_id, _ = (schema_with_app + '..').split('.', maxsplit = 2)
         return (schema, int(app_id) if app_id else None)
@@ -798,19 +974,18 @@ class Patch(config.Config):
 
         # read stored values
         all_hashes = []
-        if os.path.exists(self.commits_file):
-            with open(self.commits_file, 'rt', encoding = 'utf-8') as f:
-                self.all_commits = dict(util.get_yaml(f, self.commits_file))
-
-                # initate partial refresh, remove just last # of commits
-                if str(self.args.get('rebuild', 0)) != 'True' and self.args.get('rebuild', 0) > 0:
-                    for commit_num in sorted(self.all_commits.keys(), reverse = True)[0:self.args.get('rebuild', 0)]:
-                        self.all_commits.pop(commit_num)
-                    #
-                    self.args.rebuild = False
+        if self.commits_store.exists():
+            self.all_commits = self.commits_store.load()
+
+            # initate partial refresh, remove just last # of commits
+            if str(self.args.get('rebuild', 0)) != 'True' and self.args.get('rebuild', 0) > 0:
+                for commit_num in sorted(self.all_commits.keys(), reverse = True)[0:self.args.get('rebuild', 0)]:
+                    self.all_commits.pop(commit_num)
                 #
-                for _, commit in self.all_commits.items():
-                    all_hashes.append(commit['id'])
+                self.args.rebuild = False
+            #
+            for _, commit in self.all_commits.items():
+                all_hashes.append(commit['id'])
 
         # check for new format, dict with file hashes is expected, not the bare list
         for commit, data in self.all_commits.items():
@@ -843,80 +1018,37 @@ class Patch(config.Config):
             print()
             print('REBUILDING:   // time to get a coffee')
 
-        # loop throught all commits from newest to oldest, add missing commits
-        progress_target = commits
-        progress_done   = 0
-        start           = util.get_start()
-        new_commits     = []
-        #
+        # loop throught all commits from newest to oldest, find missing commits
+        todo = []
         for commit in self.repo.iter_commits(self.info.branch, skip = 0, reverse = False):
-            commit_hash = str(commit)
-            if commit_hash in all_hashes:       # last known commit reached
+            if str(commit) in all_hashes:       # last known commit reached
                 break
-
-            # calculate file hash right away
-            committed_files = {}
-            patch_code = ''
-            #
-            for file in sorted(commit.stats.files.keys()):
-                if self.is_usable_file(file):
-                    file_payload            = self.get_file_from_commit(file, commit = commit_hash)
-                    committed_files[file]   = util.get_hash(file_payload)
-
-                # keep patch driving files so we can identify patch commit
-                if file.startswith('patch/'):
-                    if util.extract('^[^/]+/([^/]+)/[^/]+.sql$', file):
-                        patch_code = util.extract('^[^/]+/([^/]+)/[^/]+.sql$', file)
-            #
-            new_commits.append({                        # number
-                'id'        : commit_hash,              # hash
-                'summary'   : commit.summary,
-                'author'    : commit.author.email,
-                'date'      : commit.authored_datetime,
-                'files'     : committed_files,          # database + APEX files and their hashes
-            })
-
-            # mark patch in commits file
-            if patch_code != '':
-                new_commits[len(new_commits) - 1]['patch'] = patch_code
-
-            # show progress
-            if self.args.get('rebuild'):
-                progress_done = util.print_progress(progress_done, progress_target, start = start)
-        if self.args.get('rebuild'):
-            util.print_progress_done(start = start)
-            print()
-            print('DELETED FILES:')
+            todo.append(commit)
 
         # load last commit number
         if len(self.all_commits) > 0:
             self.head_commit_id = max(self.all_commits.keys())
 
-        # attach new commits with proper id
-        progress_target = len(new_commits)
+        # pair commits with previous commits to find deleted files
+        prev_hash   = self.all_commits[self.head_commit_id]['id'] if self.head_commit_id else None
+        tasks       = []
+        for commit in reversed(todo):
+            tasks.append((commit, prev_hash))
+            prev_hash = str(commit)
+
+        # calculate file hashes right away
+        progress_target = len(tasks)
         progress_done   = 0
         start           = util.get_start()
         commit_id       = self.head_commit_id or 0
+        new_commits     = []
         #
-        for obj in reversed(new_commits):
-            obj['deleted'] = []
+        for obj in self.get_commits_info(tasks):
+            if obj['deleted'] == None:
+                util.raise_error('REBUILD NEEDED')
             #
             commit_id += 1
-            if commit_id > 1:
-                # store list of deleted files
-                prev_commit_id  = self.all_commits[commit_id - 1]['id']
-                curr_commit_id  = obj['id']
-                #
-                try:
-                    diffs = self.repo.commit(prev_commit_id).diff(curr_commit_id)
-                except:
-                    util.raise_error('REBUILD NEEDED')
-                #
-                for diff in diffs:
-                    rows = str(diff).splitlines()
-                    if 'file deleted in rhs' in rows[-1]:
-                        obj['deleted'].append(rows[0])
-            #
+            new_commits.append(commit_id)
             self.all_commits[commit_id] = obj
             #
             if self.args.get('rebuild'):
@@ -936,17 +1068,10 @@ class Patch(config.Config):
 
         # store commits in file for better performance
         if len(new_commits) > 0:
-            if os.path.exists(self.commits_file):
-                os.remove(self.commits_file)
-            util.write_file(self.commits_file, self.all_commits, yaml = True)
+            self.commits_store.save(self.all_commits, rebuild = bool(self.args.get('rebuild')), changed = new_commits)
 
         # also store commits with files as keys
-        for commit_id in sorted(self.all_commits.keys()):
-            obj = self.all_commits[commit_id]
-            for file in obj['files'].keys():
-                if not (file in self.all_files):
-                    self.all_files[file] = []
-                self.all_files[file].append(commit_id)
+        self.all_files = self.commits_store.get_files(self.all_commits)
 
         # show commits just since the last patch
         curr_patch = self.get_patch_folder()
@@ -971,6 +1096,64 @@ class Patch(config.Config):
 
 
 
+    def get_commits_info(self, tasks):
+        # process commits in current process
+        workers = min(self.args.get('workers') or 1, len(tasks) // self.commits_per_worker)
+        if workers <= 1:
+            for commit, prev_hash in tasks:
+                yield self.get_commit_info(commit, prev_hash)
+            return
+
+        # split commits between processes, each with own repo handle, keep the original order
+        tasks   = [(str(commit), prev_hash) for commit, prev_hash in tasks]
+        size    = max(len(tasks) // (workers * 4), 1)
+        shards  = [tasks[i:i + size] for i in range(0, len(tasks), size)]
+        #
+        with multiprocessing.Pool(processes = workers, initializer = init_commits_worker, initargs = (self.repo_root, self.config)) as pool:
+            for shard in pool.imap(get_commits_shard, shards):
+                for obj in shard:
+                    yield obj
+
+
+
+    def get_commit_info(self, commit, prev_hash = None):
+        commit          = self.blobs.get_commit(commit)
+        committed_files = {}
+        patch_code      = ''
+        #
+        for file in sorted(commit.stats.files.keys()):
+            if self.is_usable_file(file):
+                committed_files[file] = self.blobs.get_hash(commit, file)
+
+            # keep patch driving files so we can identify patch commit
+            if file.startswith('patch/'):
+                if util.extract('^[^/]+/([^/]+)/[^/]+.sql$', file):
+                    patch_code = util.extract('^[^/]+/([^/]+)/[^/]+.sql$', file)
+        #
+        obj = {                                 # number
+            'id'        : str(commit),          # hash
+            'summary'   : commit.summary,
+            'author'    : commit.author.email,
+            'date'      : commit.authored_datetime,
+            'files'     : committed_files,      # database + APEX files and their hashes
+        }
+
+        # mark patch in commits file
+        if patch_code != '':
+            obj['patch'] = patch_code
+
+        # store list of deleted files, None = missing previous commit
+        obj['deleted'] = []
+        if prev_hash:
+            try:
+                obj['deleted'] = self.blobs.get_deleted(prev_hash, commit, paths = self.get_usable_paths(), usable = self.is_usable_file)
+            except:
+                obj['deleted'] = None
+        #
+        return obj
+
+
+
     def get_filtered_commits(self):
         for commit_id in sorted(self.all_commits.keys(), reverse = True):
             commit = self.all_commits[commit_id]
@@ -1631,14 +1814,14 @@ class Patch(config.Config):
                 #
                 found_newer = []
                 if not self.args.head:
-                    for commit_id in sorted(self.all_files[orig_file]):
-                        if commit_id > curr_commit_id:
-                            # skip ignored commits
-                            if self.get_search_full(commit_id, self.ignore_commits):
-                                continue
-                            #
-                            commit = self.all_commits[commit_id]
-                            found_newer.append('{}) {}'.format(commit_id, commit['summary'][0:self.summary_len]))
+                    commit_ids = self.all_files[orig_file]
+                    for commit_id in commit_ids[bisect.bisect_right(commit_ids, curr_commit_id):]:     # newer commits
+                        # skip ignored commits
+                        if self.get_search_full(commit_id, self.ignore_commits):
+                            continue
+                        #
+                        commit = self.all_commits[commit_id]
+                        found_newer.append('{}) {}'.format(commit_id, commit['summary'][0:self.summary_len]))
                 #
                 if len(found_newer) > 0:
                     curr_commit = self.all_commits[curr_commit_id]
@@ -1705,20 +1888,24 @@ class Patch(config.Config):
         deleted_files   = []
         modifed_files   = []
         #
-        for diff in self.first_commit.diff(self.last_commit):
-            file = diff.b_path.replace('\\', '/').replace('//', '/')
+        # renamed file = deleted old file + new file
+        changes = []
+        for change in self.blobs.get_changes(self.first_commit, self.last_commit, paths = self.get_usable_paths(), usable = self.is_usable_file):
+            if change.change == 'R':
+                changes.append(util.Attributed({**change, 'change' : 'D', 'file' : change.old_file}))
+                changes.append(util.Attributed({**change, 'change' : 'A'}))
+            else:
+                changes.append(change)
+        #
+        for change in changes:
+            file = change.file
 
             # skip unusable files
             if not self.is_usable_file(file):
                 continue
 
-            # 'a_blob', 'a_mode', 'a_path', 'a_rawpath', 'b_blob', 'b_mode', 'b_path', 'b_rawpath', 'change_type',
-            # 'copied_file', 'deleted_file', 'diff', 'new_file', 'raw_rename_from', 'raw_rename_to', 're_header',
-            # 'rename_from', 'rename_to', 'renamed', 'renamed_file', 'score'
-            #print(dir(x))
-
             # skip deleted files
-            if 'file deleted in rhs' in str(diff):
+            if change.change == 'D':
                 ignored = False
                 for ignore_file in self.config.apex_files_ignore:
                     if file.endswith(ignore_file):
@@ -1739,11 +1926,11 @@ class Patch(config.Config):
 
             # process file and sort to show the file status
             if file in rel_files and not (file in self.diffs):
-                self.diffs[file] = diff
+                self.diffs[file] = change
                 #
-                if diff.new_file:
+                if change.change == 'A':
                     new_files.append(file)
-                elif diff.deleted_file:
+                elif change.change == 'D':
                     deleted_files.append(file)
                 else:
                     modifed_files.append(file)
@@ -2093,19 +2280,20 @@ class Patch(config.Config):
     def get_file_commit(self, file):
         last_commit     = ''
         last_commit_id  = None
+
+        # go through commits with this file only, skip commits after the last one
+        commit_ids  = self.all_files.get(file, [])      # sorted commit ids
+        end         = len(commit_ids) if self.args.head else bisect.bisect_right(commit_ids, self.last_commit_id)
         #
-        for commit_id in sorted(self.all_commits.keys(), reverse = True):
-            if not self.args.head and commit_id > self.last_commit_id:
-                continue
+        for i in range(end - 1, -1, -1):
+            commit_id       = commit_ids[i]
+            commit          = self.all_commits[commit_id]
+            last_commit     = commit['id']
+            last_commit_id  = commit_id
             #
-            commit = self.all_commits[commit_id]
-            if file in commit['files'].keys():
-                last_commit     = commit['id']
-                last_commit_id  = commit_id
-                #
-                if self.config.patch_skip_merge and commit['summary'].startswith('Merge'):
-                    continue    # look for another commit
-                break           # commit found
+            if self.config.patch_skip_merge and commit['summary'].startswith('Merge'):
+                continue    # look for another commit
+            break           # commit found
         #
         return last_commit, last_commit_id
 
@@ -2115,15 +2303,8 @@ class Patch(config.Config):
         # convert commit_id (number) to commit hash
         if isinstance(commit, int) and commit in self.all_commits:
             commit = self.all_commits[commit]['id']
-
-        # run command line and capture the output, text file is expected
-        try:
-            payload = util.run_command('git show {}:{}'.format(commit, file), silent = True, text = False)
-            payload = self.get_simple_text(payload)
-        except:
-            pass
         #
-        return payload
+        return self.blobs.get_content(commit, file)
 
 
 
@@ -2362,28 +2543,37 @@ class Patch(config.Config):
         #
         files           = self.sort_files_by_deps(util.get_files('{}{}**/*.sql'.format(self.repo_root, self.config.path_objects)))
         files_grouped   = {}
+        files_typed     = {}    # object_type => files in the dependency order
         overview        = {}
         payload         = []
+        grants_file     = '/{}.sql'.format(self.info['schema'])
+
+        # overview counts files seen by any group, grants group sees just current schema
+        overview_all    = any(object_types for group, object_types in self.config.patch_map.items() if group.upper() != 'GRANTS')
+        overview_grants = any(object_types for group, object_types in self.config.patch_map.items() if group.upper() == 'GRANTS')
+
+        # sort files by object type in one pass
+        for file in files:
+            short   = file.replace(self.repo_root, '')
+            obj     = self.repo_files.get(short) or File(file, config = self.config)
+            #
+            if obj.is_object:
+                files_typed.setdefault(obj.object_type, []).append(file)
+            #
+            if overview_all or (overview_grants and file.endswith(grants_file)):
+                overview.setdefault(obj['object_type'], set()).add(short)
 
         # sort files into groups
-        for group in self.config.patch_map.keys():
+        for group, object_types in self.config.patch_map.items():
             files_grouped[group] = []
-            for object_type in self.config.patch_map[group]:
-                for file in files:
-                    if group.upper() == 'GRANTS' and not file.endswith('/{}.sql'.format(self.info['schema'])):
+            files_seen = set()      # object type can be listed more than once in the group
+            for object_type in object_types:
+                for file in files_typed.get(object_type, []):
+                    if group.upper() == 'GRANTS' and not file.endswith(grants_file):
                         continue
-                    #
-                    short   = file.replace(self.repo_root, '')
-                    obj     = self.repo_files.get(short) or File(file, config = self.config)
-                    #
-                    if obj.is_object and obj.object_type == object_type:
-                        if not (file in files_grouped[group]):
-                            files_grouped[group].append(file)
-                    #
-                    if not (obj['object_type'] in overview):
-                        overview[obj['object_type']] = []
-                    if not (short in overview[obj['object_type']]):
-                        overview[obj['object_type']].append(short)
+                    if not (file in files_seen):
+                        files_seen.add(file)
+                        files_grouped[group].append(file)
 
         # create overview
         payload.append('--')
@@ -2446,13 +2636,6 @@ class Patch(config.Config):
 
 
 
-    def get_simple_text(self, payload):
-        if isinstance(payload, bytes):
-            return payload.decode('utf-8', errors = 'replace')
-        return payload
-
-
-
     def get_table_for_diff(self, payload):
         payload = payload.replace('IF NOT EXISTS', '')
         payload = payload.split(';')[0]
@@ -2492,12 +2675,15 @@ class Patch(config.Config):
         if not (version_src in self.all_commits.keys()):
             return ''
         #
-        source_file = self.get_file_from_commit(file, commit = version_src)
+        source_file, target_file = self.blobs.get_contents([
+            (self.all_commits[version_src]['id'], file),
+            (self.all_commits[version_trg]['id'], file),
+        ])
         if not source_file:
             return ''
         #
         source_obj = self.get_table_for_diff(source_file)
-        target_obj = self.get_table_for_diff(self.get_file_from_commit(file, commit = version_trg))
+        target_obj = self.get_table_for_diff(target_file)
         if source_obj == target_obj:
             return ''
 
@@ -2663,6 +2849,23 @@ class Patch(config.Config):
 
 
 
+def init_commits_worker(repo_root, config):
+    # prepare lightweight patch object in each worker process
+    global commits_worker
+    commits_worker              = Patch.__new__(Patch)
+    commits_worker.repo_root    = repo_root
+    commits_worker.config       = config
+    commits_worker.repo         = git.Repo(repo_root)
+    commits_worker.all_commits  = {}
+    commits_worker.blobs        = blobs.Blobs(commits_worker.repo)
+
+
+
+def get_commits_shard(tasks):
+    return [commits_worker.get_commit_info(commit_hash, prev_hash) for commit_hash, prev_hash in tasks]
+
+
+
 if __name__ == "__main__":
     Patch()
 
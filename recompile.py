@@ -136,8 +136,8 @@ class Recompile(config.Config):
 
         # if there are some leftovers, try to recompile them
         if len(troublemakers) > 0:
-            # reconnect due to some unforseen recompilation issues
-            self.conn = self.db_connect(ping_sqlcl = False, silent = True)
+            # reset session due to some unforseen recompilation issues
+            self.conn.reset_session()
 
             # go backwards
             for row in reversed(troublemakers):
@@ -147,8 +147,8 @@ class Recompile(config.Config):
                 except Exception:
                     pass
 
-        # reconnect due to some unforseen recompilation issues
-        self.conn = self.db_connect(ping_sqlcl = False, silent = True)
+        # reset session due to some unforseen recompilation issues
+        self.conn.reset_session()
 
         # calculate difference
         if __name__ == "__main__":
@@ -3,6 +3,7 @@ import sys, os, re, argparse, datetime, subprocess
 #
 import config
 from lib import util
+from lib import commits
 from lib.file import File
 
 #
@@ -68,6 +69,7 @@ class Search_Repo(config.Config):
 
         self.info.branch        = self.args.branch or self.config.repo_branch or self.info.branch or str(self.repo.active_branch)
         self.commits_file       = self.config.repo_commits_file.replace('#BRANCH#', self.info.branch)
+        self.commits_store      = commits.get_store(self.commits_file)
         self.all_commits        = {}
         self.all_files          = {}
         self.old_date           = None
@@ -78,22 +80,16 @@ class Search_Repo(config.Config):
             self.old_date = datetime.datetime.now().date() - datetime.timedelta(days = self.args.recent)
 
         # get all commits
-        if not os.path.exists(self.commits_file):
+        if not self.commits_store.exists():
             util.raise_error('COMMIT FILE MISSING',
                 self.commits_file,
                 'run: adt patch -rebuild'
             )
         #
-        with open(self.commits_file, 'rt', encoding = 'utf-8') as f:
-            self.all_commits = dict(util.get_yaml(f, self.commits_file))
+        self.all_commits = self.commits_store.load()
 
         # also store commits with files as keys
-        for commit_id in sorted(self.all_commits.keys()):
-            obj = self.all_commits[commit_id]
-            for file in obj['files']:
-                if not (file in self.all_files):
-                    self.all_files[file] = []
-                self.all_files[file].append(commit_id)
+        self.all_files = self.commits_store.get_files(self.all_commits)
 
         # restore matching files to requested (or all) past versions
         relevant_commits = util.ranged_str(self.args.commits) or ['0+']
@@ -227,9 +223,8 @@ class Search_Repo(config.Config):
         # convert commit_id (number) to commit hash
         if isinstance(commit, int):
             commit = self.all_commits[commit]['id']
-
-        # run command line and capture the output, text file is expected
-        return util.run_command('git show {}:{}'.format(commit, file))
+        #
+        return self.blobs.get_content(commit, file)
 
 
 